@@ -0,0 +1,40 @@
+import os
+
+from flask import Flask
+from pymongo.errors import PyMongoError
+
+from flask_mongodb import MongoDB
+
+BENCHMARK_DB = 'flask_mongodb_benchmarks'
+
+
+def create_app() -> Flask:
+    """
+    App of the benchmarks, with the models of ``benchmarks.models``. The server is a local mongod, set
+    ``MONGODB_BENCHMARK_HOST`` and ``MONGODB_BENCHMARK_PORT`` for another one.
+    """
+    app = Flask(__name__)
+    app.config.update({
+        'TESTING': True,
+        'DATABASE': {
+            'main': {
+                'HOST': os.environ.get('MONGODB_BENCHMARK_HOST', 'localhost'),
+                'PORT': int(os.environ.get('MONGODB_BENCHMARK_PORT', 27017)),
+                'NAME': BENCHMARK_DB,
+                'LAZY': True,  # The model benchmarks do not need the server
+                'SERVER_SELECTION_TIMEOUT_MS': 2000
+            }
+        },
+        'MODELS': ['benchmarks']
+    })
+    MongoDB(app)
+    return app
+
+
+def server_error(mongo: MongoDB):
+    """Error connecting to the server of the benchmarks, None when it is available"""
+    try:
+        mongo.connections['main'].client.admin.command('ping')
+    except PyMongoError as e:
+        return e
+    return None
@@ -0,0 +1,48 @@
+"""
+Benchmarks of the model, field and query layers, run with pytest-benchmark:
+
+    pytest benchmarks --benchmark-json=benchmark.json
+    pytest benchmarks --benchmark-compare=0001 --benchmark-compare-fail=mean:10%
+
+The query benchmarks use a local mongod, set ``MONGODB_BENCHMARK_HOST`` and ``MONGODB_BENCHMARK_PORT``
+for another one, and are skipped when it cannot be reached. Their database is dropped at the end.
+
+The memory tests of ``test_memory.py`` fail when a model uses more bytes than its budget in
+``INSTANCE_BUDGETS`` of ``benchmarks/memory.py``, or when iterating leaves memory allocated for every model. Run
+``python -m benchmarks.memory`` for the report.
+"""
+import pytest
+
+from benchmarks.app import BENCHMARK_DB, create_app, server_error
+from benchmarks.models import DEEP_MODELS, DOCUMENTS, WIDE_MODELS, deep_document, wide_document, with_id
+from flask_mongodb.cli.utils import start_database
+
+
+@pytest.fixture(scope='session')
+def application():
+    _app = create_app()
+    with _app.app_context():
+        yield _app
+    _app.mongo.disconnect()
+
+
+@pytest.fixture(scope='session')
+def mongo(application):
+    _mongo = application.mongo
+    error = server_error(_mongo)
+    if error is not None:
+        pytest.skip(f'MongoDB is not available: {error}')
+    client = _mongo.connections['main'].client
+    client.drop_database(BENCHMARK_DB)
+    start_database(_mongo, application, 'main')
+    yield _mongo
+    client.drop_database(BENCHMARK_DB)
+
+
+@pytest.fixture(scope='session')
+def populated(mongo):
+    for width, model_class in WIDE_MODELS.items():
+        model_class().collection.insert_many([with_id(wide_document(width)) for _ in range(DOCUMENTS)])
+    for depth, model_class in DEEP_MODELS.items():
+        model_class().collection.insert_many([with_id(deep_document(depth)) for _ in range(DOCUMENTS)])
+    return mongo
@@ -0,0 +1,52 @@
+"""
+Compare the JSON encoders of ``to_document(json_parsed=True)`` with ``bson.json_util.dumps``.
+
+    python benchmarks/encoding.py [--number N]
+"""
+import argparse
+import datetime
+import timeit
+
+from bson import ObjectId, json_util
+
+from flask_mongodb.utils import encoding
+
+
+def make_document():
+    now = datetime.datetime(2024, 1, 2, 3, 4, 5, 123000)
+    return {
+        '_id': ObjectId(),
+        'title': 'A typical document',
+        'author_id': ObjectId(),
+        'created': now,
+        'updated': now,
+        'views': 1234,
+        'rating': 4.5,
+        'published': True,
+        'tags': ['mongodb', 'flask', 'python'],
+        'address': {'street': '1 Main St', 'city': 'San Juan', 'zip': '00901',
+                    'location': {'lat': 18.46, 'lng': -66.1}},
+        'comments': [{'_id': ObjectId(), 'user_id': ObjectId(), 'text': 'Nice post', 'created': now}
+                     for _ in range(5)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000, help='Documents encoded by each encoder')
+    args = parser.parse_args()
+
+    document = make_document()
+    encoders = {'json_util.dumps': json_util.dumps, 'JSONEncoder': encoding.JSONEncoder().dumps}
+    if encoding.orjson is not None:
+        encoders['OrjsonEncoder'] = encoding.OrjsonEncoder().dumps
+
+    baseline = None
+    for name, dumps in encoders.items():
+        seconds = min(timeit.repeat(lambda: dumps(document), number=args.number, repeat=3))
+        baseline = baseline or seconds
+        print(f'{name:<16} {seconds / args.number * 1e6:8.2f} us/document  {baseline / seconds:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Memory footprint of the models, measured with tracemalloc: the bytes per hydrated model, and the peak
+and retained memory of iterating DocumentSets. The DocumentSets are iterated when the server of the
+benchmarks is available.
+
+    python -m benchmarks.memory [--documents N]
+"""
+import argparse
+import gc
+import tracemalloc
+import typing as t
+
+from bson import ObjectId
+
+from flask_mongodb.models.document_set import BaseDocumentSet
+
+KiB = 1024
+# Bytes per hydrated model that the memory tests allow, raise them with the reason when a change needs more
+INSTANCE_BUDGETS = {
+    'Wide5': 2.5 * KiB,
+    'Wide20': 6.5 * KiB,
+    'Wide50': 16 * KiB,
+    'Deep1': 2.5 * KiB,
+    'Deep3': 5 * KiB,
+    'Deep5': 7.5 * KiB,
+    'Post': 2.5 * KiB,
+}
+# Bytes per model that may stay allocated after iterating a DocumentSet, more is a leak. It is measured
+# as the difference between iterations of two numbers of models, see measure_retention
+RETAINED_PER_MODEL = 16
+
+
+class MemoryTrace:
+    """Memory allocated while the context runs, relative to the memory allocated when it starts"""
+    def __enter__(self):
+        gc.collect()
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._peak = self.peak()
+        if self._started:
+            tracemalloc.stop()
+        return False
+
+    def current(self) -> int:
+        return tracemalloc.get_traced_memory()[0] - self._baseline
+
+    def peak(self) -> int:
+        if not tracemalloc.is_tracing():
+            return self._peak
+        return tracemalloc.get_traced_memory()[1] - self._baseline
+
+
+def measure_hydration(model_class, document: t.Dict[str, t.Any], count: int = 2000) -> t.Dict[str, float]:
+    """
+    Build ``count`` models from copies of a document, as DocumentSets do, and keep them.
+
+    :return: The ``bytes_per_instance`` of the models and the ``peak`` memory, in bytes
+    """
+    docuset = BaseDocumentSet(model_class())
+    documents = [{**document, '_id': ObjectId()} for _ in range(count)]
+    models: t.List[t.Any] = [None] * count
+    # Caches filled by the first model are not part of the size of the models
+    docuset._model_representation(documents[0])
+    with MemoryTrace() as trace:
+        for index, doc in enumerate(documents):
+            models[index] = docuset._model_representation(doc)
+        used = trace.current()
+    return {'bytes_per_instance': used / count, 'peak': trace.peak()}
+
+
+def measure_iteration(iterable_factory: t.Callable[[], t.Iterable]) -> t.Dict[str, int]:
+    """
+    Iterate the models of a DocumentSet, or any iterable of models, without keeping them. The iterable
+    is created by the factory inside the trace, so its buffers are counted.
+
+    :return: The number of ``models``, the ``peak`` memory while iterating and the memory ``retained``
+        after the models and the iterable are released, in bytes
+    """
+    # The first model fills the caches, e.g. the collection handle
+    next(iter(iterable_factory()), None)
+    with MemoryTrace() as trace:
+        models = 0
+        for _ in iterable_factory():
+            models += 1
+        gc.collect()
+        retained = trace.current()
+    return {'models': models, 'peak': trace.peak(), 'retained': retained}
+
+
+def measure_retention(iterable_factory: t.Callable[[int], t.Iterable],
+                      counts: t.Tuple[int, int] = (1000, 2000)) -> t.Dict[str, float]:
+    """
+    Iterate ``counts[0]`` and ``counts[1]`` models without keeping them and compare the memory retained
+    after each iteration. Caches filled once, e.g. on the reference field path, retain the same memory
+    for both counts, a leak retains memory for every model.
+
+    :param iterable_factory: Function that gets the iterable of a number of models
+    :return: The ``models`` and the ``peak`` memory of the larger iteration, the ``retained`` memory of
+        both iterations, in bytes, and the ``retained_per_model``
+    """
+    small, large = (measure_iteration(lambda: iterable_factory(count)) for count in counts)
+    return {
+        'models': large['models'],
+        'peak': large['peak'],
+        'retained': (small['retained'], large['retained']),
+        'retained_per_model': (large['retained'] - small['retained']) / (large['models'] - small['models']),
+    }
+
+
+def main():
+    from benchmarks.app import create_app, server_error
+    from benchmarks.models import model_documents
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=2000, help='Models built and documents iterated')
+    args = parser.parse_args()
+
+    cases = model_documents()
+    app = create_app()
+    with app.app_context():
+        print(f'{"Model":<8} {"bytes/model":>12} {"budget":>8} {"peak KiB":>10}')
+        for model_class, document in cases:
+            hydration = measure_hydration(model_class, document, args.documents)
+            budget = INSTANCE_BUDGETS.get(model_class.__name__, 0)
+            print(f'{model_class.__name__:<8} {hydration["bytes_per_instance"]:12.0f} {budget:8.0f} '
+                  f'{hydration["peak"] / KiB:10.1f}')
+
+        error = server_error(app.mongo)
+        if error is not None:
+            print(f'DocumentSets are not iterated, MongoDB is not available: {error}')
+            return
+        print(f'\n{"Model":<8} {"models":>8} {"peak KiB":>10} {"retained":>10} {"per model":>10}')
+        for model_class, document in cases:
+            collection = model_class().collection
+            collection.delete_many({})
+            collection.insert_many([{**document, '_id': ObjectId()} for _ in range(args.documents)])
+            iteration = measure_iteration(lambda: model_class().manager.all())
+            retention = measure_retention(lambda count: model_class().manager.all().limit(count),
+                                          (args.documents // 2, args.documents))
+            print(f'{model_class.__name__:<8} {iteration["models"]:8} {iteration["peak"] / KiB:10.1f} '
+                  f'{iteration["retained"]:10} {retention["retained_per_model"]:10.1f}')
+            collection.drop()
+
+
+if __name__ == '__main__':
+    main()
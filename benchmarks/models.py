@@ -0,0 +1,85 @@
+"""
+Models of the benchmarks. The wide models have ``width`` fields of the common field types, the deep
+models an embedded document nested ``depth`` levels.
+"""
+import datetime
+import typing as t
+
+from bson import ObjectId
+
+from flask_mongodb.models import CollectionModel, fields
+
+WIDTHS = (5, 20, 50)
+DEPTHS = (1, 3, 5)
+# Documents of the collections of the wide and deep models in the query benchmarks
+DOCUMENTS = 1000
+
+_FIELD_TYPES = (fields.StringField, fields.IntegerField, fields.FloatField, fields.BooleanField, fields.DatetimeField)
+_VALUES = ('benchmark', 42, 4.5, True, datetime.datetime(2024, 1, 2, 3, 4, 5))
+
+
+def _wide_model(width: int) -> t.Type[CollectionModel]:
+    attributes = {'collection_name': f'bench_wide_{width}'}
+    for index in range(width):
+        attributes[f'field_{index}'] = _FIELD_TYPES[index % len(_FIELD_TYPES)]()
+    return type(f'Wide{width}', (CollectionModel,), attributes)
+
+
+def _embedded_field(depth: int) -> fields.EmbeddedDocumentField:
+    properties = {'name': fields.StringField(), 'count': fields.IntegerField()}
+    if depth > 1:
+        properties['child'] = _embedded_field(depth - 1)
+    return fields.EmbeddedDocumentField(properties=properties)
+
+
+def _deep_model(depth: int) -> t.Type[CollectionModel]:
+    attributes = {'collection_name': f'bench_deep_{depth}', 'title': fields.StringField(),
+                  'document': _embedded_field(depth)}
+    return type(f'Deep{depth}', (CollectionModel,), attributes)
+
+
+WIDE_MODELS = {width: _wide_model(width) for width in WIDTHS}
+DEEP_MODELS = {depth: _deep_model(depth) for depth in DEPTHS}
+# The models are registered by the names of the module
+globals().update({model_class.__name__: model_class
+                  for model_class in (*WIDE_MODELS.values(), *DEEP_MODELS.values())})
+
+
+class Author(CollectionModel):
+    collection_name = 'bench_authors'
+
+    name = fields.StringField()
+    email = fields.StringField()
+
+
+class Post(CollectionModel):
+    collection_name = 'bench_posts'
+
+    author = fields.ReferenceIdField(Author, related_name='posts')
+    title = fields.StringField()
+    body = fields.StringField()
+
+
+def wide_document(width: int) -> t.Dict[str, t.Any]:
+    """Document of the wide model with ``width`` fields, without _id"""
+    return {f'field_{index}': _VALUES[index % len(_VALUES)] for index in range(width)}
+
+
+def deep_document(depth: int) -> t.Dict[str, t.Any]:
+    """Document of the deep model with ``depth`` levels, without _id"""
+    document: t.Dict[str, t.Any] = {'name': f'level {depth}', 'count': depth}
+    for level in range(depth - 1, 0, -1):
+        document = {'name': f'level {level}', 'count': level, 'child': document}
+    return {'title': 'benchmark', 'document': document}
+
+
+def with_id(document: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    return {'_id': ObjectId(), **document}
+
+
+def model_documents() -> t.List[t.Tuple[t.Type[CollectionModel], t.Dict[str, t.Any]]]:
+    """Every model of the benchmarks with a document of it, without _id"""
+    documents = [(model_class, wide_document(width)) for width, model_class in WIDE_MODELS.items()]
+    documents += [(model_class, deep_document(depth)) for depth, model_class in DEEP_MODELS.items()]
+    documents.append((Post, {'author_id': ObjectId(), 'title': 'benchmark', 'body': 'benchmark'}))
+    return documents
@@ -0,0 +1,42 @@
+"""Memory budgets of the models, see ``benchmarks/memory.py``"""
+import pytest
+
+from benchmarks.memory import INSTANCE_BUDGETS, RETAINED_PER_MODEL, measure_hydration, measure_retention
+from benchmarks.models import DEEP_MODELS, DOCUMENTS, WIDE_MODELS, model_documents, with_id
+from flask_mongodb.models.document_set import BaseDocumentSet
+
+MODEL_DOCUMENTS = model_documents()
+
+
+@pytest.mark.parametrize('model_class,document', MODEL_DOCUMENTS,
+                         ids=[model_class.__name__ for model_class, _ in MODEL_DOCUMENTS])
+def test_instance_budget(application, model_class, document):
+    hydration = measure_hydration(model_class, document, count=1000)
+    budget = INSTANCE_BUDGETS[model_class.__name__]
+    assert hydration['bytes_per_instance'] <= budget, \
+        f'{model_class.__name__} uses {hydration["bytes_per_instance"]:.0f} bytes per model, the budget is {budget}'
+
+
+@pytest.mark.parametrize('model_class,document', MODEL_DOCUMENTS,
+                         ids=[model_class.__name__ for model_class, _ in MODEL_DOCUMENTS])
+def test_hydration_releases_models(application, model_class, document):
+    # Models built one at a time and released, as iterating a DocumentSet does
+    docuset = BaseDocumentSet(model_class())
+    documents = [with_id(document) for _ in range(2000)]
+    retention = measure_retention(lambda count: (docuset._model_representation(doc) for doc in documents[:count]))
+
+    assert retention['models'] == 2000
+    # Models have reference cycles, they are released when the garbage collector runs
+    assert retention['peak'] <= retention['models'] * INSTANCE_BUDGETS[model_class.__name__] / 4
+    assert retention['retained_per_model'] <= RETAINED_PER_MODEL
+
+
+@pytest.mark.parametrize('model_class', [WIDE_MODELS[20], DEEP_MODELS[5]], ids=['Wide20', 'Deep5'])
+def test_iterate_documentset(populated, model_class):
+    retention = measure_retention(lambda count: model_class().manager.all().limit(count),
+                                  (DOCUMENTS // 2, DOCUMENTS))
+
+    assert retention['models'] == DOCUMENTS
+    # The models are not kept, the peak is the cursor batch of documents
+    assert retention['peak'] <= DOCUMENTS * INSTANCE_BUDGETS[model_class.__name__] / 2
+    assert retention['retained_per_model'] <= RETAINED_PER_MODEL
@@ -0,0 +1,74 @@
+"""Benchmarks of the models and fields, without the server"""
+import pytest
+
+from benchmarks.models import DEEP_MODELS, DEPTHS, WIDE_MODELS, WIDTHS, deep_document, wide_document, with_id
+from flask_mongodb.cli.utils import define_schema_validator
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_instantiate_wide(benchmark, width):
+    model_class, document = WIDE_MODELS[width], wide_document(width)
+    benchmark(lambda: model_class(**document))
+
+
+@pytest.mark.parametrize('depth', DEPTHS)
+def test_instantiate_deep(benchmark, depth):
+    model_class, document = DEEP_MODELS[depth], deep_document(depth)
+    benchmark(lambda: model_class(**document))
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_set_model_data(benchmark, width):
+    # What hydrating a document of a DocumentSet costs, without the copy of the model
+    model, document = WIDE_MODELS[width](), with_id(wide_document(width))
+    benchmark(model.set_model_data, document, initial=True)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_to_document_wide(benchmark, width):
+    model = WIDE_MODELS[width]().set_model_data(with_id(wide_document(width)), initial=True)
+    benchmark(model.to_document)
+
+
+@pytest.mark.parametrize('depth', DEPTHS)
+def test_to_document_deep(benchmark, depth):
+    model = DEEP_MODELS[depth]().set_model_data(with_id(deep_document(depth)), initial=True)
+    benchmark(model.to_document)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_to_document_json(benchmark, width):
+    model = WIDE_MODELS[width]().set_model_data(with_id(wide_document(width)), initial=True)
+    benchmark(model.to_document, json_parsed=True)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_modified_fields_insert(benchmark, width):
+    model = WIDE_MODELS[width](**wide_document(width))
+    benchmark(model.modified_fields, insert=True)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_modified_fields_update(benchmark, width):
+    model = WIDE_MODELS[width]().set_model_data(with_id(wide_document(width)), initial=True)
+    model['field_0'] = 'changed'
+    benchmark(model.modified_fields)
+
+
+@pytest.mark.parametrize('depth', DEPTHS)
+def test_modified_fields_deep(benchmark, depth):
+    model = DEEP_MODELS[depth]().set_model_data(with_id(deep_document(depth)), initial=True)
+    model['title'] = 'changed'
+    benchmark(model.modified_fields)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_schema_generation(benchmark, width):
+    model = WIDE_MODELS[width]()
+    benchmark(define_schema_validator, model)
+
+
+@pytest.mark.parametrize('depth', DEPTHS)
+def test_schema_generation_deep(benchmark, depth):
+    model = DEEP_MODELS[depth]()
+    benchmark(define_schema_validator, model)
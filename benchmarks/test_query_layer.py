@@ -0,0 +1,68 @@
+"""Benchmarks of the queries and writes of the managers, against a local mongod"""
+import pytest
+
+from benchmarks.models import DEEP_MODELS, DEPTHS, DOCUMENTS, WIDE_MODELS, WIDTHS, Author, Post, wide_document
+from flask_mongodb.models.shitfs.shift import Shift
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_iterate_wide(benchmark, populated, width):
+    manager = WIDE_MODELS[width]().manager
+    models = benchmark(lambda: list(manager.all()))
+    assert len(models) == DOCUMENTS
+
+
+@pytest.mark.parametrize('depth', DEPTHS)
+def test_iterate_deep(benchmark, populated, depth):
+    manager = DEEP_MODELS[depth]().manager
+    models = benchmark(lambda: list(manager.all()))
+    assert len(models) == DOCUMENTS
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_raw_batches(benchmark, populated, width):
+    # The same query without building models, the difference is the cost of hydration
+    manager = WIDE_MODELS[width]().manager
+    batches = benchmark(lambda: list(manager.all().raw_batches(100)))
+    assert sum(len(batch) for batch in batches) == DOCUMENTS
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_find_one(benchmark, populated, width):
+    model_class = WIDE_MODELS[width]
+    pk = model_class().collection.find_one({}, {'_id': 1})['_id']
+    manager = model_class().manager
+    assert benchmark(manager.find_one, _id=pk).pk == pk
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_save_insert(benchmark, mongo, width):
+    model_class, document = WIDE_MODELS[width], wide_document(width)
+    benchmark(lambda: model_class(**document).save())
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_save_update(benchmark, mongo, width):
+    model = WIDE_MODELS[width](**wide_document(width))
+    model.save()
+    values = iter(range(10 ** 9))
+
+    def update():
+        model['field_0'] = f'update {next(values)}'
+        return model.save()
+
+    benchmark(update)
+
+
+def test_reference_resolution(benchmark, mongo):
+    author = Author(name='Author', email='author@example.com')
+    author.save()
+    post = Post(author=author.pk, title='Post', body='Body')
+    post.save()
+    assert benchmark(lambda: post.author.reference).pk == author.pk
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+def test_shift_verify(benchmark, mongo, width):
+    model_class = WIDE_MODELS[width]
+    benchmark(lambda: Shift(model_class).verify())
@@ -15,6 +15,7 @@ else:
 from flask_mongodb.core.mongo import MongoDB
 from flask_mongodb.core import exceptions
 from flask_mongodb.core.mixins import ModelMixin
+from flask_mongodb.core.sessions import transaction
 from flask_mongodb.models import CollectionModel
 from flask_mongodb.serializers import Serializer, ModelSerializer
 from flask_mongodb.globals import get_current_mongo, current_mongo
@@ -1,10 +1,23 @@
+import json
 import os
 
 import click
+import flask.cli
 from click import echo
 
 from flask_mongodb.core.mongo import MongoDB
-from flask_mongodb.cli.db_shifts import db_shift
+from flask_mongodb.cli.db_shifts import db_shift, jobs_option
+from flask_mongodb.cli.utils import format_size, get_collection_stats, get_models_from_app
+from flask_mongodb.utils.concurrency import map_concurrently
+
+STATS_SORT_KEYS = {
+    'name': 'collection',
+    'count': 'count',
+    'size': 'size',
+    'storage': 'storage_size',
+    'avg-size': 'avg_document_size',
+    'index-size': 'index_size',
+}
 
 
 @click.group('flask-mongodb', help=f"The FlaskMongoDB CLI tool")
@@ -59,6 +72,39 @@ def create_model(path, package):
     echo(path)
 
 
+@cli.command('stats', help='Show the statistics of the model collections')
+@click.option('--database', '-d', default='all', help='Specify database, default is all of them')
+@click.option('--sort', '-s', 'sort_by', default='name', type=click.Choice(list(STATS_SORT_KEYS)),
+              help='Sort the collections by (default: name)')
+@click.option('--reverse', '-r', is_flag=True, help='Sort in descending order')
+@click.option('--json', 'as_json', is_flag=True, help='Output JSON')
+@jobs_option
+@flask.cli.with_appcontext
+def stats(database, sort_by, reverse, as_json, jobs):
+    from flask import current_app
+    from flask_mongodb import current_mongo
+
+    models = [model for model in (get_models_from_app(current_app) or {}).values()
+              if database == 'all' or model.db_alias == database]
+    collections = map_concurrently(lambda model_class: get_collection_stats(current_mongo, model_class), models, jobs)
+    collections.sort(key=lambda collection: collection[STATS_SORT_KEYS[sort_by]], reverse=reverse)
+
+    if as_json:
+        echo(json.dumps(collections, indent=2))
+        return
+    if not collections:
+        echo('No collections')
+        return
+    for collection in collections:
+        echo(f"{collection['database']}.{collection['collection']}: {collection['count']} documents, "
+             f"{format_size(collection['size'])} data, {format_size(collection['storage_size'])} storage, "
+             f"avg {format_size(collection['avg_document_size'])} per document, "
+             f"{format_size(collection['index_size'])} indexes, "
+             f"{format_size(collection['validator_size'])} validator")
+        for index in collection['indexes']:
+            echo(f"    {index['name']}: {format_size(index['size'])}, {index['ops']} operations")
+
+
 cli.add_command(db_shift)
 
 
@@ -3,10 +3,16 @@ import flask.cli
 import pymongo
 from click import echo
 
-from flask_mongodb.cli.utils import add_new_collection, create_collection, start_database, get_models_from_app
+from flask_mongodb.cli.utils import (add_new_collection, create_collection, format_size, get_models_from_app,
+                                     start_database)
 from flask_mongodb.core.exceptions import NoDatabaseShiftingRequired
+from flask_mongodb.core.indexes import advise_indexes, get_index_models
 from flask_mongodb.models.shitfs.history import create_db_shift_history
 from flask_mongodb.models.shitfs.shift import Shift
+from flask_mongodb.utils.concurrency import map_concurrently
+
+jobs_option = click.option('--jobs', '-j', default=1, type=click.IntRange(min=1),
+                           help='Number of collections to process concurrently (default: 1)')
 
 
 @click.group('shift', help='Shift the database to make changes')
@@ -40,32 +46,56 @@ def show_shifts(database, collection, order):
             echo(f'Collection: {d.db_collection.data} | Datetime: {d.shifted.data}')
 
 
+def _echo_estimation(estimation: dict, throttle: int):
+    echo(f"{estimation['collection']}: {estimation['count']} documents, {format_size(estimation['size'])} "
+         f"(avg {format_size(estimation['avg_document_size'])} per document)")
+    for change in estimation['changes']:
+        if change['filter'] is None:
+            detail = 'schema only'
+        else:
+            detail = f"{change['documents']} documents"
+            if change['indexed'] is not None:
+                detail += ', indexed' if change['indexed'] else ', not indexed'
+        echo(f"    {change['change']} field {change['field']}: {detail}")
+    echo(f"    estimated runtime: {estimation['runtime']:.1f}s at {throttle} documents/s")
+
+
 @db_shift.command('examine', help="Determine if must run a shift")
 @click.option('--database', '-d', default='main', help='Specify database')
 @click.option('--collection', '-c', help='Specify model collection name')
+@click.option('--estimate', '-e', is_flag=True, help='Estimate the cost of the pending changes')
+@click.option('--throttle', '-t', type=click.IntRange(min=1),
+              help='Documents updated per second by the shift, for the runtime estimation '
+                   '(default: MONGODB_SHIFT_THROTTLE)')
+@jobs_option
 @flask.cli.with_appcontext
-def examine(database, collection):
+def examine(database, collection, estimate, throttle, jobs):
     from flask import current_app
 
     # Get models from app and store in models_list
     models = get_models_from_app(current_app)
-    examination = {}
+    throttle = throttle or current_app.config['MONGODB_SHIFT_THROTTLE']
 
     if collection and collection in models:
         # This will examine one collection
-        model_class = models[collection]
-        shift = Shift(model_class)
-        examination[collection] = shift.examine()
+        models = {collection: models[collection]}
+
+    if estimate:
+        results = map_concurrently(lambda model_class: Shift(model_class).estimate(throttle), models.values(), jobs)
     else:
-        for name, model_class in models.items():
-            shift = Shift(model_class)
-            examination[name] = shift.examine()
+        results = map_concurrently(lambda model_class: Shift(model_class).examine(), models.values(), jobs)
+    examination = dict(zip(models.keys(), results))
 
     if any(list(examination.values())):
         echo(f'The following collections in {database} need shifting: ')
         for name, val in examination.items():
-            if val:
+            if val and estimate:
+                _echo_estimation(val, throttle)
+            elif val:
                 echo(name)
+        if estimate:
+            runtime = sum(val['runtime'] for val in examination.values() if val)
+            echo(f'Total estimated runtime: {runtime:.1f}s')
     else:
         echo('No shifting required')
 
@@ -73,27 +103,37 @@ def examine(database, collection):
 @db_shift.command('run', help='Shift the database')
 @click.option('--database', '-d', default='main', help='Specify database')
 @click.option('--collection', '-c', help='Specify model collection name')
+@click.option('--throttle', '-t', type=click.IntRange(min=1),
+              help='Documents updated per second by every change (default: MONGODB_SHIFT_THROTTLE)')
+@jobs_option
 @flask.cli.with_appcontext
-def run(database, collection):
+def run(database, collection, throttle, jobs):
     from flask import current_app
     from flask_mongodb import current_mongo
 
+    throttle = throttle or current_app.config['MONGODB_SHIFT_THROTTLE']
+
+    def _shift(model_class):
+        shift = Shift(model_class)
+        try:
+            return shift, shift.shift(throttle)
+        except NoDatabaseShiftingRequired:
+            # Ignore collections that do not need shifting
+            return shift, False
+
     models = get_models_from_app(current_app)
     ShiftHistory = current_mongo.collections[database]['shift_history']()
 
     if collection:
         models = {collection: models[collection]}
 
-    shifted = False
-    for m in models.values():
-        shift = Shift(m)
-        try:
-            shifted = shift.shift()
-        except NoDatabaseShiftingRequired:
-            # Ignore collections that do not need shifting
-            continue
+    # Shifts run concurrently, but the history is written in model order
+    results = map_concurrently(_shift, models.values(), jobs)
 
-        if shifted:
+    shifted = False
+    for m, (shift, collection_shifted) in zip(models.values(), results):
+        if collection_shifted:
+            shifted = True
             ShiftHistory.manager.insert_one(
                 db_collection=m.collection_name,
                 new_fields=shift.new_fields or None,
@@ -112,17 +152,17 @@ def run(database, collection):
               help='Run in all databases, disables the database and path options')
 @click.option('--database', '-d', default='main', help='Specify database')
 @click.option('--path', '-p', help='Model path with dot notation')
+@jobs_option
 @flask.cli.with_appcontext
-def start(all, database: str, path: str):
+def start(all, database: str, path: str, jobs: int):
     from flask import current_app
     from flask_mongodb import current_mongo
 
     if all:
-        start_database(current_mongo, current_app)
+        start_database(current_mongo, current_app, jobs=jobs)
 
-        for db_name in current_mongo.connections.keys():
-            HistoryModel = create_db_shift_history(db_name)
-            create_collection(current_mongo, HistoryModel)
+        map_concurrently(lambda db_name: create_collection(current_mongo, create_db_shift_history(db_name)),
+                         current_mongo.connections.keys(), jobs)
     else:
         # Check database is in the configurations
         if database not in current_app.config['DATABASE'].keys():
@@ -133,7 +173,7 @@ def start(all, database: str, path: str):
             current_app.config['MODELS'].clear()
             current_app.config['MODELS'].append(path)
 
-        start_database(current_mongo, current_app, database)
+        start_database(current_mongo, current_app, database, jobs=jobs)
         HistoryModel = create_db_shift_history(database)
         create_collection(current_mongo, HistoryModel)
 
@@ -142,8 +182,9 @@ def start(all, database: str, path: str):
 
 @db_shift.command('add-collections', help='Add new collections to the database')
 @click.option('--database', '-d', default='main', help='Database to run the addition on')
+@jobs_option
 @flask.cli.with_appcontext
-def add_collections(database):
+def add_collections(database, jobs):
     from flask import current_app
     from flask_mongodb import current_mongo
 
@@ -157,7 +198,60 @@ def add_collections(database):
         click.echo('Run the start-db command first')
         return
 
-    done = add_new_collection(current_mongo, current_app, database)
+    done = add_new_collection(current_mongo, current_app, database, jobs=jobs)
     click.echo('Addition of collection complete')
 
     return done
+
+
+def _format_index(keys) -> str:
+    return ', '.join(f'{field}: {direction}' for field, direction in keys)
+
+
+@db_shift.command('advise-indexes', help='Suggest indexes from the recorded query shapes')
+@click.option('--database', '-d', default='main', help='Specify database')
+@click.option('--collection', '-c', help='Specify model collection name')
+@click.option('--shapes-database', '-s',
+              help='Database of the recorded query shapes (default: MONGODB_QUERY_SHAPES_DATABASE)')
+@click.option('--min-count', '-m', default=1, type=click.IntRange(min=1),
+              help='Minimum number of executions of a query shape to consider it (default: 1)')
+@jobs_option
+@flask.cli.with_appcontext
+def advise(database, collection, shapes_database, min_count, jobs):
+    from flask import current_app
+    from flask_mongodb import current_mongo
+
+    shapes_database = shapes_database or current_app.config['MONGODB_QUERY_SHAPES_DATABASE']
+    if database not in current_mongo.connections or shapes_database not in current_mongo.connections:
+        echo('Database does not exist')
+        return
+    shapes = current_mongo.connections[shapes_database][current_app.config['MONGODB_QUERY_SHAPES_COLLECTION']]
+    models = {name: model for name, model in (get_models_from_app(current_app) or {}).items()
+              if model.db_alias == database and (not collection or name == collection)}
+
+    def _advise(model_class):
+        model_collection = current_mongo.get_collection(model_class)
+        recorded = shapes.find({'database': model_collection.database.name, 'collection': model_class.collection_name,
+                                'count': {'$gte': min_count}})
+        return advise_indexes(recorded, model_collection.index_information(), get_index_models(model_class.indexes),
+                              model_collection.aggregate([{'$indexStats': {}}]))
+
+    advice = dict(zip(models.keys(), map_concurrently(_advise, models.values(), jobs)))
+    if not any(any(report.values()) for report in advice.values()):
+        echo('No index changes to advise')
+        return
+    for name, report in advice.items():
+        if not any(report.values()):
+            continue
+        echo(f'{name}:')
+        for suggestion in report['suggested']:
+            echo(f"    create {{{_format_index(suggestion['keys'])}}}: {suggestion['count']} queries, "
+                 f"{suggestion['total_ms']:.1f} ms in total")
+            for shape in suggestion['shapes']:
+                echo(f'        {shape}')
+        for index_name in report['missing']:
+            echo(f'    declared index {index_name} does not exist')
+        for index_name in report['unused']:
+            echo(f'    index {index_name} is not used')
+        for index_name, other_name in report['redundant']:
+            echo(f'    index {index_name} is redundant with {other_name}')
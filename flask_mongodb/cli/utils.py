@@ -3,15 +3,18 @@ import traceback
 import typing as t
 from copy import deepcopy
 
+import bson
 from flask import Flask
 from pymongo.errors import OperationFailure
 from werkzeug.utils import import_string
 
 from flask_mongodb import MongoDB
 from flask_mongodb.core.exceptions import CouldNotRegisterCollection, FieldError
+from flask_mongodb.core.indexes import get_index_models
 from flask_mongodb.core.wrappers import MongoCollection
 from flask_mongodb.models.collection import CollectionModel
 from flask_mongodb.models.fields import EmbeddedDocumentField, EnumField, ReferenceIdField, StructuredArrayField
+from flask_mongodb.utils.concurrency import map_concurrently
 
 
 def _enum_field_validators(field):
@@ -200,9 +203,11 @@ def create_collection(mongo: MongoDB, collection_cls: t.Type[CollectionModel]):
     database = mongo.connections[_instance.db_alias]
     try:
         # Will first try to create a collection
-        MongoCollection(database, _instance.collection_name, create=True,
-                        validator=schema_validators,
-                        validationLevel=_instance.validation_level if not _instance.schemaless else None)
+        collection = MongoCollection(database, _instance.collection_name, create=True,
+                                     validator=schema_validators,
+                                     validationLevel=_instance.validation_level if not _instance.schemaless else None)
+        if _instance.indexes:
+            collection.create_indexes(get_index_models(_instance.indexes))
     except OperationFailure as exc:
         if exc.code == 48:  # Collection exists
             raise CouldNotRegisterCollection('Collection already exists')
@@ -210,59 +215,59 @@ def create_collection(mongo: MongoDB, collection_cls: t.Type[CollectionModel]):
         sys.exit(1)  # Stop execution
 
 
-def start_database(mongo: MongoDB, app: Flask, database='all'):
-    created_collections = []
+def _collect_model_classes(app: Flask, database='all') -> t.List[t.Type[CollectionModel]]:
+    model_classes: t.List[t.Type[CollectionModel]] = []
+    collection_names: t.List[str] = []
 
     # Get models from the app and store in models_list
     models_list = get_model_classes_from_app(app)
-    if not models_list:
-        return None  # If there are no models, return None
 
-    # Iterate over the list and register the models
     for m in models_list:
         module_contents = dir(m)  # Get contents of the module
         for cont in module_contents:
             obj = getattr(m, cont)  # Get each object
 
-            # Register the obj as a collection if it has the collection_name
-            # and db_alias attributes which all models should have
+            # Only consider objects with the collection_name and db_alias attributes
+            # which all models should have
             if hasattr(obj, 'collection_name') and hasattr(obj, 'db_alias'):
                 if obj.collection_name is None:
                     # When the collection name is None, it is the base model class
                     continue
-                if obj.collection_name in created_collections:
+                if obj.collection_name in collection_names:
                     # This is to avoid moments when the models module imports another model
-                    # which might have already been created
+                    # which might have already been collected
                     continue
-                if database == 'all':
-                    create_collection(mongo, obj)
-                elif obj.db_alias == database:
-                    create_collection(mongo, obj)
-                created_collections.append(obj.collection_name)
+                if database != 'all' and obj.db_alias != database:
+                    continue
+                model_classes.append(obj)
+                collection_names.append(obj.collection_name)
+    return model_classes
 
 
-def add_new_collection(mongo: MongoDB, app: Flask, database) -> bool:
-    collections_added: t.List[str] = []
+def start_database(mongo: MongoDB, app: Flask, database='all', jobs=1):
+    model_classes = _collect_model_classes(app, database)
+    if not model_classes:
+        return None  # If there are no models, return None
 
-    # Get models from the app and store in models_list
-    models_list = get_model_classes_from_app(app)
-    if not models_list:
+    # Collections are independent of each other, so they can be created concurrently
+    map_concurrently(lambda model_class: create_collection(mongo, model_class), model_classes, jobs)
+
+
+def add_new_collection(mongo: MongoDB, app: Flask, database, jobs=1) -> bool:
+    def _add_collection(model_class: t.Type[CollectionModel]) -> t.Optional[str]:
+        try:
+            create_collection(mongo, model_class)
+        except CouldNotRegisterCollection:
+            return None
+        return model_class.collection_name
+
+    model_classes = _collect_model_classes(app)
+    if not model_classes:
         return False  # If there are no models, return False
 
-    # Iterate over the list and create the new collections
-    for m in models_list:
-        module_contents = dir(m)
-        for cont in module_contents:
-            obj = getattr(m, cont)
-            if hasattr(obj, 'collection_name') and hasattr(obj, 'db_alias'):
-                if obj.collection_name is None:
-                    # When the collection name is None, it is the base model class
-                    continue
-                try:
-                    create_collection(mongo, obj)
-                    collections_added.append(obj.collection_name)
-                except CouldNotRegisterCollection:
-                    continue
+    # Results keep the order of the models, so the history record is deterministic
+    added = map_concurrently(_add_collection, model_classes, jobs)
+    collections_added: t.List[str] = [name for name in added if name is not None]
 
     if collections_added:
         shift_model = mongo.collections[database]['shift_history']()
@@ -274,6 +279,64 @@ def add_new_collection(mongo: MongoDB, app: Flask, database) -> bool:
     return True
 
 
+def format_size(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+def get_storage_stats(collection: MongoCollection) -> t.Dict[str, t.Any]:
+    """
+    Get the storage statistics of a collection from ``$collStats``, added up over the shards of a sharded
+    collection, with the size of every index in ``index_sizes``.
+    """
+    count = size = storage_size = index_size = 0
+    index_sizes: t.Dict[str, int] = {}
+    # A sharded collection returns one document per shard
+    for stats in collection.aggregate([{'$collStats': {'storageStats': {}}}]):
+        storage_stats = stats.get('storageStats', {})
+        count += storage_stats.get('count', 0)
+        size += storage_stats.get('size', 0)
+        storage_size += storage_stats.get('storageSize', 0)
+        index_size += storage_stats.get('totalIndexSize', 0)
+        for name, index_bytes in storage_stats.get('indexSizes', {}).items():
+            index_sizes[name] = index_sizes.get(name, 0) + index_bytes
+    return {
+        'count': count,
+        'size': size,
+        'storage_size': storage_size,
+        'avg_document_size': size / count if count else 0,
+        'index_size': index_size,
+        'index_sizes': index_sizes,
+    }
+
+
+def get_collection_stats(mongo: MongoDB, collection_cls: t.Type[CollectionModel]) -> t.Dict[str, t.Any]:
+    """
+    Get the storage statistics of the collection of a model, see :func:`get_storage_stats`, with the size and the
+    usage counter from ``$indexStats`` of every index and the BSON size of the schema validator.
+    """
+    collection = mongo.get_collection(collection_cls)
+    storage_stats = get_storage_stats(collection)
+    indexes: t.Dict[str, t.Dict[str, t.Any]] = {name: {'name': name, 'size': index_bytes, 'ops': 0}
+                                                for name, index_bytes in storage_stats.pop('index_sizes').items()}
+    for stats in collection.aggregate([{'$indexStats': {}}]):
+        indexes.setdefault(stats['name'], {'name': stats['name'], 'size': 0, 'ops': 0})['ops'] += \
+            stats.get('accesses', {}).get('ops', 0)
+
+    options = next(collection.database.list_collections(filter={'name': collection.name}), {}).get('options', {})
+    validator = options.get('validator')
+    return {
+        'collection': collection_cls.collection_name,
+        'database': collection_cls.db_alias,
+        **storage_stats,
+        'indexes': sorted(indexes.values(), key=lambda index: index['name']),
+        'validator_size': len(bson.encode(validator)) if validator else 0,
+    }
+
+
 def get_model_classes_from_app(app: Flask) -> t.List[t.Type[CollectionModel]]:
     if not app.config['MODELS']:
         return []
@@ -0,0 +1,209 @@
+import atexit
+import logging
+import os
+import threading
+import typing as t
+import weakref
+from collections import deque
+
+from pymongo.errors import BulkWriteError
+
+from flask_mongodb.core.exceptions import ImproperConfiguration, OperationNotAllowed, WriteBufferFull
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# What to do with a new document when the buffer is full
+POLICIES = ('block', 'drop_newest', 'drop_oldest', 'raise')
+
+DEFAULT_WRITE_BUFFER = {
+    'MAX_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,  # Seconds
+    'POLICY': 'block',
+    'BLOCK_TIMEOUT': None,  # Seconds, wait forever by default
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def get_write_buffer_options(config: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    """
+    Validate the ``MONGODB_WRITE_BUFFER`` configuration and map it to :class:`WriteBuffer` arguments.
+    """
+    if not isinstance(config, dict):
+        raise ImproperConfiguration('MONGODB_WRITE_BUFFER must be a dictionary')
+    unknown = set(config) - set(DEFAULT_WRITE_BUFFER)
+    if unknown:
+        raise ImproperConfiguration(f'Unknown MONGODB_WRITE_BUFFER settings: {", ".join(sorted(unknown))}')
+
+    settings = {**DEFAULT_WRITE_BUFFER, **config}
+    for name in ('MAX_SIZE', 'BATCH_SIZE'):
+        if isinstance(settings[name], bool) or not isinstance(settings[name], int) or settings[name] < 1:
+            raise ImproperConfiguration(f'{name} of MONGODB_WRITE_BUFFER must be a positive integer')
+    if not _is_number(settings['FLUSH_INTERVAL']) or settings['FLUSH_INTERVAL'] <= 0:
+        raise ImproperConfiguration('FLUSH_INTERVAL of MONGODB_WRITE_BUFFER must be a positive number')
+    if settings['POLICY'] not in POLICIES:
+        raise ImproperConfiguration(f'POLICY of MONGODB_WRITE_BUFFER must be one of {", ".join(POLICIES)}')
+    if settings['BLOCK_TIMEOUT'] is not None and (not _is_number(settings['BLOCK_TIMEOUT'])
+                                                  or settings['BLOCK_TIMEOUT'] < 0):
+        raise ImproperConfiguration('BLOCK_TIMEOUT of MONGODB_WRITE_BUFFER must be a non negative number')
+    return {name.lower(): value for name, value in settings.items()}
+
+
+class WriteBuffer:
+    """
+    Bounded in-process buffer of inserts. A background thread writes them with unordered ``insert_many``
+    calls, one per collection, when ``batch_size`` documents are buffered or every ``flush_interval``
+    seconds. When the buffer is full, ``policy`` decides whether :meth:`put` waits for room, drops the
+    new document, drops the oldest one or raises :class:`WriteBufferFull`.
+    """
+    def __init__(self, max_size: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 policy: str = 'block', block_timeout: t.Optional[float] = None):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue: t.Deque[t.Tuple[t.Any, t.Dict]] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: t.Optional[threading.Thread] = None
+        self._closed = False
+        self._pid = os.getpid()
+        self._stats = {'enqueued': 0, 'dropped': 0, 'inserted': 0, 'failed': 0, 'batches': 0,
+                       'last_error': None}
+        _close_at_exit(self)
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Counters of the buffer: documents enqueued, dropped, inserted and failed, batches written,
+        documents pending and the last write error"""
+        with self._condition:
+            return {**self._stats, 'pending': len(self._queue)}
+
+    def put(self, collection, document: t.Dict) -> bool:
+        """
+        Buffer the insert of a document into a collection.
+
+        :param collection: Collection handle to insert the document into
+        :param document: Document to insert, it should have its ``_id``
+        :return: Whether the document was buffered, False if it was dropped
+        """
+        with self._condition:
+            if self._closed:
+                raise OperationNotAllowed('The write buffer is closed')
+            self._start_worker()
+
+            if len(self._queue) >= self.max_size:
+                if self.policy == 'raise':
+                    raise WriteBufferFull()
+                if self.policy == 'drop_newest':
+                    self._stats['dropped'] += 1
+                    return False
+                if self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self._stats['dropped'] += 1
+                else:
+                    self._condition.notify_all()
+                    has_room = self._condition.wait_for(lambda: len(self._queue) < self.max_size or self._closed,
+                                                        self.block_timeout)
+                    if self._closed:
+                        raise OperationNotAllowed('The write buffer is closed')
+                    if not has_room:
+                        raise WriteBufferFull()
+
+            self._queue.append((collection, document))
+            self._stats['enqueued'] += 1
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def flush(self):
+        """Write the buffered documents in the calling thread"""
+        if os.getpid() != self._pid:
+            # Inherited from the parent process, its documents are written by the parent
+            return
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    # Wake up the producers waiting for room
+                    self._condition.notify_all()
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self):
+        """Stop the background thread and write the buffered documents"""
+        if os.getpid() != self._pid:
+            return
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _start_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='flask-mongodb-write-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or len(self._queue) >= self.batch_size,
+                                         self.flush_interval)
+                if self._closed:
+                    # close() writes what is left
+                    return
+            self.flush()
+
+    def _write(self, batch: t.List[t.Tuple[t.Any, t.Dict]]):
+        # One insert_many per collection handle, keeping the options of each handle
+        groups: t.Dict[int, t.Tuple[t.Any, t.List[t.Dict]]] = {}
+        for collection, document in batch:
+            groups.setdefault(id(collection), (collection, []))[1].append(document)
+
+        for collection, documents in groups.values():
+            error = None
+            try:
+                collection.insert_many(documents, ordered=False)
+                inserted = len(documents)
+            except BulkWriteError as e:
+                # Unordered inserts keep going after an error, only the failed documents are lost
+                inserted = e.details.get('nInserted', 0)
+                error = e
+            except Exception as e:
+                # Including encoding errors, nobody waits for these writes to report them
+                inserted = 0
+                error = e
+
+            if error is not None:
+                logger.warning('Could not write %d buffered documents to %s: %s',
+                               len(documents) - inserted, collection.name, error)
+            with self._condition:
+                self._stats['batches'] += 1
+                self._stats['inserted'] += inserted
+                self._stats['failed'] += len(documents) - inserted
+                if error is not None:
+                    self._stats['last_error'] = str(error)
+
+
+def _close_at_exit(buffer: WriteBuffer):
+    # Only a weak reference, so registering the handler does not keep the buffer alive
+    ref = weakref.ref(buffer)
+
+    def _close():
+        buffer = ref()
+        if buffer is not None:
+            buffer.close()
+
+    atexit.register(_close)
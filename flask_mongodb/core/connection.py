@@ -0,0 +1,145 @@
+import importlib.util
+import typing as t
+
+from pymongo.errors import ConfigurationError
+from pymongo.uri_parser import split_options
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+
+# DATABASE entry keys mapped to their MongoClient keyword argument
+CLIENT_OPTIONS = {
+    'MAX_POOL_SIZE': 'maxPoolSize',
+    'MIN_POOL_SIZE': 'minPoolSize',
+    'MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'COMPRESSORS': 'compressors',
+    'ZLIB_COMPRESSION_LEVEL': 'zlibCompressionLevel',
+    'APPNAME': 'appname',
+}
+
+# Each WSGI worker process holds its own pool, so keep pools small, release idle connections and
+# fail fast instead of queueing requests behind an exhausted pool or an unreachable server
+DEFAULT_CLIENT_OPTIONS = {
+    'MAX_POOL_SIZE': 25,
+    'MIN_POOL_SIZE': 0,
+    'MAX_IDLE_TIME_MS': 60000,
+    'WAIT_QUEUE_TIMEOUT_MS': 10000,
+    'SERVER_SELECTION_TIMEOUT_MS': 10000,
+}
+
+# Compressors mapped to the package they require, if any
+COMPRESSORS = {
+    'zlib': None,
+    'zstd': 'zstandard',
+    'snappy': 'snappy',
+}
+
+
+def get_connection_uri(db_details: t.Dict) -> str:
+    """
+    Get the connection URI of a DATABASE entry, either the ``URI`` key or one built from the ``HOST``
+    and ``PORT`` keys.
+    """
+    uri = db_details.get('URI')
+    if uri:
+        if not isinstance(uri, str) or not uri.startswith(('mongodb://', 'mongodb+srv://')):
+            raise ImproperConfiguration('URI must be a mongodb:// or mongodb+srv:// connection string')
+        return uri
+
+    host = db_details.get('HOST')
+    port = db_details.get('PORT')
+    if not host or not port:
+        raise ImproperConfiguration('HOST and PORT must be specified')
+    return f'mongodb://{host}:{port}'
+
+
+def _get_uri_options(db_alias: str, db_details: t.Dict) -> t.Set[str]:
+    # Lowercase names of the options of the URI. Only the query is parsed, parse_uri would resolve the
+    # SRV records of mongodb+srv URIs
+    uri = db_details.get('URI')
+    if not isinstance(uri, str) or '?' not in uri:
+        return set()
+    query = uri.split('?', 1)[1]
+    if not query:
+        return set()
+    try:
+        return {name.lower() for name in split_options(query)}
+    except (ConfigurationError, ValueError) as e:
+        raise ImproperConfiguration(f'Invalid URI options of database {db_alias}: {e}')
+
+
+def _validate_integer(db_alias: str, name: str, value, minimum: int, maximum: t.Optional[int] = None):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ImproperConfiguration(f'{name} of database {db_alias} must be an integer')
+    if value < minimum or (maximum is not None and value > maximum):
+        bounds = f'between {minimum} and {maximum}' if maximum is not None else f'greater than or equal to {minimum}'
+        raise ImproperConfiguration(f'{name} of database {db_alias} must be {bounds}')
+
+
+def _validate_compressors(db_alias: str, value) -> str:
+    compressors = value.split(',') if isinstance(value, str) else value
+    if not isinstance(compressors, (list, tuple)) or not compressors:
+        raise ImproperConfiguration(f'COMPRESSORS of database {db_alias} must be a list or a comma separated '
+                                    f'string')
+    for compressor in compressors:
+        if compressor not in COMPRESSORS:
+            raise ImproperConfiguration(f'Unknown compressor {compressor} in database {db_alias}, valid '
+                                        f'compressors are {", ".join(COMPRESSORS)}')
+        package = COMPRESSORS[compressor]
+        if package and importlib.util.find_spec(package) is None:
+            raise ImproperConfiguration(f'The {compressor} compressor requires the {package} package')
+    return ','.join(compressors)
+
+
+def get_client_options(db_alias: str, db_details: t.Dict) -> t.Dict[str, t.Any]:
+    """
+    Validate the client options of a DATABASE entry and map them to MongoClient keyword arguments.
+
+    :param db_alias: Database alias, used in the error messages
+    :param db_details: The DATABASE entry
+    :return: Keyword arguments for the MongoClient
+    """
+    # Defaults do not override the options of the URI, keyword arguments of MongoClient take precedence
+    uri_options = _get_uri_options(db_alias, db_details)
+    defaults = {name: value for name, value in DEFAULT_CLIENT_OPTIONS.items()
+                if CLIENT_OPTIONS[name].lower() not in uri_options}
+    settings = {**defaults, **{k: v for k, v in db_details.items() if k in CLIENT_OPTIONS}}
+    options = {}
+
+    for name in ('MAX_POOL_SIZE', 'MIN_POOL_SIZE'):
+        if settings.get(name) is not None:
+            _validate_integer(db_alias, name, settings[name], 0)
+    if (settings.get('MAX_POOL_SIZE') and settings.get('MIN_POOL_SIZE') is not None
+            and settings['MIN_POOL_SIZE'] > settings['MAX_POOL_SIZE']):
+        raise ImproperConfiguration(f'MIN_POOL_SIZE of database {db_alias} cannot be greater than MAX_POOL_SIZE')
+
+    for name in ('MAX_IDLE_TIME_MS', 'WAIT_QUEUE_TIMEOUT_MS', 'SOCKET_TIMEOUT_MS', 'SERVER_SELECTION_TIMEOUT_MS'):
+        if settings.get(name) is not None:
+            _validate_integer(db_alias, name, settings[name], 1)
+
+    if settings.get('COMPRESSORS') is not None:
+        settings['COMPRESSORS'] = _validate_compressors(db_alias, settings['COMPRESSORS'])
+
+    if settings.get('ZLIB_COMPRESSION_LEVEL') is not None:
+        _validate_integer(db_alias, 'ZLIB_COMPRESSION_LEVEL', settings['ZLIB_COMPRESSION_LEVEL'], -1, 9)
+
+    if settings.get('APPNAME') is not None and not isinstance(settings['APPNAME'], str):
+        raise ImproperConfiguration(f'APPNAME of database {db_alias} must be a string')
+
+    for name, value in settings.items():
+        if value is not None:
+            options[CLIENT_OPTIONS[name]] = value
+
+    username = db_details.get('USERNAME')
+    password = db_details.get('PASSWORD')
+    if username and password:
+        # Passing the credentials as arguments avoids having to escape them in the URI
+        options.update(username=username, password=password)
+    return options
+
+
+def get_client_key(uri: str, options: t.Dict[str, t.Any]) -> t.Tuple:
+    """Identify a client by its connection parameters, so aliases that share them can share the client"""
+    return uri, tuple(sorted(options.items()))
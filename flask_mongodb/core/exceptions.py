@@ -112,3 +112,15 @@ class NoDatabaseShiftingRequired(BaseFlaskMongodbException):
 
 class idUnmodifiable(BaseFlaskMongodbException):
     default_message = 'Cannot modify _id field'
+
+
+class WriteBufferFull(BaseFlaskMongodbException):
+    default_message = 'The write buffer is full'
+
+
+class QueryBudgetExceeded(BaseFlaskMongodbException):
+    default_message = 'The query budget was exceeded'
+
+
+class NPlusOneQueryDetected(BaseFlaskMongodbException):
+    default_message = 'The same query ran in a loop with different values'
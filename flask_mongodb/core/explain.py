@@ -0,0 +1,114 @@
+import typing as t
+
+from pymongo.cursor import Cursor
+
+EXPLAIN_VERBOSITIES = ('queryPlanner', 'executionStats', 'allPlansExecution')
+# Stages that read an index, their indexName is the index used by the plan. IDHACK, the _id lookup of
+# servers before 8.0, does not name it
+_INDEX_STAGES = ('IXSCAN', 'COUNT_SCAN', 'DISTINCT_SCAN', 'EXPRESS_IXSCAN', 'IDHACK')
+# Fields of a command sent by the driver that are not part of the query, an explain command rejects them
+_DRIVER_FIELDS = ('lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern')
+
+
+# Find command fields mapped to the cursor attributes that change the plan of the query
+_CURSOR_FIELDS = (
+    ('hint', '_hint'),
+    ('collation', '_collation'),
+    ('min', '_min'),
+    ('max', '_max'),
+    ('maxTimeMS', '_max_time_ms'),
+    ('comment', '_comment'),
+    ('let', '_let'),
+    ('allowDiskUse', '_allow_disk_use'),
+    ('returnKey', '_return_key'),
+    ('showRecordId', '_show_record_id'),
+)
+
+
+def find_command(cursor: Cursor) -> t.Dict[str, t.Any]:
+    """
+    Build the find command of a cursor, with its filter, sort, projection, skip and limit, and its hint,
+    collation, min and max, time limit and comment, so the plan explained is the plan the cursor runs
+    """
+    command: t.Dict[str, t.Any] = {'find': cursor.collection.name, 'filter': cursor._spec}
+    if cursor._ordering:
+        command['sort'] = cursor._ordering
+    if cursor._projection:
+        command['projection'] = cursor._projection
+    if cursor._skip:
+        command['skip'] = cursor._skip
+    if cursor._limit:
+        command['limit'] = abs(cursor._limit)
+    for field, attribute in _CURSOR_FIELDS:
+        value = getattr(cursor, attribute, None)
+        if value is not None and value is not False:
+            command[field] = value
+    return command
+
+
+def explain_cursor(cursor: Cursor, verbosity: str = 'executionStats') -> t.Dict[str, t.Any]:
+    """
+    Run the explain command of the query of a cursor. The cursor is not evaluated.
+
+    :param cursor: Cursor to explain
+    :param verbosity: ``queryPlanner``, ``executionStats`` or ``allPlansExecution``
+    :return: Output of the explain command
+    """
+    if verbosity not in EXPLAIN_VERBOSITIES:
+        raise ValueError(f'Invalid verbosity {verbosity}, valid values are {", ".join(EXPLAIN_VERBOSITIES)}')
+    collection = cursor.collection
+    return collection.database.command('explain', find_command(cursor), verbosity=verbosity,
+                                       read_preference=collection.read_preference, session=cursor.session)
+
+
+def explain_command(database, command: t.Mapping, verbosity: str = 'executionStats') -> t.Dict[str, t.Any]:
+    """
+    Run the explain command of a find or aggregate command, e.g. the command of a command monitoring event.
+
+    :param database: Database of the command
+    :param command: Command to explain
+    :param verbosity: ``queryPlanner``, ``executionStats`` or ``allPlansExecution``
+    :return: Output of the explain command
+    """
+    if verbosity not in EXPLAIN_VERBOSITIES:
+        raise ValueError(f'Invalid verbosity {verbosity}, valid values are {", ".join(EXPLAIN_VERBOSITIES)}')
+    command = {key: value for key, value in command.items()
+               if not key.startswith('$') and key not in _DRIVER_FIELDS}
+    return database.command('explain', command, verbosity=verbosity)
+
+
+def _plan_stages(plan: t.Mapping) -> t.Iterator[t.Mapping]:
+    # Slot based execution plans are under queryPlan, sharded plans under the winning plan of each shard
+    plan = plan.get('queryPlan', plan)
+    if 'stage' in plan:
+        yield plan
+    for shard in plan.get('shards', ()):
+        yield from _plan_stages(shard.get('winningPlan', {}))
+    if 'inputStage' in plan:
+        yield from _plan_stages(plan['inputStage'])
+    for stage in plan.get('inputStages', ()):
+        yield from _plan_stages(stage)
+
+
+def summarize_explain(explain: t.Mapping) -> t.Dict[str, t.Any]:
+    """
+    Summarize the output of an explain command: the stages of the winning plan, from the root to the
+    leaves, the indexes used, whether it scanned the collection or sorted in memory and, with the
+    ``executionStats`` verbosity, the keys and documents examined and the documents returned.
+    """
+    plan = list(_plan_stages(explain.get('queryPlanner', {}).get('winningPlan', {})))
+    stages = [stage['stage'] for stage in plan]
+    indexes = [stage.get('indexName', '_id_') for stage in plan if stage['stage'] in _INDEX_STAGES]
+    stats = explain.get('executionStats', {})
+    return {
+        'stage': stages[0] if stages else None,
+        'stages': stages,
+        'index': indexes[0] if indexes else None,
+        'indexes': indexes,
+        'collscan': 'COLLSCAN' in stages,
+        'in_memory_sort': 'SORT' in stages,
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'returned': stats.get('nReturned'),
+        'execution_time_ms': stats.get('executionTimeMillis'),
+    }
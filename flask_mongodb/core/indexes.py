@@ -0,0 +1,170 @@
+import json
+import typing as t
+
+from pymongo import ASCENDING, IndexModel
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+
+IndexKeys = t.List[t.Tuple[str, t.Any]]
+
+# Operators that select values by equality, the other operators select ranges
+EQUALITY_OPERATORS = ('$eq', '$in')
+# Index options that make an index behave differently than one with more keys
+_SPECIAL_INDEX_OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds', 'collation', 'hidden')
+
+
+def get_index_models(indexes: t.Iterable) -> t.List[IndexModel]:
+    """
+    Map the ``indexes`` attribute of a model to index models. Each index is a field name, a list of
+    ``(field, direction)`` tuples or a :class:`pymongo.IndexModel`.
+    """
+    models = []
+    for index in indexes:
+        if isinstance(index, IndexModel):
+            models.append(index)
+        elif isinstance(index, str):
+            models.append(IndexModel([(index, ASCENDING)]))
+        else:
+            try:
+                models.append(IndexModel(list(index)))
+            except (TypeError, ValueError) as e:
+                raise ImproperConfiguration(f'Invalid index {index}: {e}')
+    return models
+
+
+def index_keys(index: t.Union[IndexModel, t.Mapping]) -> IndexKeys:
+    """Get the keys of an index model or of an index of ``index_information``"""
+    key = index.document['key'] if isinstance(index, IndexModel) else index['key']
+    return list(key.items()) if isinstance(key, t.Mapping) else [tuple(item) for item in key]
+
+
+def esr_fields(filter_shape: t.Mapping, sort: t.Mapping) -> t.Tuple[t.List[str], IndexKeys, t.List[str]]:
+    """
+    Split the fields of a query shape by the equality, sort, range rule: the fields compared by equality,
+    the sort keys and the fields compared by range. Fields of ``$and`` are included, ``$or``, ``$nor``
+    and ``$expr`` cannot use a single index and are left out.
+    """
+    equality: t.List[str] = []
+    ranges: t.List[str] = []
+    conditions = list(filter_shape.items())
+    while conditions:
+        field, value = conditions.pop(0)
+        if field == '$and':
+            for item in value:
+                conditions.extend(item.items())
+            continue
+        if field.startswith('$'):
+            continue
+        if isinstance(value, t.Mapping) and any(op.startswith('$') for op in value):
+            target = equality if set(value) <= set(EQUALITY_OPERATORS) else ranges
+        else:
+            target = equality
+        if field not in equality and field not in ranges:
+            target.append(field)
+    sort_keys = [(field, direction) for field, direction in sort.items() if field not in equality]
+    ranges = [field for field in ranges if field not in dict(sort_keys)]
+    return equality, sort_keys, ranges
+
+
+def esr_index(equality: t.Sequence[str], sort: IndexKeys, ranges: t.Sequence[str]) -> IndexKeys:
+    """Keys of the index of a query, its equality fields first, then the sort keys and the range fields"""
+    return [(field, ASCENDING) for field in equality] + list(sort) + [(field, ASCENDING) for field in ranges]
+
+
+def index_supports(keys: IndexKeys, equality: t.Sequence[str], sort: IndexKeys, ranges: t.Sequence[str]) -> bool:
+    """
+    Whether an index with the keys serves a query with the fields: the equality fields in any order
+    lead the index, followed by the sort keys, all in the same or all in the opposite direction, and the
+    range fields in any order.
+    """
+    fields = [field for field, _ in keys]
+    position = len(equality)
+    if set(fields[:position]) != set(equality):
+        return False
+    index_sort = keys[position:position + len(sort)]
+    if [field for field, _ in index_sort] != [field for field, _ in sort]:
+        return False
+    directions = [(direction, sort_direction) for (_, direction), (_, sort_direction) in zip(index_sort, sort)]
+    if not (all(d == s for d, s in directions) or all(d == -s for d, s in directions)):
+        return False
+    position += len(sort)
+    return set(fields[position:position + len(ranges)]) == set(ranges)
+
+
+def unused_indexes(index_stats: t.Iterable[t.Mapping]) -> t.List[str]:
+    """Names of the indexes without operations in the output of ``$indexStats``, the _id index excluded"""
+    return sorted(stats['name'] for stats in index_stats
+                  if stats['name'] != '_id_' and not stats.get('accesses', {}).get('ops'))
+
+
+def redundant_indexes(indexes: t.Mapping[str, t.Mapping]) -> t.List[t.Tuple[str, str]]:
+    """
+    Find the indexes of ``index_information`` whose keys are the prefix of the keys of another index, that
+    one serves their queries too. Unique, sparse, partial, TTL, hidden and collated indexes are kept.
+
+    :return: List of redundant index names and the name of the index that makes them redundant
+    """
+    redundant = []
+    for name, info in indexes.items():
+        if name == '_id_' or any(option in info for option in _SPECIAL_INDEX_OPTIONS):
+            continue
+        keys = index_keys(info)
+        for other_name, other_info in indexes.items():
+            other_keys = index_keys(other_info)
+            if other_name != name and len(other_keys) > len(keys) and other_keys[:len(keys)] == keys:
+                redundant.append((name, other_name))
+                break
+    return redundant
+
+
+def advise_indexes(shapes: t.Iterable[t.Mapping], indexes: t.Mapping[str, t.Mapping],
+                   declared: t.Sequence[IndexModel] = (),
+                   index_stats: t.Iterable[t.Mapping] = ()) -> t.Dict[str, t.Any]:
+    """
+    Compare the query shapes recorded for a collection with its indexes.
+
+    :param shapes: Documents of the query shapes collection, with the ``filter`` and ``sort`` as JSON and
+        their ``count`` and ``total_ms``
+    :param indexes: Output of ``index_information``
+    :param declared: Indexes of the ``indexes`` attribute of the model
+    :param index_stats: Output of the ``$indexStats`` aggregation stage
+    :return: The suggested indexes, from the most to the least time spent in their queries, the declared
+        indexes that do not exist, and the unused and redundant indexes
+    """
+    existing = [index_keys(info) for info in indexes.values()]
+    missing = [index.document['name'] for index in declared if index_keys(index) not in existing]
+    available = existing + [index_keys(index) for index in declared]
+
+    suggestions: t.Dict[t.Tuple, t.Dict[str, t.Any]] = {}
+    for shape in shapes:
+        sort = json.loads(shape.get('sort') or '{}')
+        equality, sort_keys, ranges = esr_fields(json.loads(shape['filter']), sort)
+        if not (equality or sort_keys or ranges):
+            continue
+        if any(index_supports(keys, equality, sort_keys, ranges) for keys in available):
+            continue
+        keys = esr_index(equality, sort_keys, ranges)
+        suggestion = suggestions.setdefault(tuple(keys), {'keys': keys, 'fields': (equality, sort_keys, ranges),
+                                                          'count': 0, 'total_ms': 0.0, 'shapes': []})
+        suggestion['count'] += shape['count']
+        suggestion['total_ms'] += shape['total_ms']
+        suggestion['shapes'].append(shape['filter'] + (f' sort {json.dumps(sort)}' if sort else ''))
+
+    # An index that serves the queries of another suggestion replaces it, longer suggestions go first
+    merged: t.List[t.Dict[str, t.Any]] = []
+    for suggestion in sorted(suggestions.values(), key=lambda suggestion: len(suggestion['keys']), reverse=True):
+        fields = suggestion.pop('fields')
+        serving = next((other for other in merged if index_supports(other['keys'], *fields)), None)
+        if serving is None:
+            merged.append(suggestion)
+        else:
+            serving['count'] += suggestion['count']
+            serving['total_ms'] += suggestion['total_ms']
+            serving['shapes'].extend(suggestion['shapes'])
+
+    return {
+        'suggested': sorted(merged, key=lambda suggestion: suggestion['total_ms'], reverse=True),
+        'missing': missing,
+        'unused': unused_indexes(index_stats),
+        'redundant': redundant_indexes(indexes),
+    }
@@ -0,0 +1,193 @@
+import threading
+import time
+import typing as t
+
+from pymongo import monitoring
+
+# Name, Prometheus type, help and attribute of the ClientMetrics of every metric
+_METRICS = (
+    ('pool_connections_checked_out', 'gauge', 'Connections checked out of the pools', 'checked_out'),
+    ('pool_connections_open', 'gauge', 'Open connections of the pools', 'open'),
+    ('pool_connections_created_total', 'counter', 'Connections created', 'created'),
+    ('pool_connections_closed_total', 'counter', 'Connections closed', 'closed'),
+    ('pool_checkouts_total', 'counter', 'Connections checked out', 'checkouts'),
+    ('pool_checkout_failures_total', 'counter', 'Connection check outs that failed, e.g. on timeout',
+     'checkout_failures'),
+    ('pool_cleared_total', 'counter', 'Pools cleared after a network error or a server change', 'cleared'),
+    ('heartbeats_total', 'counter', 'Server monitoring heartbeats', 'heartbeats'),
+    ('heartbeat_failures_total', 'counter', 'Server monitoring heartbeats that failed', 'heartbeat_failures'),
+)
+# Name, help and attributes of the sum and count of every summary
+_SUMMARIES = (
+    ('pool_checkout_wait_seconds', 'Time waiting for a connection of the pool', 'wait_time', 'checkouts'),
+    ('heartbeat_seconds', 'Duration of the server monitoring heartbeats', 'heartbeat_time', 'heartbeats'),
+)
+
+
+class ClientMetrics:
+    """Connection pool and server monitoring counters of a client, shared by the aliases that use it"""
+    def __init__(self):
+        self.aliases: t.List[str] = []
+        self.checked_out = 0
+        self.open = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_time = 0.0  # Seconds
+        self.max_wait_time = 0.0
+        self.cleared = 0
+        self.heartbeats = 0
+        self.heartbeat_failures = 0
+        self.heartbeat_time = 0.0
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        with self.lock:
+            return {
+                'checked_out': self.checked_out,
+                'open': self.open,
+                'created': self.created,
+                'closed': self.closed,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'cleared': self.cleared,
+                'heartbeats': self.heartbeats,
+                'heartbeat_failures': self.heartbeat_failures,
+                'heartbeat_time': self.heartbeat_time,
+            }
+
+
+class DriverMetricsListener(monitoring.ConnectionPoolListener, monitoring.ServerHeartbeatListener):
+    """Pool and heartbeat listener of a client that updates its :class:`ClientMetrics`"""
+    def __init__(self, metrics: ClientMetrics):
+        self.metrics = metrics
+        # Check out start times, for the PyMongo versions whose events do not have the duration
+        self._checkout_started: t.Dict[t.Tuple, float] = {}
+
+    def _checkout_wait(self, event) -> float:
+        started = self._checkout_started.pop((event.address, threading.get_ident()), None)
+        duration = getattr(event, 'duration', None)
+        if duration is None:
+            duration = time.monotonic() - started if started is not None else 0.0
+        return duration
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self.metrics.lock:
+            self.metrics.cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self.metrics.lock:
+            self.metrics.created += 1
+            self.metrics.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self.metrics.lock:
+            self.metrics.closed += 1
+            self.metrics.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._checkout_started[(event.address, threading.get_ident())] = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_wait(event)
+        with self.metrics.lock:
+            self.metrics.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        wait = self._checkout_wait(event)
+        with self.metrics.lock:
+            self.metrics.checkouts += 1
+            self.metrics.checked_out += 1
+            self.metrics.wait_time += wait
+            self.metrics.max_wait_time = max(self.metrics.max_wait_time, wait)
+
+    def connection_checked_in(self, event):
+        with self.metrics.lock:
+            self.metrics.checked_out -= 1
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event: monitoring.ServerHeartbeatSucceededEvent):
+        with self.metrics.lock:
+            self.metrics.heartbeats += 1
+            self.metrics.heartbeat_time += event.duration
+
+    def failed(self, event: monitoring.ServerHeartbeatFailedEvent):
+        with self.metrics.lock:
+            self.metrics.heartbeats += 1
+            self.metrics.heartbeat_failures += 1
+            self.metrics.heartbeat_time += event.duration
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class DriverMetrics:
+    """
+    Connection pool and server monitoring metrics of the clients of a MongoDB instance. Aliases with the
+    same connection parameters share a client, their metrics are reported together with the aliases
+    joined by commas, e.g. ``main,reports``.
+    """
+    def __init__(self):
+        self._clients: t.Dict[t.Tuple, ClientMetrics] = {}
+        self._lock = threading.Lock()
+
+    def listener(self, client_key: t.Tuple) -> DriverMetricsListener:
+        """Get a new listener for a client, its sync and async clients update the same metrics"""
+        with self._lock:
+            metrics = self._clients.setdefault(client_key, ClientMetrics())
+        return DriverMetricsListener(metrics)
+
+    def add_alias(self, client_key: t.Tuple, alias: str):
+        with self._lock:
+            metrics = self._clients.setdefault(client_key, ClientMetrics())
+            if alias not in metrics.aliases:
+                metrics.aliases.append(alias)
+
+    def reset(self):
+        """Start the metrics of every client over, keeping their aliases"""
+        with self._lock:
+            for client_key, metrics in self._clients.items():
+                self._clients[client_key] = ClientMetrics()
+                self._clients[client_key].aliases = metrics.aliases
+
+    def snapshot(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """Get the metrics of every client, by its aliases"""
+        with self._lock:
+            clients = list(self._clients.values())
+        return {','.join(metrics.aliases): metrics.to_dict() for metrics in clients}
+
+    def to_prometheus(self) -> str:
+        """Get the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, metric_type, description, attribute in _METRICS:
+            lines.append(f'# HELP flask_mongodb_{name} {description}')
+            lines.append(f'# TYPE flask_mongodb_{name} {metric_type}')
+            for alias, metrics in snapshot.items():
+                lines.append(f'flask_mongodb_{name}{{alias="{_escape_label(alias)}"}} {metrics[attribute]}')
+        for name, description, sum_attribute, count_attribute in _SUMMARIES:
+            lines.append(f'# HELP flask_mongodb_{name} {description}')
+            lines.append(f'# TYPE flask_mongodb_{name} summary')
+            for alias, metrics in snapshot.items():
+                label = f'{{alias="{_escape_label(alias)}"}}'
+                lines.append(f'flask_mongodb_{name}_sum{label} {metrics[sum_attribute]}')
+                lines.append(f'flask_mongodb_{name}_count{label} {metrics[count_attribute]}')
+        return '\n'.join(lines) + '\n'
@@ -1,15 +1,34 @@
+import asyncio
+import contextlib
 import logging
+import os
+import threading
 import typing as t
+import warnings
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from flask import Flask
+from flask import Flask, g, request
 from pymongo.errors import ServerSelectionTimeoutError
 from werkzeug.utils import import_string
 
 from flask_mongodb.about import VERSION
-from flask_mongodb.core.exceptions import (DatabaseAliasException, DatabaseException, ImproperConfiguration)
-from flask_mongodb.core.wrappers import MongoConnect, MongoDatabase
+from flask_mongodb.core.buffer import WriteBuffer, get_write_buffer_options
+from flask_mongodb.core.connection import get_client_key, get_client_options, get_connection_uri
+from flask_mongodb.core.metrics import DriverMetrics
+from flask_mongodb.core.exceptions import (DatabaseAliasException, DatabaseException, ImproperConfiguration,
+                                           QueryBudgetExceeded)
+from flask_mongodb.core.monitoring import (NPlusOneQueryWarning, QueryShapeRecorder, QueryTracker,
+                                           QueryTrackingListener, RequestCommandListener, RequestStats,
+                                           SlowQueryListener)
+from flask_mongodb.core.sessions import Transaction, bind_session
+from flask_mongodb.core.tracing import set_app_span_hooks
+from flask_mongodb.core.wrappers import MongoCollection, MongoConnect, MongoDatabase
 from flask_mongodb.models import CollectionModel
 from flask_mongodb.models.shitfs.history import create_db_shift_history
+from flask_mongodb.models.document_set import DocumentSet
+from flask_mongodb.utils.concurrency import in_worker, map_concurrently, submit_in_context
+from flask_mongodb.utils.encoding import set_app_json_encoder
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
@@ -23,13 +42,54 @@ class MongoDB:
         Connect your MongoDB client to a Flask application.
         """
         self.__connections: t.Dict[str, MongoDatabase] = {}
+        self.__clients: t.Dict[t.Tuple, MongoConnect] = {}  # One client per distinct connection
+        self.__client_settings: t.Dict[t.Tuple, t.Tuple[str, t.Dict]] = {}  # To rebuild the clients
+        self.__inherited_clients: t.List[MongoConnect] = []  # Clients of the parent process after a fork
+        self.__fork_handler_registered = False
+        self.__alias_client_keys: t.Dict[str, t.Tuple] = {}
+        self.__gather_executor: t.Optional[ThreadPoolExecutor] = None
+        self.__gather_lock = threading.Lock()  # Concurrent requests gather at the same time
+        self.__gather_max_workers = 8
+        self.__write_buffer: t.Optional[WriteBuffer] = None
+        self.__write_buffer_options: t.Dict[str, t.Any] = {}
+        self.__event_listeners: t.List = []  # PyMongo monitoring listeners of every client
+        self.__query_shape_recorder: t.Optional[QueryShapeRecorder] = None
+        self.__slow_query_listener: t.Optional[SlowQueryListener] = None
+        self.__driver_metrics: t.Optional[DriverMetrics] = None
+        # Async clients and collection handles can only be used in the event loop they were created in
+        self.__async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, t.Dict]' = \
+            weakref.WeakKeyDictionary()
+        self.__async_collection_handles: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, t.Dict]' = \
+            weakref.WeakKeyDictionary()
         self.__collections: t.Dict[str, t.Dict[str, t.Type[CollectionModel]]] = {}  # Database collections
+        self.__collection_handles: t.Dict[t.Type[CollectionModel], MongoCollection] = {}  # Per model class
 
         if app is not None:
             self.init_app(app)
     
     def init_app(self, app: Flask):
         self._set_default_configurations(app)
+        self.__gather_max_workers = app.config['MONGODB_GATHER_MAX_WORKERS']
+        self.__write_buffer_options = get_write_buffer_options(app.config['MONGODB_WRITE_BUFFER'])
+        self._set_json_encoder(app)
+        self._set_span_hooks(app)
+        if app.config['MONGODB_INSTRUMENTATION']:
+            self._set_instrumentation(app)
+        if app.config['MONGODB_DETECT_N_PLUS_ONE'] or app.config['MONGODB_REQUEST_QUERY_BUDGET'] is not None:
+            self._set_query_tracking(app)
+        elif app.config['MONGODB_QUERY_TRACKING']:
+            # Only the query trackers of flask_mongodb.testing
+            self.__event_listeners.append(QueryTrackingListener())
+        if app.config['MONGODB_SLOW_QUERY_MS'] is not None:
+            self.__slow_query_listener = SlowQueryListener(app.config['MONGODB_SLOW_QUERY_MS'],
+                                                           app.config['MONGODB_SLOW_QUERY_EXPLAIN_RATE'])
+            self.__event_listeners.append(self.__slow_query_listener)
+        if app.config['MONGODB_QUERY_SHAPES']:
+            self.__query_shape_recorder = QueryShapeRecorder(app.config['MONGODB_QUERY_SHAPES_COLLECTION'],
+                                                             app.config['MONGODB_QUERY_SHAPES_FLUSH_INTERVAL'])
+            self.__event_listeners.append(self.__query_shape_recorder)
+        if app.config['MONGODB_DRIVER_METRICS']:
+            self.__driver_metrics = DriverMetrics()
         if not isinstance(app.config['DATABASE'], dict):
             raise TypeError('Database configuration must be a dictionary')
         
@@ -37,35 +97,50 @@ class MongoDB:
         if 'main' not in database:
             raise ImproperConfiguration('Must identify main database')
         
+        eager_clients: t.Dict[t.Tuple, MongoConnect] = {}
         for db_alias, db_details in database.items():
             assert isinstance(db_details, dict)
-            host = db_details.get('HOST')
-            port = db_details.get('PORT')
-            username = db_details.get('USERNAME')
-            password = db_details.get('PASSWORD')
             db_name = db_details.get('NAME')
-            
-            if not host or not port:
-                raise ImproperConfiguration('HOST and PORT must be specified')
+            uri = get_connection_uri(db_details)
 
             if not db_name:
                 raise ImproperConfiguration("Database name variable missing")
             
-            account = f'{username}:{password}@' if username and password else ''
-            conn = f'{host}:{port}'
-            uri = f'mongodb://{account}{conn}'
+            options = get_client_options(db_alias, db_details)
+            client_key = get_client_key(uri, options)
             
-            try:
-                alias_client = MongoConnect(uri)
-                alias_client.server_info()  # This is to test the connection
-            except ServerSelectionTimeoutError:
-                raise DatabaseException('No valid database connection established')
+            # Aliases with the same connection parameters share the client and its connection pool.
+            # The client does not connect until it is used or its connection is checked below
+            alias_client = self.__clients.get(client_key)
+            if alias_client is None:
+                alias_client = self._create_client(MongoConnect, uri, options, client_key)
+                self.__clients[client_key] = alias_client
+                self.__client_settings[client_key] = (uri, options)
+            
+            self.__alias_client_keys[db_alias] = client_key
+            if self.__driver_metrics is not None:
+                self.__driver_metrics.add_alias(client_key, db_alias)
+            if not db_details.get('LAZY', False):
+                eager_clients[client_key] = alias_client
             
             db = MongoDatabase(alias_client, db_name)
             db.alias = db_alias
             self.__connections[db_alias] = db
         
+        if self.__slow_query_listener is not None:
+            for db in self.__connections.values():
+                self.__slow_query_listener.databases.setdefault(db.name, db)
+        
+        recorder = self.__query_shape_recorder
+        if recorder is not None:
+            shapes_database = app.config['MONGODB_QUERY_SHAPES_DATABASE']
+            if shapes_database not in self.__connections:
+                raise ImproperConfiguration(f'MONGODB_QUERY_SHAPES_DATABASE {shapes_database} is not a database alias')
+            recorder.collection = self.__connections[shapes_database][recorder.collection_name]
+        
+        self._check_connections(list(eager_clients.values()))
         self._set_collections(app)
+        self._register_fork_handler()
         
         app.mongo = self
     
@@ -75,6 +150,165 @@ class MongoDB:
             raise DatabaseAliasException('Invalid database name')
         return db
     
+    def _create_client(self, client_class, uri: str, options: t.Dict[str, t.Any], client_key: t.Tuple):
+        # Listeners are not part of the client key, every client gets them
+        listeners = list(self.__event_listeners)
+        if self.__driver_metrics is not None:
+            # Pool events do not identify the client, each one gets its own metrics listener
+            listeners.append(self.__driver_metrics.listener(client_key))
+        return client_class(uri, connect=False, event_listeners=listeners, **options)
+    
+    def _set_instrumentation(self, app: Flask):
+        measure_sizes = app.config['MONGODB_INSTRUMENTATION_SIZES']
+        listener = next((listener for listener in self.__event_listeners
+                         if isinstance(listener, RequestCommandListener)), None)
+        if listener is None:
+            self.__event_listeners.append(RequestCommandListener(measure_sizes))
+        else:
+            listener.measure_sizes = listener.measure_sizes or measure_sizes
+        server_timing = app.config['MONGODB_SERVER_TIMING']
+        threshold = app.config['MONGODB_REQUEST_LOG_THRESHOLD_MS']
+        
+        def start_request_stats():
+            g.mongodb_stats = RequestStats(measure_sizes)
+        
+        def finish_request_stats(response):
+            stats: t.Optional[RequestStats] = g.get('mongodb_stats')
+            if stats is None:
+                return response
+            if server_timing:
+                response.headers.add('Server-Timing', stats.server_timing())
+            if threshold is not None and (stats.db_time + stats.hydration_time) * 1000 >= threshold:
+                sizes = f', {stats.bytes_sent} bytes sent, {stats.bytes_received} bytes received' \
+                    if measure_sizes else ''
+                logger.warning('%s %s: %d MongoDB commands in %.1f ms%s, %d models hydrated in %.1f ms, '
+                               'slowest command %s in %.1f ms', request.method, request.path, stats.commands,
+                               stats.db_time * 1000, sizes, stats.hydrated, stats.hydration_time * 1000,
+                               stats.slowest_command, stats.slowest_time * 1000)
+            return response
+        
+        app.before_request(start_request_stats)
+        app.after_request(finish_request_stats)
+    
+    def _set_query_tracking(self, app: Flask):
+        self.__event_listeners.append(QueryTrackingListener())
+        detect_n_plus_one = app.config['MONGODB_DETECT_N_PLUS_ONE']
+        threshold = app.config['MONGODB_N_PLUS_ONE_THRESHOLD']
+        budget = app.config['MONGODB_REQUEST_QUERY_BUDGET']
+        
+        def start_query_tracking():
+            g.mongodb_tracker = QueryTracker()
+        
+        def finish_query_tracking(response):
+            tracker: t.Optional[QueryTracker] = g.pop('mongodb_tracker', None)
+            if tracker is None:
+                return response
+            if detect_n_plus_one:
+                for shape, values, sites in tracker.repeated_shapes(threshold):
+                    warnings.warn(f'{request.method} {request.path}: {shape} ran with {values} different values '
+                                  f'at {", ".join(sites)}', NPlusOneQueryWarning)
+            if budget is not None and len(tracker) > budget:
+                raise QueryBudgetExceeded(f'{request.method} {request.path} ran {len(tracker)} queries, '
+                                          f'the budget is {budget}:\n{tracker.describe()}')
+            return response
+        
+        app.before_request(start_query_tracking)
+        app.after_request(finish_query_tracking)
+    
+    def _check_connections(self, clients: t.List[MongoConnect]):
+        """
+        Ping the clients in parallel, so startup waits for the slowest server instead of all of them
+        in turn. Each client gets as many concurrent pings as its minPoolSize to open those connections
+        up front, PyMongo's pool maintenance keeps them open afterwards.
+        """
+        def _ping(client: MongoConnect):
+            try:
+                client.admin.command('ping')
+            except ServerSelectionTimeoutError:
+                raise DatabaseException('No valid database connection established')
+        
+        pings = []
+        for client in clients:
+            pings.extend([client] * max(1, client.options.pool_options.min_pool_size))
+        map_concurrently(_ping, pings, jobs=min(len(pings), 32))
+    
+    def _register_fork_handler(self):
+        """
+        MongoClients are not fork-safe, a pre-fork server (e.g. gunicorn --preload) would share the
+        connections of the parent with every worker. Rebuild the clients in the child process instead.
+        """
+        if self.__fork_handler_registered or not hasattr(os, 'register_at_fork'):
+            return
+        
+        # Fork handlers cannot be unregistered, do not keep the instance alive
+        mongo_ref = weakref.ref(self)
+        
+        def _after_fork_in_child():
+            mongo = mongo_ref()
+            if mongo is not None:
+                mongo._reset_after_fork()
+        
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        self.__fork_handler_registered = True
+    
+    def _reset_after_fork(self):
+        """Replace the clients inherited from the parent process with new, not yet connected, clients"""
+        new_clients: t.Dict[int, MongoConnect] = {}
+        if self.__driver_metrics is not None:
+            # The pools of the parent process are not used by the child
+            self.__driver_metrics.reset()
+        if self.__query_shape_recorder is not None:
+            # The parent process writes the counters it recorded
+            self.__query_shape_recorder.reset()
+        for client_key, client in self.__clients.items():
+            uri, options = self.__client_settings[client_key]
+            self.__clients[client_key] = new_clients[id(client)] = self._create_client(MongoConnect, uri, options,
+                                                                                       client_key)
+            # Closing an inherited client would use the sockets of the parent, and collecting it would
+            # warn that it was not closed, so keep it around unused
+            self.__inherited_clients.append(client)
+        
+        for db in self.__connections.values():
+            # Collection handles reference the database, rebinding it updates all of them
+            db.rebind_client(new_clients[id(db.client)])
+        
+        # Event loops and threads are not inherited by the child process
+        self.__async_clients.clear()
+        self.__async_collection_handles.clear()
+        self.__gather_executor = None
+        self.__gather_lock = threading.Lock()
+        # The parent process writes the documents it buffered
+        self.__write_buffer = None
+    
+    def _set_json_encoder(self, app: Flask):
+        # The encoder is stored in the app, the other apps of the process keep theirs
+        encoder = app.config['MONGODB_JSON_ENCODER']
+        if isinstance(encoder, str):
+            encoder = import_string(encoder)
+        if isinstance(encoder, type):
+            encoder = encoder()
+        try:
+            set_app_json_encoder(app, encoder)
+        except TypeError as e:
+            raise ImproperConfiguration(f'Invalid MONGODB_JSON_ENCODER: {e}')
+    
+    def _set_span_hooks(self, app: Flask):
+        # The hooks are stored in the app, initializing it again replaces them
+        span_hooks = []
+        for hooks in app.config['MONGODB_SPAN_HOOKS']:
+            if isinstance(hooks, str):
+                hooks = import_string(hooks)
+            if isinstance(hooks, type):
+                if any(type(added) is hooks for added in span_hooks):
+                    continue
+                hooks = hooks()
+            if hooks not in span_hooks:
+                span_hooks.append(hooks)
+        try:
+            set_app_span_hooks(app, span_hooks)
+        except TypeError as e:
+            raise ImproperConfiguration(f'Invalid MONGODB_SPAN_HOOKS: {e}')
+    
     def _set_default_configurations(self, app: Flask):
         db = {
             'main': {
@@ -85,6 +319,26 @@ class MongoDB:
         }
         app.config.setdefault('DATABASE', db)
         app.config.setdefault('MODELS', [])
+        app.config.setdefault('MONGODB_SHIFT_THROTTLE', 1000)  # Documents per second
+        app.config.setdefault('MONGODB_GATHER_MAX_WORKERS', 8)
+        app.config.setdefault('MONGODB_WRITE_BUFFER', {})
+        app.config.setdefault('MONGODB_JSON_ENCODER', None)  # orjson if installed, else the json module
+        app.config.setdefault('MONGODB_INSTRUMENTATION', False)
+        app.config.setdefault('MONGODB_INSTRUMENTATION_SIZES', False)  # BSON size of the commands and replies
+        app.config.setdefault('MONGODB_SERVER_TIMING', True)
+        app.config.setdefault('MONGODB_REQUEST_LOG_THRESHOLD_MS', 500)
+        app.config.setdefault('MONGODB_DETECT_N_PLUS_ONE', False)
+        app.config.setdefault('MONGODB_N_PLUS_ONE_THRESHOLD', 5)  # Different values of the same query shape
+        app.config.setdefault('MONGODB_REQUEST_QUERY_BUDGET', None)  # Maximum queries per request
+        app.config.setdefault('MONGODB_QUERY_TRACKING', False)  # For the checks of flask_mongodb.testing
+        app.config.setdefault('MONGODB_SLOW_QUERY_MS', None)
+        app.config.setdefault('MONGODB_SLOW_QUERY_EXPLAIN_RATE', 0.0)  # Fraction of slow queries to explain
+        app.config.setdefault('MONGODB_QUERY_SHAPES', False)
+        app.config.setdefault('MONGODB_QUERY_SHAPES_COLLECTION', 'query_shapes')
+        app.config.setdefault('MONGODB_QUERY_SHAPES_DATABASE', 'main')  # Alias of the database of the collection
+        app.config.setdefault('MONGODB_QUERY_SHAPES_FLUSH_INTERVAL', 60)  # Seconds
+        app.config.setdefault('MONGODB_DRIVER_METRICS', False)
+        app.config.setdefault('MONGODB_SPAN_HOOKS', [])
     
     def _get_model_list(self, app: Flask) -> list:
         if not app.config['MODELS']:
@@ -120,8 +374,117 @@ class MongoDB:
         
         # Now add the history model
         for db in self.connections.keys():
-            self.__collections[db].update(shift_history=create_db_shift_history(db))
+            self.__collections.setdefault(db, {}).update(shift_history=create_db_shift_history(db))
 
+    def get_collection(self, model_class: t.Type[CollectionModel]) -> MongoCollection:
+        """
+        Get the collection handle of a model class. It is created once, with the collection options
+        of the model, and shared by all instances of the model.
+        """
+        handle = self.__collection_handles.get(model_class)
+        if handle is None:
+            handle = MongoCollection(self[model_class.db_alias], model_class.collection_name,
+                                     **model_class.get_collection_options())
+            handle = self.__collection_handles.setdefault(model_class, handle)
+        return handle
+    
+    def get_async_database(self, using='main'):
+        """
+        Get the database of an alias on a PyMongo async client. Async clients share the connection
+        settings of the alias client, one is created per distinct connection and event loop.
+        """
+        try:
+            from pymongo import AsyncMongoClient
+        except ImportError:
+            raise ImproperConfiguration('Async support requires PyMongo 4.13 or later')
+        
+        db = self[using]
+        loop_clients = self.__async_clients.setdefault(asyncio.get_running_loop(), {})
+        client_key = self.__alias_client_keys[using]
+        client = loop_clients.get(client_key)
+        if client is None:
+            uri, options = self.__client_settings[client_key]
+            client = loop_clients[client_key] = self._create_client(AsyncMongoClient, uri, options, client_key)
+        return client[db.name]
+    
+    def get_async_collection(self, model_class: t.Type[CollectionModel]):
+        """Get the async collection handle of a model class for the running event loop"""
+        handles = self.__async_collection_handles.setdefault(asyncio.get_running_loop(), {})
+        handle = handles.get(model_class)
+        if handle is None:
+            db = self.get_async_database(model_class.db_alias)
+            handle = handles[model_class] = db.get_collection(model_class.collection_name,
+                                                               **model_class.get_collection_options())
+        return handle
+    
+    async def aclose(self):
+        """Close the async clients of the running event loop"""
+        loop = asyncio.get_running_loop()
+        self.__async_collection_handles.pop(loop, None)
+        for client in self.__async_clients.pop(loop, {}).values():
+            await client.close()
+    
+    def gather(self, *queries) -> list:
+        """
+        Run independent queries concurrently, sharing the connection pools of the clients, and return
+        their results in order. DocumentSets are evaluated to lists of models, any other query must be
+        a callable without arguments, e.g. ``docuset.count`` or ``lambda: manager.find_one(...)``.
+
+        The queries run on a thread pool of ``MONGODB_GATHER_MAX_WORKERS`` threads, in a copy of the
+        caller's context so the application and request contexts are available to them. Once all
+        queries are done, the first error, in the order of the queries, is raised.
+        """
+        calls = []
+        for query in queries:
+            if isinstance(query, DocumentSet):
+                calls.append(lambda docuset=query: list(docuset))
+            elif callable(query):
+                calls.append(query)
+            else:
+                raise TypeError('Queries must be DocumentSets or callables')
+        
+        if len(calls) <= 1 or in_worker():
+            # Nothing to parallelize, or a gathered query gathering again, which could exhaust the pool
+            return [call() for call in calls]
+        
+        executor = self.__gather_executor
+        if executor is None:
+            with self.__gather_lock:
+                if self.__gather_executor is None:
+                    self.__gather_executor = ThreadPoolExecutor(max_workers=self.__gather_max_workers,
+                                                                thread_name_prefix='flask-mongodb-gather')
+                executor = self.__gather_executor
+        futures = [submit_in_context(executor, call) for call in calls]
+        wait(futures)
+        return [future.result() for future in futures]
+    
+    @property
+    def write_buffer(self) -> WriteBuffer:
+        """Buffer of the deferred inserts, configured with ``MONGODB_WRITE_BUFFER``"""
+        if self.__write_buffer is None:
+            self.__write_buffer = WriteBuffer(**self.__write_buffer_options)
+        return self.__write_buffer
+    
+    @property
+    def query_shape_recorder(self) -> t.Optional[QueryShapeRecorder]:
+        """Recorder of the query shapes for the index advisor, when ``MONGODB_QUERY_SHAPES`` is enabled"""
+        return self.__query_shape_recorder
+    
+    @property
+    def slow_query_log(self) -> bool:
+        """Whether the clients log the slow queries, when ``MONGODB_SLOW_QUERY_MS`` is set"""
+        return self.__slow_query_listener is not None
+    
+    @property
+    def query_tracking(self) -> bool:
+        """Whether the clients record the queries for the checks of ``flask_mongodb.testing``"""
+        return any(isinstance(listener, QueryTrackingListener) for listener in self.__event_listeners)
+    
+    @property
+    def driver_metrics(self) -> t.Optional[DriverMetrics]:
+        """Connection pool and server monitoring metrics, when ``MONGODB_DRIVER_METRICS`` is enabled"""
+        return self.__driver_metrics
+    
     @property
     def collections(self):
         return self.__collections
@@ -130,12 +493,52 @@ class MongoDB:
     def connections(self):
         return self.__connections
     
-    # TODO: Disabled
-    # def session(self, causal_consistency=None, default_transaction_options=None, 
-    #             snapshot=False, using='main'):
-    #     return self.connections[using].client.start_session(causal_consistency=causal_consistency, 
-    #                                                         default_transaction_options=default_transaction_options,
-    #                                                         snapshot=snapshot)
+    @property
+    def clients(self):
+        return self.__clients
+    
+    @contextlib.contextmanager
+    def session(self, using='main', causal_consistency=None, default_transaction_options=None, snapshot=False):
+        """
+        Start a session on the client of the alias and make it the active session of the block. The
+        operations of the managers and DocumentSets of the alias in the block use the session.
+        """
+        with self.connections[using].client.start_session(causal_consistency=causal_consistency,
+                                                          default_transaction_options=default_transaction_options,
+                                                          snapshot=snapshot) as session:
+            with bind_session(session):
+                yield session
+    
+    def causal_session(self, using='main'):
+        """
+        Start a causally consistent session, see :meth:`session`. Reads in the block see the writes made
+        before them even when they are routed to secondaries.
+        """
+        return self.session(using, causal_consistency=True)
+    
+    def transaction(self, using='main', read_concern=None, write_concern=None, read_preference=None,
+                    max_commit_time_ms: t.Optional[int] = None) -> Transaction:
+        """
+        Run a transaction on the client of the alias, as a context manager or a decorator. The
+        operations of the managers and DocumentSets of the alias inside it are part of the transaction.
+        Transient errors are retried, see :class:`flask_mongodb.core.sessions.Transaction`.
+        """
+        return Transaction(using, mongo=self, read_concern=read_concern, write_concern=write_concern,
+                           read_preference=read_preference, max_commit_time_ms=max_commit_time_ms)
     
     def disconnect(self, using='main'):
+        """
+        Close the client of the database alias. The client is shared by all aliases with the same
+        connection parameters, PyMongo reopens it if any of them is used again. The deferred inserts
+        and the recorded query shapes are written first, and the threads of ``gather`` are stopped.
+        """
+        if self.__write_buffer is not None:
+            self.__write_buffer.flush()
+        if self.__query_shape_recorder is not None:
+            self.__query_shape_recorder.flush()
+        with self.__gather_lock:
+            executor, self.__gather_executor = self.__gather_executor, None
+        if executor is not None:
+            # A later gather starts a new pool
+            executor.shutdown(wait=True)
         return self.connections[using].client.close()
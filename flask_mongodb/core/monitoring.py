@@ -0,0 +1,472 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import typing as t
+import weakref
+
+import bson
+from flask import g, has_request_context
+from pymongo import UpdateOne, monitoring
+from pymongo.errors import PyMongoError
+
+from flask_mongodb.core.explain import explain_command, summarize_explain
+
+# Commands whose filter is not under the "filter" key
+_FILTER_KEYS = {
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+}
+_LOGICAL_OPERATORS = ('$and', '$or', '$nor')
+# Commands whose shapes are recorded for the index advisor
+_RECORDED_COMMANDS = ('find', 'count', 'distinct', 'aggregate', 'update', 'delete', 'findAndModify')
+# Commands that continue or clean up after others, they are not counted as queries
+_UNTRACKED_COMMANDS = ('getMore', 'killCursors', 'endSessions')
+# Commands timed by the slow query log, a getMore is timed as a batch of the query of its cursor
+_SLOW_QUERY_COMMANDS = ('find', 'aggregate', 'getMore')
+# Frames of these modules are skipped when looking for the call site of a query
+_INTERNAL_MODULES = ('flask_mongodb.', 'pymongo.', 'bson.', 'threading', 'concurrent.', 'contextvars', 'contextlib',
+                     'asyncio.', 'functools')
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+slow_query_logger = logging.getLogger('flask_mongodb.slow_queries')
+
+_slow_query_threshold: contextvars.ContextVar[t.Optional[float]] = contextvars.ContextVar(
+    'flask_mongodb_slow_query_threshold', default=None)
+_active_trackers: contextvars.ContextVar[t.Tuple['QueryTracker', ...]] = contextvars.ContextVar(
+    'flask_mongodb_query_trackers', default=())
+
+
+class NPlusOneQueryWarning(UserWarning):
+    """Warning for queries with the same shape repeated with different values, usually from a loop"""
+
+
+def query_shape(query: t.Any) -> t.Any:
+    """
+    Normalize a query filter to its shape: the fields and operators are kept and the values are
+    replaced with ``?``, so queries that only differ in their values have the same shape.
+    """
+    if not isinstance(query, dict):
+        return '?'
+    shape = {}
+    for key, value in query.items():
+        if key in _LOGICAL_OPERATORS and isinstance(value, list):
+            shape[key] = [query_shape(item) for item in value]
+        elif isinstance(value, dict):
+            shape[key] = query_shape(value)
+        else:
+            shape[key] = '?'
+    return shape
+
+
+def command_filter(command_name: str, command: t.Mapping) -> t.Optional[t.Dict]:
+    """Get the filter of a find, count, distinct, update, delete, findAndModify or aggregate command"""
+    if command_name in ('update', 'delete'):
+        statements = command.get(f'{command_name}s') or [{}]
+        return statements[0].get('q')
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline') or [{}]
+        return pipeline[0].get('$match')
+    return command.get(_FILTER_KEYS.get(command_name, 'filter'))
+
+
+def command_shape(command_name: str, command: t.Mapping) -> str:
+    """
+    Describe a command by its name, collection and filter shape, e.g.
+    ``find users {"age": {"$gt": "?"}}``.
+    """
+    collection = command.get(command_name)
+    description = f'{command_name} {collection}' if isinstance(collection, str) else command_name
+    query = command_filter(command_name, command)
+    if query is not None:
+        description += ' ' + json.dumps(query_shape(query), sort_keys=True)
+    return description
+
+
+def call_site() -> str:
+    """Get the file, line and function of the application code that is running a query"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if not frame.f_globals.get('__name__', '').startswith(_INTERNAL_MODULES):
+            return f'{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '<unknown>'
+
+
+def _bson_size(document) -> int:
+    try:
+        return len(bson.encode(document))
+    except Exception:
+        return 0
+
+
+class RequestStats:
+    """
+    Database statistics of a request, updated by the command listener and the DocumentSets. The bytes sent
+    and received are only counted with ``measure_sizes``.
+    """
+    def __init__(self, measure_sizes: bool = False):
+        self.measure_sizes = measure_sizes
+        self.commands = 0
+        self.failed = 0
+        self.db_time = 0.0  # Seconds
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.slowest_command: t.Optional[str] = None
+        self.slowest_time = 0.0
+        self.hydration_time = 0.0
+        self.hydrated = 0
+        self._started: t.Dict[t.Tuple, t.Tuple[str, int]] = {}
+        self._lock = threading.Lock()  # Gathered queries update the stats from other threads
+
+    def command_started(self, key: t.Tuple, shape: str, size: int):
+        with self._lock:
+            self._started[key] = (shape, size)
+
+    def command_finished(self, key: t.Tuple, duration: float, reply_size: int, failed=False):
+        with self._lock:
+            shape, size = self._started.pop(key, (None, 0))
+            self.commands += 1
+            self.failed += failed
+            self.db_time += duration
+            self.bytes_sent += size
+            self.bytes_received += reply_size
+            if shape is not None and duration >= self.slowest_time:
+                self.slowest_command = shape
+                self.slowest_time = duration
+
+    def add_hydration(self, duration: float, models: int = 1):
+        with self._lock:
+            self.hydration_time += duration
+            self.hydrated += models
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            'commands': self.commands,
+            'failed': self.failed,
+            'db_time_ms': self.db_time * 1000,
+            # Not measured is not the same as nothing sent
+            'bytes_sent': self.bytes_sent if self.measure_sizes else None,
+            'bytes_received': self.bytes_received if self.measure_sizes else None,
+            'slowest_command': self.slowest_command,
+            'slowest_time_ms': self.slowest_time * 1000,
+            'hydration_time_ms': self.hydration_time * 1000,
+            'hydrated': self.hydrated,
+        }
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing header with the database and hydration times"""
+        return (f'mongodb;dur={self.db_time * 1000:.2f};desc="{self.commands} commands", '
+                f'mongodb-hydration;dur={self.hydration_time * 1000:.2f}')
+
+
+def get_request_stats() -> t.Optional[RequestStats]:
+    """Get the database statistics of the current request, if instrumentation is enabled"""
+    if not has_request_context():
+        return None
+    return g.get('mongodb_stats')
+
+
+class RequestCommandListener(monitoring.CommandListener):
+    """
+    Command listener that adds the commands run during a request to its statistics. Measuring the
+    sizes encodes the commands and replies again, it is only done with ``measure_sizes``.
+    """
+    def __init__(self, measure_sizes: bool = False):
+        self.measure_sizes = measure_sizes
+
+    def _size(self, document) -> int:
+        return _bson_size(document) if self.measure_sizes else 0
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        stats = get_request_stats()
+        if stats is not None:
+            stats.command_started((event.connection_id, event.request_id),
+                                  command_shape(event.command_name, event.command), self._size(event.command))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        stats = get_request_stats()
+        if stats is not None:
+            stats.command_finished((event.connection_id, event.request_id), event.duration_micros / 1e6,
+                                   self._size(event.reply))
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        stats = get_request_stats()
+        if stats is not None:
+            stats.command_finished((event.connection_id, event.request_id), event.duration_micros / 1e6,
+                                   self._size(event.failure), failed=True)
+
+
+class QueryTracker:
+    """
+    Records the queries run while it is active, with their shape and call site, to count them and to
+    find shapes repeated with different values, the N+1 query pattern.
+    """
+    def __init__(self):
+        self.queries: t.List[t.Tuple[str, str]] = []  # Shape and call site
+        self._values: t.Dict[str, t.Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def record(self, shape: str, values: str, site: str):
+        with self._lock:
+            self.queries.append((shape, site))
+            self._values.setdefault(shape, set()).add(values)
+
+    def repeated_shapes(self, threshold: int) -> t.List[t.Tuple[str, int, t.List[str]]]:
+        """
+        Get the shapes run with at least ``threshold`` different values.
+
+        :return: List of shapes, with the number of different values and their call sites
+        """
+        with self._lock:
+            return [(shape, len(values), sorted({site for s, site in self.queries if s == shape}))
+                    for shape, values in self._values.items() if len(values) >= threshold]
+
+    def describe(self) -> str:
+        return '\n'.join(f'  {shape} at {site}' for shape, site in self.queries)
+
+    @contextlib.contextmanager
+    def activate(self) -> t.Iterator['QueryTracker']:
+        """Track the queries of the current context until the block exits"""
+        token = _active_trackers.set(_active_trackers.get() + (self,))
+        try:
+            yield self
+        finally:
+            _active_trackers.reset(token)
+
+
+def _get_trackers() -> t.Tuple[QueryTracker, ...]:
+    trackers = _active_trackers.get()
+    if has_request_context() and 'mongodb_tracker' in g:
+        trackers += (g.mongodb_tracker,)
+    return trackers
+
+
+class QueryTrackingListener(monitoring.CommandListener):
+    """Command listener that records the queries in the active :class:`QueryTracker` instances"""
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in _UNTRACKED_COMMANDS:
+            return
+        trackers = _get_trackers()
+        if not trackers:
+            return
+        shape = command_shape(event.command_name, event.command)
+        query = command_filter(event.command_name, event.command)
+        values = json.dumps(query, sort_keys=True, default=str) if query is not None else ''
+        site = call_site()
+        for tracker in trackers:
+            tracker.record(shape, values, site)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        pass
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Command listener that logs the find and aggregate commands, and the getMore commands of their cursors,
+    that take ``threshold_ms`` milliseconds or longer, with their filter shape, sort, projection and call
+    site. A ``explain_rate`` fraction of the slow queries is explained to add how the plan ran.
+    """
+    def __init__(self, threshold_ms: float, explain_rate: float = 0.0):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.databases: t.Dict[str, t.Any] = {}  # Set by the MongoDB instance to run the explain commands
+        self._started: t.Dict[t.Tuple, t.Tuple[float, str, t.Mapping, t.Any]] = {}
+        self._cursors: t.Dict[t.Tuple, t.Mapping] = {}  # Query of the open cursors, for their getMore commands
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        command_name = event.command_name
+        if command_name == 'killCursors':
+            for cursor_id in event.command.get('cursors') or ():
+                self._cursors.pop((event.connection_id, cursor_id), None)
+            return
+        if command_name not in _SLOW_QUERY_COMMANDS:
+            return
+        cursor_id = None
+        query = event.command
+        if command_name == 'getMore':
+            cursor_id = query['getMore']
+            query = self._cursors.get((event.connection_id, cursor_id))
+            if query is None:
+                return
+        threshold = _slow_query_threshold.get()
+        if threshold is None:
+            threshold = self.threshold_ms
+        self._started[(event.connection_id, event.request_id)] = (threshold, event.database_name, query, cursor_id)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        threshold, database_name, query, cursor_id = started
+        reply_cursor = event.reply.get('cursor') or {}
+        if reply_cursor.get('id'):
+            self._cursors[(event.connection_id, reply_cursor['id'])] = query
+        elif cursor_id is not None:
+            self._cursors.pop((event.connection_id, cursor_id), None)
+        duration = event.duration_micros / 1000
+        if duration >= threshold:
+            self._log(database_name, query, duration)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._started.pop((event.connection_id, event.request_id), None)
+
+    def _log(self, database_name: str, query: t.Mapping, duration_ms: float):
+        command_name = next(iter(query))
+        message = (f'Slow query on {database_name}.{query[command_name]}: {duration_ms:.1f} ms, '
+                   f'filter {json.dumps(query_shape(command_filter(command_name, query) or {}), sort_keys=True)}, '
+                   f'sort {json.dumps(dict(_command_sort(command_name, query) or {}))}, '
+                   f'projection {json.dumps(query.get("projection"), default=str)}, at {call_site()}')
+        database = self.databases.get(database_name)
+        if database is None or not self.explain_rate or random.random() >= self.explain_rate:
+            slow_query_logger.warning(message)
+            return
+        # Explaining from the listener would delay the command of the application
+        threading.Thread(target=self._explain, args=(database, query, message), name='flask-mongodb-slow-query',
+                         daemon=True).start()
+
+    @staticmethod
+    def _explain(database, query: t.Mapping, message: str):
+        try:
+            plan = summarize_explain(explain_command(database, query, 'executionStats'))
+        except PyMongoError as e:
+            message += f', explain failed: {e}'
+        else:
+            message += (f', plan {" <- ".join(plan["stages"])}, index {plan["index"]}, '
+                        f'{plan["keys_examined"]} keys and {plan["docs_examined"]} documents examined '
+                        f'for {plan["returned"]} returned')
+            if plan['docs_examined'] is not None and plan['returned'] is not None:
+                message += f' ({plan["docs_examined"] / max(plan["returned"], 1):.1f} examined per returned)'
+            if plan['collscan']:
+                message += ', COLLSCAN'
+        slow_query_logger.warning(message)
+
+
+@contextlib.contextmanager
+def slow_query_threshold(threshold_ms: t.Optional[float]) -> t.Iterator[None]:
+    """Log the queries run in the block with ``threshold_ms`` instead of the threshold of the listener"""
+    token = _slow_query_threshold.set(threshold_ms)
+    try:
+        yield
+    finally:
+        _slow_query_threshold.reset(token)
+
+
+def _command_sort(command_name: str, command: t.Mapping) -> t.Optional[t.Mapping]:
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline') or []
+        stages = pipeline[1:2] if pipeline and '$match' in pipeline[0] else pipeline[:1]
+        return next((stage['$sort'] for stage in stages if '$sort' in stage), None)
+    return command.get('sort')
+
+
+class QueryShapeRecorder(monitoring.CommandListener):
+    """
+    Command listener that counts the queries of every collection by filter shape, sort and projection,
+    with their total and maximum time. The counters are added to a collection, the input of the
+    ``shift advise-indexes`` command, every ``flush_interval`` seconds from a background thread.
+    """
+    def __init__(self, collection_name: str = 'query_shapes', flush_interval: float = 60.0):
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.collection = None  # Set by the MongoDB instance once the databases are connected
+        self._pending: t.Dict[t.Tuple[str, str, str, str, str], t.List[float]] = {}
+        self._started: t.Dict[t.Tuple, t.Tuple[str, str, str, str, str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        _flush_at_exit(self)
+
+    def reset(self):
+        """
+        Drop the counters not yet written, in a child process after a fork: the parent writes them, and
+        its locks may have been held by another thread when the process forked.
+        """
+        self._pending = {}
+        self._started = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        command = event.command
+        collection = command.get(event.command_name)
+        if (event.command_name not in _RECORDED_COMMANDS or not isinstance(collection, str)
+                or collection == self.collection_name):
+            return
+        query = command_filter(event.command_name, command)
+        projection = command.get('fields' if event.command_name == 'findAndModify' else 'projection')
+        key = (event.database_name, collection, json.dumps(query_shape(query or {}), sort_keys=True),
+               json.dumps(dict(_command_sort(event.command_name, command) or {})),
+               json.dumps(sorted(projection or ())))
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = key
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finished(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finished(event)
+
+    def _finished(self, event):
+        duration = event.duration_micros / 1000
+        with self._lock:
+            key = self._started.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            counters = self._pending.setdefault(key, [0, 0.0, 0.0])
+            counters[0] += 1
+            counters[1] += duration
+            counters[2] = max(counters[2], duration)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+        if due:
+            # Writing from the listener would delay the command of the application
+            threading.Thread(target=self.flush, name='flask-mongodb-query-shapes', daemon=True).start()
+
+    def flush(self):
+        """Add the counters recorded since the last flush to the query shapes collection"""
+        if self.collection is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            updates = [UpdateOne({'_id': ' '.join(key)},
+                                 {'$setOnInsert': {'database': key[0], 'collection': key[1], 'filter': key[2],
+                                                   'sort': key[3], 'projection': key[4]},
+                                  '$inc': {'count': count, 'total_ms': total},
+                                  '$max': {'max_ms': maximum},
+                                  '$currentDate': {'last_seen': True}}, upsert=True)
+                       for key, (count, total, maximum) in pending.items()]
+            try:
+                self.collection.bulk_write(updates, ordered=False)
+            except PyMongoError as e:
+                logger.warning('Could not record %d query shapes: %s', len(updates), e)
+
+
+def _flush_at_exit(recorder: QueryShapeRecorder):
+    # Only a weak reference, so registering the handler does not keep the recorder alive
+    ref = weakref.ref(recorder)
+
+    def _flush():
+        recorder = ref()
+        if recorder is not None:
+            recorder.flush()
+
+    atexit.register(_flush)
@@ -0,0 +1,70 @@
+import typing as t
+
+from pymongo.errors import ConfigurationError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import _MONGOS_MODES, _ServerMode, make_read_preference, read_pref_mode_from_name
+from pymongo.write_concern import WriteConcern
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+
+READ_CONCERN_LEVELS = ('local', 'available', 'majority', 'linearizable', 'snapshot')
+
+
+def get_read_preference(mode: t.Union[str, _ServerMode], max_staleness: t.Optional[int] = None) -> _ServerMode:
+    """
+    Get the read preference of a mode name, e.g. ``secondaryPreferred``. Read preference instances are
+    returned as they are.
+
+    :param mode: Read preference mode name or instance
+    :param max_staleness: Maximum replication lag, in seconds, of the secondaries to read from
+    :return: Read preference
+    """
+    if isinstance(mode, _ServerMode):
+        return mode
+    if mode not in _MONGOS_MODES:
+        raise ImproperConfiguration(f'Invalid read preference {mode}, valid modes are {", ".join(_MONGOS_MODES)}')
+    try:
+        return make_read_preference(read_pref_mode_from_name(mode),
+                                    None, -1 if max_staleness is None else max_staleness)
+    except ConfigurationError as e:
+        raise ImproperConfiguration(f'Invalid read preference {mode}: {e}')
+
+
+def get_read_concern(level: t.Union[str, ReadConcern]) -> ReadConcern:
+    """Get the read concern of a level name, e.g. ``majority``. Read concern instances are returned as they are."""
+    if isinstance(level, ReadConcern):
+        return level
+    if level not in READ_CONCERN_LEVELS:
+        raise ImproperConfiguration(f'Invalid read concern {level}, valid levels are {", ".join(READ_CONCERN_LEVELS)}')
+    return ReadConcern(level)
+
+
+def get_write_concern(value: t.Union[int, str, t.Dict[str, t.Any], WriteConcern]) -> WriteConcern:
+    """
+    Get the write concern of a ``w`` value, e.g. ``majority`` or 1, or of a dict with the
+    :class:`pymongo.write_concern.WriteConcern` arguments, e.g. ``{'w': 1, 'j': False}``. Write concern
+    instances are returned as they are.
+    """
+    if isinstance(value, WriteConcern):
+        return value
+    try:
+        if isinstance(value, dict):
+            return WriteConcern(**value)
+        return WriteConcern(w=value)
+    except (ConfigurationError, TypeError, ValueError) as e:
+        raise ImproperConfiguration(f'Invalid write concern {value}: {e}')
+
+
+def get_collection_options(read_preference=None, max_staleness: t.Optional[int] = None,
+                           read_concern=None, write_concern=None) -> t.Dict[str, t.Any]:
+    """Map the options of a model, manager or DocumentSet to collection options, leaving out the unset ones"""
+    options = {}
+    if read_preference is not None:
+        options['read_preference'] = get_read_preference(read_preference, max_staleness)
+    elif max_staleness is not None:
+        raise ImproperConfiguration('max_staleness requires a read_preference')
+    if read_concern is not None:
+        options['read_concern'] = get_read_concern(read_concern)
+    if write_concern is not None:
+        options['write_concern'] = get_write_concern(write_concern)
+    return options
@@ -0,0 +1,115 @@
+import contextlib
+import contextvars
+import functools
+import time
+import typing as t
+
+from pymongo.client_session import ClientSession
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from flask_mongodb.core.options import get_read_concern, get_read_preference, get_write_concern
+
+# Seconds to keep retrying the commit of a transaction whose result is unknown, as PyMongo does
+TRANSACTION_RETRY_TIME_LIMIT = 120
+
+_active_session: contextvars.ContextVar[t.Optional[ClientSession]] = contextvars.ContextVar(
+    'flask_mongodb_active_session', default=None)
+
+
+@contextlib.contextmanager
+def bind_session(session: ClientSession) -> t.Iterator[ClientSession]:
+    """Make the session the active session of the current context, until the block exits"""
+    token = _active_session.set(session)
+    try:
+        yield session
+    finally:
+        _active_session.reset(token)
+
+
+def get_active_session(client) -> t.Optional[ClientSession]:
+    """
+    Get the active session of the current context if it was started by the client, operations on
+    other clients cannot use it.
+    """
+    session = _active_session.get()
+    if session is None or session.client is not client or session.has_ended:
+        return None
+    return session
+
+
+class Transaction:
+    """
+    Transaction on the client of a database alias, usable as a context manager or as a decorator. The
+    manager and DocumentSet operations of the alias inside it use its session.
+
+    As a decorator, the function runs with :meth:`ClientSession.with_transaction`, which runs it again
+    on transient transaction errors and retries commits with an unknown result. As a context manager,
+    the block cannot run again, so only the commit is retried. The transaction is aborted if the block
+    or the function raises.
+    """
+    def __init__(self, using: str = 'main', mongo=None, read_concern=None, write_concern=None,
+                 read_preference=None, max_commit_time_ms: t.Optional[int] = None):
+        self.using = using
+        self._mongo = mongo
+        self.options = {
+            'read_concern': get_read_concern(read_concern) if read_concern is not None else None,
+            'write_concern': get_write_concern(write_concern) if write_concern is not None else None,
+            'read_preference': get_read_preference(read_preference) if read_preference is not None else None,
+            'max_commit_time_ms': max_commit_time_ms,
+        }
+        self._entered: t.List[t.Tuple[ClientSession, contextlib.AbstractContextManager]] = []
+
+    @property
+    def client(self):
+        mongo = self._mongo
+        if mongo is None:
+            from flask_mongodb import current_mongo
+            mongo = current_mongo
+        return mongo.connections[self.using].client
+
+    def __call__(self, func: t.Callable) -> t.Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.client.start_session() as session, bind_session(session):
+                return session.with_transaction(lambda _: func(*args, **kwargs), **self.options)
+        return wrapper
+
+    def __enter__(self) -> ClientSession:
+        session = self.client.start_session()
+        session.start_transaction(**self.options)
+        binding = bind_session(session)
+        binding.__enter__()
+        self._entered.append((session, binding))
+        return session
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        session, binding = self._entered.pop()
+        try:
+            if exc_type is None:
+                self._commit(session)
+            elif session.in_transaction:
+                session.abort_transaction()
+        finally:
+            binding.__exit__(None, None, None)
+            session.end_session()
+        return False
+
+    def _commit(self, session: ClientSession):
+        start = time.monotonic()
+        while True:
+            try:
+                return session.commit_transaction()
+            except (ConnectionFailure, OperationFailure) as e:
+                if (e.has_error_label('UnknownTransactionCommitResult')
+                        and time.monotonic() - start < TRANSACTION_RETRY_TIME_LIMIT
+                        and getattr(e, 'code', None) != 50):  # MaxTimeMSExpired, retrying would time out again
+                    continue
+                raise
+
+
+def transaction(using: str = 'main', **options) -> Transaction:
+    """
+    Transaction on the client of a database alias of ``current_mongo``, resolved when the transaction
+    starts, so it can decorate functions at import time. See :meth:`MongoDB.transaction`.
+    """
+    return Transaction(using, **options)
@@ -0,0 +1,151 @@
+import typing as t
+
+from flask import Flask, current_app, has_app_context
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_context = None
+    otel_trace = None
+
+
+class SpanHooks:
+    """
+    Callbacks of the spans of the ORM layer: fetching documents, hydrating and validating models,
+    ``to_document``, ``modified_fields`` and the write operations of the managers. Subclasses are
+    registered for the process with :func:`add_span_hooks`, or for an app with the ``MONGODB_SPAN_HOOKS``
+    configuration.
+    """
+    def start(self, name: str, attributes: t.Dict[str, t.Any]) -> t.Any:
+        """
+        Called when a span starts.
+
+        :param name: Name of the span, e.g. ``flask_mongodb.hydrate``
+        :param attributes: Attributes of the span, the same dict is passed to :meth:`end`
+        :return: Value passed to :meth:`end`
+        """
+        return None
+
+    def end(self, token: t.Any, attributes: t.Dict[str, t.Any], error: t.Optional[BaseException] = None):
+        """
+        Called when a span ends, with the attributes added while it ran.
+
+        :param token: Value returned by :meth:`start`
+        :param attributes: Attributes of the span
+        :param error: Exception raised in the span, if any
+        """
+
+
+class OpenTelemetryHooks(SpanHooks):
+    """Report the spans to OpenTelemetry, as children of the current span"""
+    def __init__(self, tracer_provider=None):
+        if otel_trace is None:
+            raise ImportError('The OpenTelemetry hooks require the opentelemetry-api package')
+        self.tracer = otel_trace.get_tracer('flask_mongodb', tracer_provider=tracer_provider)
+
+    def start(self, name: str, attributes: t.Dict[str, t.Any]) -> t.Any:
+        otel_span = self.tracer.start_span(name, attributes=attributes)
+        # Spans started inside are children of this one
+        return otel_span, otel_context.attach(otel_trace.set_span_in_context(otel_span))
+
+    def end(self, token: t.Any, attributes: t.Dict[str, t.Any], error: t.Optional[BaseException] = None):
+        otel_span, context_token = token
+        otel_context.detach(context_token)
+        otel_span.set_attributes(attributes)
+        if error is not None:
+            otel_span.record_exception(error)
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(error)))
+        otel_span.end()
+
+
+_span_hooks: t.Tuple[SpanHooks, ...] = ()
+# Spans look up the hooks of the current app once an app has them
+_APP_SPAN_HOOKS = 'flask_mongodb.span_hooks'
+_app_span_hooks_set = False
+
+
+def _check_span_hooks(hooks: SpanHooks):
+    if not callable(getattr(hooks, 'start', None)) or not callable(getattr(hooks, 'end', None)):
+        raise TypeError('Span hooks must have the start and end methods')
+
+
+def add_span_hooks(hooks: SpanHooks):
+    """Register span hooks, for all the apps of the process"""
+    global _span_hooks
+    _check_span_hooks(hooks)
+    if hooks not in _span_hooks:
+        _span_hooks = _span_hooks + (hooks,)
+
+
+def remove_span_hooks(hooks: SpanHooks):
+    global _span_hooks
+    _span_hooks = tuple(registered for registered in _span_hooks if registered is not hooks)
+
+
+def set_app_span_hooks(app: Flask, hooks: t.Sequence[SpanHooks]):
+    """Set the span hooks of the commands run in the context of an app, replacing the ones it had"""
+    global _app_span_hooks_set
+    for app_hooks in hooks:
+        _check_span_hooks(app_hooks)
+    app.extensions[_APP_SPAN_HOOKS] = tuple(hooks)
+    if hooks:
+        _app_span_hooks_set = True
+
+
+def get_span_hooks() -> t.Tuple[SpanHooks, ...]:
+    """Get the hooks of the process and the hooks of the current app"""
+    if not _app_span_hooks_set or not has_app_context():
+        return _span_hooks
+    return _span_hooks + current_app.extensions.get(_APP_SPAN_HOOKS, ())
+
+
+class Span:
+    """Span of the registered hooks, a context manager"""
+    __slots__ = ('name', 'attributes', '_hooks', '_tokens')
+
+    def __init__(self, name: str, attributes: t.Dict[str, t.Any], hooks: t.Tuple[SpanHooks, ...]):
+        self.name = name
+        self.attributes = attributes
+        self._hooks = hooks
+        self._tokens: t.List[t.Tuple[SpanHooks, t.Any]] = []
+
+    def set_attribute(self, key: str, value: t.Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._tokens = [(hooks, hooks.start(self.name, self.attributes)) for hooks in self._hooks]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for hooks, token in reversed(self._tokens):
+            hooks.end(token, self.attributes, exc)
+        return False
+
+
+class _NoSpan:
+    """Span used when there are no hooks, it does nothing"""
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: t.Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attributes) -> t.Union[Span, _NoSpan]:
+    """
+    Start a span with the registered hooks. Without hooks it returns a span that does nothing, so the
+    ORM pays a function call per span when tracing is not used.
+    """
+    hooks = get_span_hooks()
+    if not hooks:
+        return _NO_SPAN
+    return Span(name, attributes, hooks)
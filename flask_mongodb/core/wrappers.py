@@ -10,33 +10,43 @@ class MongoConnect(MongoClient, InimitableObject):
     Wrapper from the pymongo.MongoClient class
     """
     def __getattr__(self, name):
-        attr = super(MongoConnect, self).__getattr__(name)
-        if isinstance(attr, Database):
-            return MongoDatabase(self, name)
-        return attr
+        if name.startswith('_'):
+            # Let PyMongo raise the AttributeError
+            return super(MongoConnect, self).__getattr__(name)
+        return self[name]
     
     def __getitem__(self, item):
-        attr = super(MongoConnect, self).__getitem__(item)
-        if isinstance(attr, Database):
-            return MongoDatabase(self, item)
-        return attr
+        # Database wrappers are created once per name
+        databases = self.__dict__.setdefault('_wrapped_databases', {})
+        db = databases.get(item)
+        if db is None:
+            db = databases.setdefault(item, MongoDatabase(self, item))
+        return db
 
 
 class MongoDatabase(Database, InimitableObject):
     """
     Wrapper for the pymongo.database.Database class
     """
+    def rebind_client(self, client: MongoConnect):
+        """Use another client for this database and every collection created from it"""
+        # The client attribute is private and was renamed in PyMongo 4.9
+        attr = '_client' if '_client' in self.__dict__ else '_Database__client'
+        setattr(self, attr, client)
+
     def __getattr__(self, name):  # noqa: D105
-        attr = super(MongoDatabase, self).__getattr__(name)
-        if isinstance(attr, Collection):
-            return MongoCollection(self, name)
-        return attr
+        if name.startswith('_'):
+            # Let PyMongo raise the AttributeError
+            return super(MongoDatabase, self).__getattr__(name)
+        return self[name]
 
     def __getitem__(self, item):  # noqa: D105
-        item_ = super(MongoDatabase, self).__getitem__(item)
-        if isinstance(item_, Collection):
-            return MongoCollection(self, item)
-        return item_
+        # Collection wrappers are created once per name
+        collections = self.__dict__.setdefault('_wrapped_collections', {})
+        collection = collections.get(item)
+        if collection is None:
+            collection = collections.setdefault(item, MongoCollection(self, item))
+        return collection
 
 
 class MongoCollection(Collection, InimitableObject):
@@ -44,15 +54,21 @@ class MongoCollection(Collection, InimitableObject):
     Wrapper class for the pymongo.collection.Collection class
     """
     def __getattr__(self, name):  # noqa: D105
-        attr = super(MongoCollection, self).__getattr__(name)
-        if isinstance(attr, Collection):
-            db = self._Collection__database
-            return MongoCollection(db, attr.name)
-        return attr
+        if name.startswith('_'):
+            # Let PyMongo raise the AttributeError
+            return super(MongoCollection, self).__getattr__(name)
+        return self[name]
 
     def __getitem__(self, item):  # noqa: D105
-        item_ = super(MongoCollection, self).__getitem__(item)
-        if isinstance(item_, Collection):
-            db = self._Collection__database
-            return MongoCollection(db, item_.name)
-        return item_
+        # Sub-collection with the same options
+        return MongoCollection(self.database, f'{self.name}.{item}', codec_options=self.codec_options,
+                               read_preference=self.read_preference, write_concern=self.write_concern,
+                               read_concern=self.read_concern)
+
+    def with_options(self, codec_options=None, read_preference=None, write_concern=None, read_concern=None):
+        """Get a clone of this collection with different options, the unset options are kept"""
+        return MongoCollection(self.database, self.name,
+                               codec_options=codec_options or self.codec_options,
+                               read_preference=read_preference or self.read_preference,
+                               write_concern=write_concern or self.write_concern,
+                               read_concern=read_concern or self.read_concern)
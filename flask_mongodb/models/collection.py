@@ -2,12 +2,15 @@ import logging
 import typing as t
 from copy import deepcopy
 
-from bson.json_util import dumps as bson_dumps
+from bson.codec_options import CodecOptions
 
 from flask_mongodb.core.exceptions import CollectionException
+from flask_mongodb.core.options import get_collection_options
+from flask_mongodb.core.tracing import span
 from flask_mongodb.core.wrappers import MongoCollection
 from flask_mongodb.models.fields import (EmbeddedDocumentField, ObjectIdField, ReferenceIdField, Field)
 from flask_mongodb.models.manager import CollectionManager, ReferenceManager
+from flask_mongodb.utils.encoding import get_json_encoder
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
@@ -20,6 +23,13 @@ class BaseCollection:
     validation_level: str = 'strict'
     manager_class = CollectionManager
     db_alias = 'main'
+    codec_options: t.Optional[CodecOptions] = None
+    read_preference: t.Optional[str] = None
+    max_staleness: t.Optional[int] = None
+    read_concern: t.Optional[str] = None
+    write_concern: t.Optional[t.Union[int, str, t.Dict[str, t.Any]]] = None
+    deferred_writes = False
+    indexes: t.Sequence = ()  # Field names, lists of (field, direction) tuples or IndexModels
     _id = ObjectIdField(allow_null=True, default=None)
 
     def __init__(self, **field_values) -> None:
@@ -33,9 +43,11 @@ class BaseCollection:
         self._fields['_id'] = self._id
         self._connected = False
 
-        # Prepare _fields attribute
-        for name in dir(self):
-            attr = getattr(self, name)
+        # Prepare _fields attribute, fields are declared as class attributes. Looking them up in the
+        # class avoids evaluating the properties of the instance
+        model_class = type(self)
+        for name in dir(model_class):
+            attr = getattr(model_class, name)
             if hasattr(attr, '_model_field'):
                 # Copy the field
                 self._fields[name] = deepcopy(attr)
@@ -72,12 +84,6 @@ class BaseCollection:
             return field.reference
         return field.data
 
-    def __getattribute__(self, __name: str) -> t.Any:
-        attr = super().__getattribute__(__name)
-        if hasattr(attr, '_reference_manager'):
-            attr.reference_id = self['_id']
-        return attr
-
     def __str__(self):
         return self.collection_name
 
@@ -101,21 +107,25 @@ class BaseCollection:
         obj = cls.__new__(cls)
         memo[id(self)] = obj
         for k, v in self.__dict__.items():
-            setattr(obj, k, deepcopy(v, memo))
-        obj._connected = False
+            if k == '__collection__':
+                # The collection handle is shared by all instances of the model
+                setattr(obj, k, v)
+            else:
+                setattr(obj, k, deepcopy(v, memo))
         return obj
 
     def _incoming_data_to_fields(self, incoming: t.Dict, initial=False):
-        for name, field in self.fields.items():
-            try:
-                value = incoming[name]
-            except KeyError:
-                # If cannot find field in incoming, keep same field value
-                continue
+        with span('flask_mongodb.validate', model=type(self).__name__, fields=len(incoming)):
+            for name, field in self.fields.items():
+                try:
+                    value = incoming[name]
+                except KeyError:
+                    # If cannot find field in incoming, keep same field value
+                    continue
 
-            field.set_data(value)
-            if initial:
-                field.set_initial(value)
+                field.set_data(value)
+                if initial:
+                    field.set_initial(value)
 
         # Check for reference fields
         for name, field in self.fields.items():
@@ -162,6 +172,10 @@ class BaseCollection:
         self._id.set_data(value)
 
     def modified_fields(self, insert=False) -> t.Dict[str, t.Any]:
+        with span('flask_mongodb.modified_fields', model=type(self).__name__, insert=insert):
+            return self._modified_fields(insert)
+
+    def _modified_fields(self, insert: bool) -> t.Dict[str, t.Any]:
         change = {}
         for name, field in self._fields.items():
             if name == '_id':
@@ -179,6 +193,15 @@ class BaseCollection:
                     change[name] = field.get_data()
         return change
 
+    @classmethod
+    def get_collection_options(cls) -> t.Dict[str, t.Any]:
+        """Options of the model's collection handle"""
+        options = {'codec_options': cls.codec_options}
+        options = {name: value for name, value in options.items() if value is not None}
+        options.update(get_collection_options(read_preference=cls.read_preference, max_staleness=cls.max_staleness,
+                                              read_concern=cls.read_concern, write_concern=cls.write_concern))
+        return options
+
     def connect(self):
         """
         Connect to the MongoDB Collection
@@ -186,8 +209,7 @@ class BaseCollection:
         if not self._connected:
             from flask_mongodb import current_mongo
 
-            db = current_mongo.connections[self.db_alias]
-            self.__collection__ = MongoCollection(db, self.collection_name)
+            self.__collection__ = current_mongo.get_collection(type(self))
             self._connected = True
 
         return self
@@ -198,12 +220,20 @@ class BaseCollection:
 
         return self
 
-    def save(self, session=None, bypass_validation=False, comment=None):
-        return self.manager.run_save(session, bypass_validation, comment)
+    def save(self, session=None, bypass_validation=False, comment=None, deferred=None):
+        if deferred is None:
+            deferred = self.deferred_writes
+        return self.manager.run_save(session, bypass_validation, comment, deferred=deferred)
 
     def delete(self, session=None, comment=None):
         return self.manager.run_delete(session, comment)
 
+    async def asave(self, session=None, bypass_validation=False, comment=None):
+        return await self.manager.arun_save(session, bypass_validation, comment)
+
+    async def adelete(self, session=None, comment=None):
+        return await self.manager.arun_delete(session, comment)
+
 
 class CollectionModel(BaseCollection):
     def __init__(self, **field_values):
@@ -225,6 +255,10 @@ class CollectionModel(BaseCollection):
         self.schema_validators = None
 
     def to_document(self, json_parsed=False, exclude=tuple()):
+        with span('flask_mongodb.to_document', model=type(self).__name__, json_parsed=json_parsed):
+            return self._to_document(json_parsed, exclude)
+
+    def _to_document(self, json_parsed: bool, exclude: t.Sequence[str]):
         def _get_embedded_document(document_obj: t.Dict, _field_name: str,
                                    _field: t.Union[EmbeddedDocumentField, Field]):
             document_obj[_field_name] = {}
@@ -259,7 +293,7 @@ class CollectionModel(BaseCollection):
                 document[name] = field.data
 
         if json_parsed:
-            return bson_dumps(document)
+            return get_json_encoder().dumps(document)
         return document
 
     def set_model_data(self, data: t.Dict, initial=False):
@@ -267,5 +301,14 @@ class CollectionModel(BaseCollection):
         return self
 
     @property
-    def collection(self) -> t.Union[MongoCollection, None]:
+    def collection(self) -> MongoCollection:
+        if not self._connected:
+            self.connect()
         return self.__collection__
+
+    @property
+    def async_collection(self):
+        """Collection handle of the PyMongo async client for the running event loop"""
+        from flask_mongodb import current_mongo
+
+        return current_mongo.get_async_collection(type(self))
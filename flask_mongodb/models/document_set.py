@@ -1,44 +1,70 @@
+import time
 import typing as t
 from copy import deepcopy
 
+from flask import current_app, has_app_context
 from pymongo.cursor import Cursor
+from pymongo.errors import InvalidOperation
 
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.core.explain import explain_cursor, summarize_explain
 from flask_mongodb.core.mixins import InimitableObject
+from flask_mongodb.core.monitoring import get_request_stats, slow_query_threshold
+from flask_mongodb.core.options import get_collection_options
+from flask_mongodb.core.sessions import get_active_session
+from flask_mongodb.core.tracing import span
 
 
 class NotACursorMethod(Exception):
     pass
 
 
-class DocumentSet(InimitableObject):
-    def __init__(self, model, *args, **kwargs):
+class BaseDocumentSet(InimitableObject):
+    def __init__(self, model):
         from flask_mongodb.models import CollectionModel
         self._model: CollectionModel = model
-        self.__cursor = Cursor(model.collection, *args, **kwargs)
-
-    def __iter__(self):
-        return self
 
     def _model_representation(self, doc):
-        m = deepcopy(self._model)
-        m.set_model_data(doc, initial=True)
-        m.connect()
+        stats = get_request_stats()
+        start = time.perf_counter() if stats is not None else None
+        with span('flask_mongodb.hydrate', model=type(self._model).__name__):
+            m = deepcopy(self._model)
+            m.set_model_data(doc, initial=True)
+            m.connect()
+        if stats is not None:
+            stats.add_hydration(time.perf_counter() - start)
         return m
 
+
+class DocumentSet(BaseDocumentSet):
+    def __init__(self, model, *args, collection=None, slow_query_ms: t.Optional[float] = None, **kwargs):
+        super().__init__(model)
+        if slow_query_ms is not None:
+            self._check_slow_query_log()
+        self._slow_query_ms = slow_query_ms
+        if collection is None:
+            collection = model.collection
+        if kwargs.get('session') is None:
+            kwargs['session'] = get_active_session(collection.database.client)
+        self.__cursor = Cursor(collection, *args, **kwargs)
+
+    def __iter__(self):
+        return self
+
     def next(self):
-        return self._model_representation(next(self.__cursor))
+        return self._model_representation(self._fetch(self.__cursor, next))
 
     __next__ = next
 
     def first(self):
-        doc = list(self.__cursor.clone().limit(-1))
+        doc = self._fetch(self.__cursor.clone().limit(-1), list)
         if not doc:
             return None
         m = self._model_representation(doc[0])
         return m
 
     def last(self):
-        doc = list(self.__cursor.clone())
+        doc = self._fetch(self.__cursor.clone(), list)
         if not doc:
             return None
         m = self._model_representation(doc[-1])
@@ -67,7 +93,90 @@ class DocumentSet(InimitableObject):
         return self
 
     def count(self):
-        return len(list(self.__cursor.clone()))
+        return len(self._fetch(self.__cursor.clone(), list))
+
+    def _fetch(self, cursor: Cursor, fetch: t.Callable[[Cursor], t.Any]):
+        with span('flask_mongodb.fetch', model=type(self._model).__name__, collection=cursor.collection.full_name):
+            if self._slow_query_ms is None:
+                return fetch(cursor)
+            # The slow query listener times the commands the fetch runs with the threshold of the DocumentSet
+            with slow_query_threshold(self._slow_query_ms):
+                return fetch(cursor)
+
+    @staticmethod
+    def _check_slow_query_log():
+        mongo = getattr(current_app, 'mongo', None) if has_app_context() else None
+        if mongo is None or not mongo.slow_query_log:
+            raise ImproperConfiguration('The slow query log needs MONGODB_SLOW_QUERY_MS to be set')
+
+    def log_slow_queries(self, threshold_ms: float):
+        """
+        Log the queries of the DocumentSet that take ``threshold_ms`` milliseconds or longer, instead of
+        the threshold of the manager or the ``MONGODB_SLOW_QUERY_MS`` configuration.
+
+        :param threshold_ms: Threshold in milliseconds
+        :return: Self
+        """
+        self._check_slow_query_log()
+        self._slow_query_ms = threshold_ms
+        return self
+
+    def explain(self, verbosity: str = 'executionStats') -> t.Dict[str, t.Any]:
+        """
+        Explain the query of the DocumentSet, without evaluating it. The summary has the stages of the
+        winning plan (``stage`` and ``stages``), the first ``index`` it uses and all of them (``indexes``),
+        whether it is a collection scan (``collscan``) or sorts in memory (``in_memory_sort``) and, unless
+        the verbosity is ``queryPlanner``, the ``keys_examined``, ``docs_examined``, ``returned`` and
+        ``execution_time_ms``.
+
+        :param verbosity: ``queryPlanner``, ``executionStats`` or ``allPlansExecution``
+        :return: Summary of the plan
+        """
+        return summarize_explain(explain_cursor(self.__cursor, verbosity))
+
+    def raw_batches(self, batch_size: int = 100) -> t.Iterator[t.List[t.Dict]]:
+        """
+        Iterate the documents of the query as they come from the database, without building models,
+        in lists of up to ``batch_size`` documents. The DocumentSet itself is not consumed.
+
+        :param batch_size: Number of documents per list, and per batch fetched from the database
+        :return: Iterator of lists of documents
+        """
+        batch = []
+        for doc in self.__cursor.clone().batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _with_collection_options(self, **options):
+        if self.__cursor.cursor_id is not None or self.__cursor.retrieved:
+            raise InvalidOperation('Cannot change the options of a DocumentSet that was already evaluated')
+        collection = self.__cursor.collection.with_options(**get_collection_options(**options))
+        # Keep the filter, sorting and the other cursor modifiers on a cursor of the new collection
+        self.__cursor = self.__cursor._clone(True, base=Cursor(collection, session=self.__cursor.session))
+        return self
+
+    def using_read_preference(self, mode: str, max_staleness: t.Optional[int] = None):
+        """
+        Route the query with a read preference, e.g. ``secondaryPreferred`` to read from secondaries.
+
+        :param mode: Read preference mode name or :mod:`pymongo.read_preferences` instance
+        :param max_staleness: Maximum replication lag, in seconds, of the secondaries to read from
+        :return: Self
+        """
+        return self._with_collection_options(read_preference=mode, max_staleness=max_staleness)
+
+    def using_read_concern(self, level: str):
+        """
+        Run the query with a read concern, e.g. ``majority``.
+
+        :param level: Read concern level or :class:`pymongo.read_concern.ReadConcern` instance
+        :return: Self
+        """
+        return self._with_collection_options(read_concern=level)
 
     def run_cursor_method(self, meth_name: str, *args, **kwargs):
         """Run a direct cursor method"""
@@ -88,3 +197,68 @@ class DocumentSet(InimitableObject):
             self.__cursor = obj
         else:
             return obj
+
+
+class AsyncDocumentSet(BaseDocumentSet):
+    """
+    DocumentSet for the asyncio managers, built on the PyMongo async cursor. Iterate it with ``async for``
+    and await its query methods.
+    """
+    def __init__(self, model, *args, collection=None, **kwargs):
+        super().__init__(model)
+        if collection is None:
+            collection = model.async_collection
+        self.__cursor = collection.find(*args, **kwargs)
+
+    def __aiter__(self):
+        return self
+
+    async def next(self):
+        return self._model_representation(await self.__cursor.next())
+
+    __anext__ = next
+
+    async def first(self):
+        doc = await self.__cursor.clone().limit(-1).to_list()
+        if not doc:
+            return None
+        return self._model_representation(doc[0])
+
+    async def last(self):
+        doc = await self.__cursor.clone().to_list()
+        if not doc:
+            return None
+        return self._model_representation(doc[-1])
+
+    async def to_list(self, length: t.Optional[int] = None) -> list:
+        """
+        Get the models of the documents.
+
+        :param length: Maximum number of documents to get, all of them by default
+        :return: List of models
+        """
+        docs = await self.__cursor.to_list(length)
+        return [self._model_representation(doc) for doc in docs]
+
+    def limit(self, number: int):
+        """
+        Limit the number of elements.
+
+        :param number: Integer to limit the DocumentSet
+        :return: Self
+        """
+        self.__cursor = self.__cursor.limit(number)
+        return self
+
+    def sort(self, sorting: t.Tuple[t.Tuple[str, int]]):
+        """
+        Sort the DocumentSet by the sorting list, see :meth:`DocumentSet.sort`.
+
+        :param sorting: Tuple of tuples of string and integer
+        :return: Self
+        """
+        self.__cursor = self.__cursor.sort(key_or_list=sorting)
+        return self
+
+    async def count(self):
+        return len(await self.__cursor.clone().to_list())
@@ -1,17 +1,97 @@
+import functools
+import inspect
 import typing as t
+from copy import copy
 
 from bson import ObjectId
 from pymongo.client_session import ClientSession
 from pymongo.results import InsertOneResult, UpdateResult, DeleteResult
 
 from flask_mongodb.core.exceptions import OperationNotAllowed, CollectionException
-from flask_mongodb.models.document_set import DocumentSet
+from flask_mongodb.core.options import get_collection_options
+from flask_mongodb.core.sessions import get_active_session
+from flask_mongodb.core.tracing import span
+from flask_mongodb.models.document_set import AsyncDocumentSet, DocumentSet
+
+
+def traced_write(method):
+    """Run a write method of a manager in a ``flask_mongodb.write`` span with the operation"""
+    operation = method.__name__
+
+    def write_span(manager):
+        return span('flask_mongodb.write', model=type(manager._model).__name__,
+                    collection=manager._model.collection_name, operation=operation)
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            with write_span(self):
+                return await method(self, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with write_span(self):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class BaseManager:
+    # Slow query log threshold of the queries of the manager, in milliseconds, MONGODB_SLOW_QUERY_MS when None
+    slow_query_ms: t.Optional[float] = None
+    
     def __init__(self, model=None):
         from flask_mongodb.models import CollectionModel
         self._model: CollectionModel = model
+        self._collection_options: t.Dict[str, t.Any] = {}
+        self._collection = None
+    
+    @property
+    def collection(self):
+        """Collection handle of the model, with the options of :meth:`with_options`"""
+        if not self._collection_options:
+            return self._model.collection
+        if self._collection is None:
+            self._collection = self._model.collection.with_options(**self._collection_options)
+        return self._collection
+    
+    @property
+    def async_collection(self):
+        """Async collection handle of the model for the running event loop, with the options of :meth:`with_options`"""
+        if get_active_session(self.collection.database.client) is not None:
+            # The sessions of current_mongo belong to the sync client, the async operations would run outside of them
+            raise OperationNotAllowed('Async operations cannot run in the session or transaction of current_mongo')
+        collection = self._model.async_collection
+        if self._collection_options:
+            collection = collection.with_options(**self._collection_options)
+        return collection
+    
+    def with_options(self, read_preference=None, max_staleness: t.Optional[int] = None, read_concern=None,
+                     write_concern=None):
+        """
+        Get a copy of the manager whose operations use other options than the ones of the model.
+
+        :param read_preference: Read preference mode name, e.g. ``secondaryPreferred``, or instance
+        :param max_staleness: Maximum replication lag, in seconds, of the secondaries to read from
+        :param read_concern: Read concern level, e.g. ``majority``, or instance
+        :param write_concern: ``w`` value, e.g. ``majority`` or 0, dict of WriteConcern arguments or instance
+        :return: Manager
+        """
+        manager = copy(self)
+        manager._collection_options = {**self._collection_options,
+                                       **get_collection_options(read_preference=read_preference,
+                                                                max_staleness=max_staleness,
+                                                                read_concern=read_concern,
+                                                                write_concern=write_concern)}
+        manager._collection = None
+        return manager
+    
+    def _get_session(self, session: t.Optional[ClientSession] = None) -> t.Optional[ClientSession]:
+        # Operations join the active session of the context, see MongoDB.causal_session. Unacknowledged
+        # writes cannot use sessions
+        if session is not None or not self.collection.write_concern.acknowledged:
+            return session
+        return get_active_session(self.collection.database.client)
     
     def _clean_query(self, **q):
         """
@@ -30,16 +110,11 @@ class BaseManager:
                 _filter[key] = value
         return _filter
     
-    def __getattribute__(self, __name: str) -> t.Any:
-        attr = super().__getattribute__(__name)
-        if hasattr(attr, '_is_model'):
-            attr.connect()
-        return attr
-    
     # Read operations
     def find(self, **filter):
         _filter = self._clean_query(**filter)
-        docuset = DocumentSet(self._model, filter=_filter)
+        docuset = DocumentSet(self._model, filter=_filter, collection=self.collection,
+                              slow_query_ms=self.slow_query_ms)
         return docuset
     
     def all(self):
@@ -49,26 +124,37 @@ class BaseManager:
         if '_id' in filter and isinstance(filter['_id'], str):
             filter['_id'] = ObjectId(filter['_id'])
         _filter = self._clean_query(**filter)
-        docuset = DocumentSet(self._model, filter=_filter)
+        docuset = DocumentSet(self._model, filter=_filter, collection=self.collection,
+                              slow_query_ms=self.slow_query_ms)
         model = docuset.first()
         return model
     
     # Create, Update, Delete (CUD) operations
+    @traced_write
     def run_save(self, session: t.Optional[ClientSession] = None, bypass_validation=False,
-                 comment: t.Optional[str] = None) -> t.Union[InsertOneResult, UpdateResult]:
+                 comment: t.Optional[str] = None,
+                 deferred=False) -> t.Union[InsertOneResult, UpdateResult, bool]:
         model_pk = self._model.pk
+        if deferred and model_pk is None:
+            if session is not None or bypass_validation or comment is not None:
+                raise OperationNotAllowed('Deferred inserts cannot use a session, bypass validation or a comment')
+            if self._get_session() is None:
+                return self._deferred_insert()
+            # The write buffer does not use sessions, inside a transaction or a causal session the insert runs now
+        
+        session = self._get_session(session)
         if model_pk is None:
             # It is a new item
             insert_data = self._model.modified_fields(insert=True)
-            ack = self._model.collection.insert_one(insert_data,
-                                                    session=session,
-                                                    bypass_document_validation=bypass_validation,
-                                                    comment=comment)
+            ack = self.collection.insert_one(insert_data,
+                                             session=session,
+                                             bypass_document_validation=bypass_validation,
+                                             comment=comment)
             self._model['_id'] = ack.inserted_id
         else:
             # Must do an update
             modified_fields = self._model.modified_fields()
-            ack = self._model.collection.update_one(
+            ack = self.collection.update_one(
                 {'_id': self._model.pk},
                 {
                     '$set': modified_fields
@@ -78,11 +164,25 @@ class BaseManager:
 
         return ack
 
+    def _deferred_insert(self) -> bool:
+        from flask_mongodb import current_mongo
+        
+        insert_data = self._model.modified_fields(insert=True)
+        # The id is generated here so the model has its primary key before the insert runs
+        insert_data['_id'] = ObjectId()
+        buffered = current_mongo.write_buffer.put(self.collection, insert_data)
+        if buffered:
+            # A document dropped by the buffer policy is never written, the model stays without a primary key
+            self._model['_id'] = insert_data['_id']
+        return buffered
+    
+    @traced_write
     def run_delete(self, session: t.Optional[ClientSession] = None, comment: t.Optional[str] = None, **options):
-        ack = self._model.collection.delete_one({'_id': self._model.pk}, session=session, comment=comment,
-                                                **options)
+        ack = self.collection.delete_one({'_id': self._model.pk}, session=self._get_session(session),
+                                         comment=comment, **options)
         return ack
 
+    @traced_write
     def insert_one(self, **insert_data):
         if not insert_data:
             raise ValueError('Must provide data to insert')
@@ -95,10 +195,11 @@ class BaseManager:
             field.set_data(value)
 
         insert = self._model.modified_fields(insert=True)
-        ack = self._model.collection.insert_one(insert)
+        ack = self.collection.insert_one(insert, session=self._get_session())
         self._model['_id'] = ack.inserted_id
         return self._model
     
+    @traced_write
     def update_one(self, query, update, update_type='$set', **options):
         assert isinstance(query, dict)
         assert isinstance(update, dict)
@@ -106,27 +207,116 @@ class BaseManager:
         query = self._clean_query(**query)
         update = self._clean_query(**update)
         update = {update_type: update}
-        ack = self._model.collection.update_one(query, update, **options)
+        options['session'] = self._get_session(options.get('session'))
+        ack = self.collection.update_one(query, update, **options)
+        if not self.collection.write_concern.acknowledged:
+            # The update may not be applied yet, there is nothing to read back
+            return None
         if not ack.acknowledged:
             raise CollectionException('Insert not acknowledged')
         return self.find_one(**query)
     
+    @traced_write
     def delete_one(self, query, **options) -> DeleteResult:
         """Remove one and only one document"""
         assert isinstance(query, dict)
 
         q = self._clean_query(**query)
-        ack = self._model.collection.delete_one(q, **options)
+        options['session'] = self._get_session(options.get('session'))
+        ack = self.collection.delete_one(q, **options)
         return ack
     
+    @traced_write
     def delete_many(self, query, **options) -> DeleteResult:
         """Delete all records that match the query"""
         assert isinstance(query, dict)
 
         q = self._clean_query(**query)
-        ack = self._model.collection.delete_many(q, **options)
+        options['session'] = self._get_session(options.get('session'))
+        ack = self.collection.delete_many(q, **options)
         return ack
 
+    # Async read operations
+    def afind(self, **filter) -> AsyncDocumentSet:
+        _filter = self._clean_query(**filter)
+        return AsyncDocumentSet(self._model, filter=_filter, collection=self.async_collection)
+
+    def aall(self) -> AsyncDocumentSet:
+        return self.afind()
+
+    async def afind_one(self, **filter):
+        if '_id' in filter and isinstance(filter['_id'], str):
+            filter['_id'] = ObjectId(filter['_id'])
+        _filter = self._clean_query(**filter)
+        return await AsyncDocumentSet(self._model, filter=_filter, collection=self.async_collection).first()
+
+    # Async Create, Update, Delete (CUD) operations
+    @traced_write
+    async def arun_save(self, session=None, bypass_validation=False,
+                        comment: t.Optional[str] = None) -> t.Union[InsertOneResult, UpdateResult]:
+        collection = self.async_collection
+        if self._model.pk is None:
+            # It is a new item
+            insert_data = self._model.modified_fields(insert=True)
+            ack = await collection.insert_one(insert_data, session=session,
+                                              bypass_document_validation=bypass_validation, comment=comment)
+            self._model['_id'] = ack.inserted_id
+        else:
+            # Must do an update
+            ack = await collection.update_one({'_id': self._model.pk}, {'$set': self._model.modified_fields()},
+                                              session=session, bypass_document_validation=bypass_validation,
+                                              comment=comment)
+        return ack
+
+    @traced_write
+    async def arun_delete(self, session=None, comment: t.Optional[str] = None, **options) -> DeleteResult:
+        return await self.async_collection.delete_one({'_id': self._model.pk}, session=session, comment=comment,
+                                                      **options)
+
+    @traced_write
+    async def ainsert_one(self, **insert_data):
+        if not insert_data:
+            raise ValueError('Must provide data to insert')
+
+        insert_data.pop('_id', None)
+        for key, value in insert_data.items():
+            field = getattr(self._model, key, None)
+            if field is None or not hasattr(field, '_model_field'):
+                continue
+            field.set_data(value)
+
+        insert = self._model.modified_fields(insert=True)
+        ack = await self.async_collection.insert_one(insert)
+        self._model['_id'] = ack.inserted_id
+        return self._model
+
+    @traced_write
+    async def aupdate_one(self, query, update, update_type='$set', **options):
+        assert isinstance(query, dict)
+        assert isinstance(update, dict)
+
+        query = self._clean_query(**query)
+        update = {update_type: self._clean_query(**update)}
+        collection = self.async_collection
+        ack = await collection.update_one(query, update, **options)
+        if not collection.write_concern.acknowledged:
+            return None
+        if not ack.acknowledged:
+            raise CollectionException('Insert not acknowledged')
+        return await self.afind_one(**query)
+
+    @traced_write
+    async def adelete_one(self, query, **options) -> DeleteResult:
+        """Remove one and only one document"""
+        assert isinstance(query, dict)
+        return await self.async_collection.delete_one(self._clean_query(**query), **options)
+
+    @traced_write
+    async def adelete_many(self, query, **options) -> DeleteResult:
+        """Delete all records that match the query"""
+        assert isinstance(query, dict)
+        return await self.async_collection.delete_many(self._clean_query(**query), **options)
+
 
 class CollectionManager(BaseManager):
     pass
@@ -139,6 +329,14 @@ class ReferenceManager(BaseManager):
         super().__init__(model)
         self.field_name = field_name
         self.reference_id = None
+
+    def __get__(self, instance, owner):
+        # Accessed from a referenced model instance, bind a copy of the manager to its id
+        if instance is None:
+            return self
+        manager = copy(self)
+        manager.reference_id = instance['_id']
+        return manager
     
     def all(self):
         _filter = {
@@ -170,3 +368,31 @@ class ReferenceManager(BaseManager):
     
     def delete_many(self, query, **options) -> DeleteResult:
         raise OperationNotAllowed()
+
+    def aall(self):
+        _filter = {
+            self.field_name + '_id': self.reference_id
+        }
+        return super().afind(**_filter)
+
+    def afind(self, **filter):
+        if self.field_name + '_id' not in filter:
+            filter[self.field_name + '_id'] = self.reference_id
+        return super().afind(**filter)
+
+    async def afind_one(self, **filter):
+        if self.field_name + '_id' not in filter:
+            filter[self.field_name + '_id'] = self.reference_id
+        return await super().afind_one(**filter)
+
+    async def ainsert_one(self, **insert_data):
+        raise OperationNotAllowed()
+
+    async def aupdate_one(self, query, update, update_type='', **options):
+        raise OperationNotAllowed()
+
+    async def adelete_one(self, query, **options) -> DeleteResult:
+        raise OperationNotAllowed()
+
+    async def adelete_many(self, query, **options) -> DeleteResult:
+        raise OperationNotAllowed()
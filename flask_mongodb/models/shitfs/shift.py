@@ -1,7 +1,8 @@
+import time
 import typing as t
 from copy import copy
 
-from flask_mongodb.cli.utils import define_schema_validator
+from flask_mongodb.cli.utils import define_schema_validator, get_storage_stats
 from flask_mongodb.core.exceptions import NoDatabaseShiftingRequired, idUnmodifiable
 from flask_mongodb.core.wrappers import MongoDatabase
 from flask_mongodb.models.collection import CollectionModel
@@ -164,6 +165,55 @@ class Shift:
                             raise idUnmodifiable('Cannot delete _id field')
                         self.removed_fields.append(name)
 
+    def _get_pending_changes(self) -> t.List[t.Dict[str, t.Any]]:
+        """List the pending changes with the filter of the documents each one of them modifies"""
+        changes = []
+        for field_path in self.removed_fields:
+            changes.append({'change': 'removed', 'field': field_path, 'filter': {field_path: {'$exists': True}}})
+        for field_path in self.new_fields:
+            changes.append({'change': 'new', 'field': field_path, 'filter': {field_path: {'$exists': False}}})
+        for field_path, mod in self.altered_fields.items():
+            # A replaced field is rewritten in every document, a required status change only alters the schema.
+            # A field that stops being an EnumField is recorded with its new type, without replace, and is rewritten
+            replace = mod.get('replace', True)
+            changes.append({'change': 'altered', 'field': field_path, 'filter': {} if replace else None})
+        return changes
+
+    def estimate(self, throttle: int) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Estimate the cost of shifting the collection without modifying it.
+
+        :param throttle: Documents written per second the runtime estimation assumes
+        :return: Collection statistics and the pending changes with the number of documents affected, or None if
+            no shifting is required
+        """
+        if not self.examine():
+            return None
+
+        collection = self._get_collection(self._get_database())
+        stats = get_storage_stats(collection)
+        del stats['index_sizes']
+        leading_index_keys = [index['key'][0][0] for index in collection.index_information().values()]
+
+        changes = self._get_pending_changes()
+        for change in changes:
+            if change['filter'] is None:
+                change.update(documents=0, indexed=None)
+            elif not change['filter']:
+                change.update(documents=stats['count'], indexed=None)
+            else:
+                change.update(documents=collection.count_documents(change['filter']),
+                              indexed=change['field'] in leading_index_keys)
+
+        documents = sum(change['documents'] for change in changes)
+        return {
+            'collection': self._model.collection_name,
+            **stats,
+            'changes': changes,
+            'documents': documents,
+            'runtime': documents / throttle
+        }
+
     def get_collection_data(self):
         db = self._get_database()
         collection = self._get_collection(db)
@@ -187,7 +237,37 @@ class Shift:
         changes = self.verify()
         return changes
 
-    def shift(self):
+    @staticmethod
+    def _update_documents(collection, update: t.Dict[str, t.Any], throttle: t.Optional[int]):
+        """
+        Apply an update to every document of the collection, at most ``throttle`` documents per second. The
+        documents are updated in batches of their ids, waiting after each batch until the rate allows the next.
+        """
+        if throttle is None:
+            collection.update_many({}, update)
+            return
+
+        batch_size = min(throttle, 1000)
+        started = time.monotonic()
+        updated = 0
+        ids = []
+        for document in collection.find({}, {'_id': 1}).sort('_id', 1).batch_size(batch_size):
+            ids.append(document['_id'])
+            if len(ids) < batch_size:
+                continue
+            collection.update_many({'_id': {'$in': ids}}, update)
+            updated += len(ids)
+            ids = []
+            time.sleep(max(0.0, started + updated / throttle - time.monotonic()))
+        if ids:
+            collection.update_many({'_id': {'$in': ids}}, update)
+
+    def shift(self, throttle: t.Optional[int] = None):
+        """
+        Update the documents and the schema of the collection to the model.
+
+        :param throttle: Documents updated per second by every change, not limited by default
+        """
         def _find_embedded_property_default(embedded_field: EmbeddedDocumentField, _p_path: list):
             prop_name = _p_path.pop(0)  # Get the top level field name
             doc_property: Field = embedded_field.properties[prop_name]
@@ -206,7 +286,7 @@ class Shift:
 
         # First manage fields that have been removed
         for field_path in self.removed_fields:
-            collection.update_many({}, {'$unset': {field_path: 1}})
+            self._update_documents(collection, {'$unset': {field_path: 1}}, throttle)
 
         # Then add new fields
         for field_path in self.new_fields:
@@ -219,11 +299,12 @@ class Shift:
             else:
                 model_field = self._model.fields[field_path]
                 value = model_field.data
-            collection.update_many({}, {'$set': {field_path: value}})
+            self._update_documents(collection, {'$set': {field_path: value}}, throttle)
 
         # Finally, modify altered fields
         for field_path, mod in self.altered_fields.items():
-            if mod['replace']:
+            # Fields that stop being an EnumField are recorded without replace
+            if mod.get('replace', True):
                 if '.' in field_path:
                     property_path = field_path.split('.')
                     field = property_path.pop(0)
@@ -232,7 +313,7 @@ class Shift:
                 else:
                     model_field = self._model.fields[field_path]
                     value = model_field.data
-                collection.update_many({}, {'$set': {field_path: value}})
+                self._update_documents(collection, {'$set': {field_path: value}}, throttle)
 
         # Create the new schema
         self._set_model_schema()
@@ -0,0 +1,90 @@
+import abc
+import contextlib
+import typing as t
+
+from flask import has_app_context
+
+from flask_mongodb.core.exceptions import ImproperConfiguration, NPlusOneQueryDetected, QueryBudgetExceeded
+from flask_mongodb.core.monitoring import QueryTracker
+from flask_mongodb.globals import get_current_mongo
+from flask_mongodb.models.document_set import DocumentSet
+
+
+class _TrackedBlock(contextlib.ContextDecorator, abc.ABC):
+    def __init__(self):
+        self._entered: t.List[t.Tuple[QueryTracker, contextlib.AbstractContextManager]] = []
+
+    def __enter__(self) -> QueryTracker:
+        mongo = get_current_mongo() if has_app_context() else None
+        if mongo is None or not mongo.query_tracking:
+            # Without the listener no query is recorded and every check would pass
+            raise ImproperConfiguration('Queries are not tracked, set MONGODB_QUERY_TRACKING to True in the '
+                                        'configuration of the tests and use them in the application context')
+        tracker = QueryTracker()
+        activation = tracker.activate()
+        activation.__enter__()
+        self._entered.append((tracker, activation))
+        return tracker
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        tracker, activation = self._entered.pop()
+        activation.__exit__(None, None, None)
+        if exc_type is None:
+            self.check(tracker)
+        return False
+
+    @abc.abstractmethod
+    def check(self, tracker: QueryTracker):
+        """Raise when the queries of the tracker fail the check"""
+
+
+class query_budget(_TrackedBlock):
+    """
+    Fail with :class:`QueryBudgetExceeded` when the block or the decorated function runs more than
+    ``max_queries`` queries. Cursor batches after the first one are not counted.
+
+    .. code-block:: python
+
+        @query_budget(2)
+        def test_list_orders(client):
+            client.get('/orders')
+    """
+    def __init__(self, max_queries: int):
+        super().__init__()
+        self.max_queries = max_queries
+
+    def check(self, tracker: QueryTracker):
+        if len(tracker) > self.max_queries:
+            raise QueryBudgetExceeded(f'{len(tracker)} queries ran, the budget is {self.max_queries}:\n'
+                                      f'{tracker.describe()}')
+
+
+class detect_n_plus_one(_TrackedBlock):
+    """
+    Fail with :class:`NPlusOneQueryDetected` when the block or the decorated function runs a query
+    shape with ``threshold`` or more different values, e.g. a ``find_one`` by id in a loop.
+    """
+    def __init__(self, threshold: int = 2):
+        super().__init__()
+        self.threshold = threshold
+
+    def check(self, tracker: QueryTracker):
+        repeated = tracker.repeated_shapes(self.threshold)
+        if repeated:
+            raise NPlusOneQueryDetected('\n'.join(f'{shape} ran with {values} different values at {", ".join(sites)}'
+                                                  for shape, values, sites in repeated))
+
+
+def assert_uses_index(docuset: DocumentSet, index_name: str):
+    """Assert that the winning plan of the DocumentSet query uses the index"""
+    plan = docuset.explain('queryPlanner')
+    if index_name not in plan['indexes']:
+        raise AssertionError(f'The query does not use index {index_name}, plan {" <- ".join(plan["stages"])} '
+                             f'with indexes {plan["indexes"]}')
+
+
+def assert_no_collscan(docuset: DocumentSet):
+    """Assert that the winning plan of the DocumentSet query does not scan the whole collection"""
+    plan = docuset.explain('queryPlanner')
+    if plan['collscan']:
+        raise AssertionError(f'The query scans the collection, plan {" <- ".join(plan["stages"])}')
@@ -0,0 +1,52 @@
+import contextvars
+import typing as t
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+T = t.TypeVar('T')
+R = t.TypeVar('R')
+
+_in_worker: contextvars.ContextVar[bool] = contextvars.ContextVar('flask_mongodb_in_worker', default=False)
+
+
+def _run_in_worker(func: t.Callable[..., R], *args) -> R:
+    _in_worker.set(True)
+    return func(*args)
+
+
+def submit_in_context(executor: Executor, func: t.Callable[..., R], *args) -> 'Future[R]':
+    """Submit ``func`` to the executor, to run in a copy of the caller's context"""
+    return executor.submit(contextvars.copy_context().run, _run_in_worker, func, *args)
+
+
+def in_worker() -> bool:
+    """Whether the caller runs in a worker thread started by this module"""
+    return _in_worker.get()
+
+
+def map_concurrently(func: t.Callable[[T], R], items: t.Iterable[T], jobs: int = 1) -> t.List[R]:
+    """
+    Apply ``func`` to every item using up to ``jobs`` threads.
+
+    Each call runs in a copy of the caller's context, so the Flask application context (and with it
+    ``current_mongo``) is available inside the worker threads. Results are returned in the same order
+    as ``items`` and the first exception raised by ``func`` is re-raised in the caller.
+
+    :param func: Callable that receives one item
+    :param items: Items to process
+    :param jobs: Maximum number of worker threads, 1 runs everything in the calling thread
+    :return: List with the result of each call, in the order of the items
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    executor = ThreadPoolExecutor(max_workers=min(jobs, len(items)))
+    try:
+        futures = [submit_in_context(executor, func, item) for item in items]
+        return [future.result() for future in futures]
+    except BaseException:
+        # Do not start work that is still queued when one of the calls failed
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
@@ -0,0 +1,146 @@
+import datetime
+import json
+import math
+import typing as t
+
+from bson import ObjectId, json_util
+from flask import Flask, current_app, has_app_context
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+_ZERO_OFFSET = datetime.timedelta(0)
+_NON_FINITE = {math.inf: 'Infinity', -math.inf: '-Infinity'}
+
+
+def default(obj: t.Any) -> t.Any:
+    """
+    ``default`` function for the JSON encoders with the output of :func:`bson.json_util.dumps` in
+    relaxed mode. ObjectIds and UTC datetimes, the most common BSON values, skip the type lookup of
+    ``json_util``, any other value is encoded by it. Dates are encoded as the midnight datetimes the
+    date fields store.
+    """
+    if type(obj) is ObjectId:
+        return {'$oid': str(obj)}
+    if type(obj) is datetime.date:
+        obj = datetime.datetime(obj.year, obj.month, obj.day)
+    if (type(obj) is datetime.datetime and obj.year >= 1970
+            and (obj.tzinfo is None or obj.utcoffset() == _ZERO_OFFSET)):
+        # Milliseconds only when there are any, as json_util does
+        timespec = 'milliseconds' if obj.microsecond >= 1000 else 'seconds'
+        if obj.tzinfo is not None:
+            obj = obj.replace(tzinfo=None)
+        return {'$date': obj.isoformat(timespec=timespec) + 'Z'}
+    return json_util.default(obj)
+
+
+def replace_non_finite(obj: t.Any) -> t.Any:
+    """
+    Replace the NaN and infinite floats of a document with their Extended JSON representation, e.g.
+    ``{"$numberDouble": "NaN"}``, which JSON cannot represent. The encoders only call it for the
+    documents that have them.
+    """
+    if isinstance(obj, float):
+        if math.isfinite(obj):
+            return obj
+        return {'$numberDouble': 'NaN' if math.isnan(obj) else _NON_FINITE[obj]}
+    if isinstance(obj, dict):
+        return {key: replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [replace_non_finite(value) for value in obj]
+    return obj
+
+
+class JSONEncoder:
+    """
+    Encoder of documents to compact JSON, built on the :mod:`json` module. Encoders used with
+    :func:`set_json_encoder` must provide the ``dumps`` and ``dumps_bytes`` methods.
+    """
+    def __init__(self):
+        self._encoder = json.JSONEncoder(default=default, separators=(',', ':'), allow_nan=False)
+
+    def dumps(self, obj: t.Any) -> str:
+        try:
+            return self._encoder.encode(obj)
+        except ValueError:
+            # NaN or an infinite float
+            return self._encoder.encode(replace_non_finite(obj))
+
+    def dumps_bytes(self, obj: t.Any) -> bytes:
+        return self.dumps(obj).encode()
+
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    Encoder of documents to compact JSON, built on ``orjson``. The documents orjson cannot encode, with
+    keys that are not strings or integers that do not fit in 64 bits, are encoded by the ``json`` module.
+    """
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('The orjson encoder requires the orjson package')
+        super().__init__()
+        # Datetimes and dates go through default to keep the Extended JSON output
+        self._option = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj: t.Any) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: t.Any) -> bytes:
+        try:
+            encoded = orjson.dumps(obj, default=default, option=self._option)
+        except orjson.JSONEncodeError:
+            return super().dumps(obj).encode()
+        # orjson encodes NaN and infinite floats as null, documents without null do not have them
+        if b'null' in encoded:
+            replaced = replace_non_finite(obj)
+            if replaced != obj:
+                encoded = orjson.dumps(replaced, default=default, option=self._option)
+        return encoded
+
+
+_json_encoder: JSONEncoder = OrjsonEncoder() if orjson is not None else JSONEncoder()
+_APP_JSON_ENCODER = 'flask_mongodb.json_encoder'
+_app_json_encoder_set = False
+
+
+def _check_json_encoder(encoder: JSONEncoder):
+    if not callable(getattr(encoder, 'dumps', None)) or not callable(getattr(encoder, 'dumps_bytes', None)):
+        raise TypeError('JSON encoders must have the dumps and dumps_bytes methods')
+
+
+def get_json_encoder() -> JSONEncoder:
+    """
+    Get the encoder of ``to_document(json_parsed=True)`` and ``stream_documents``, the one of the
+    current app or else the one of the process
+    """
+    if not _app_json_encoder_set or not has_app_context():
+        return _json_encoder
+    return current_app.extensions.get(_APP_JSON_ENCODER, _json_encoder)
+
+
+def set_json_encoder(encoder: JSONEncoder):
+    """Replace the encoder of ``to_document(json_parsed=True)`` and ``stream_documents`` of the process"""
+    global _json_encoder
+    _check_json_encoder(encoder)
+    _json_encoder = encoder
+
+
+def set_app_json_encoder(app: Flask, encoder: t.Optional[JSONEncoder]):
+    """
+    Set the encoder of ``to_document(json_parsed=True)`` and ``stream_documents`` in the context of an
+    app, replacing the one it had. With None the app uses the encoder of the process.
+    """
+    global _app_json_encoder_set
+    if encoder is None:
+        app.extensions.pop(_APP_JSON_ENCODER, None)
+        return
+    _check_json_encoder(encoder)
+    app.extensions[_APP_JSON_ENCODER] = encoder
+    _app_json_encoder_set = True
+
+
+def dumps_bytes(document: t.Any) -> bytes:
+    """Encode a document to compact UTF-8 JSON with the encoder of the current app"""
+    return get_json_encoder().dumps_bytes(document)
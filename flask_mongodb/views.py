@@ -1,9 +1,17 @@
 import typing as t
 
+from flask import Blueprint, Response, abort, has_request_context, stream_with_context
 from flask.views import MethodView
 
 from flask_mongodb.core.exceptions import MissingViewModelException
 from flask_mongodb.core.mongo import CollectionModel
+from flask_mongodb.models.document_set import DocumentSet
+from flask_mongodb.utils.encoding import get_json_encoder
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json-array': 'application/json',
+}
 
 
 class ModelView(MethodView):
@@ -20,3 +28,61 @@ class ModelView(MethodView):
     @property
     def model(self):
         return self._model
+
+
+def stream_documents(docuset: DocumentSet, format: str = 'ndjson', batch_size: int = 100) -> Response:
+    """
+    Stream the documents of a DocumentSet as the response of a view. The documents are fetched in
+    batches and encoded as they come from the database, without building models, so the memory used
+    does not grow with the number of documents and the first ones are sent before the query ends.
+
+    :param docuset: DocumentSet with the query
+    :param format: ``ndjson`` for a document per line or ``json-array`` for a JSON array
+    :param batch_size: Number of documents fetched and sent at a time
+    :return: Streaming response
+    """
+    if format not in STREAM_FORMATS:
+        raise ValueError(f'Unknown format {format}, valid formats are {", ".join(STREAM_FORMATS)}')
+
+    # The encoder of the app, the documents may be encoded after its context is gone
+    dumps_bytes = get_json_encoder().dumps_bytes
+
+    def generate():
+        if format == 'ndjson':
+            for batch in docuset.raw_batches(batch_size):
+                yield b''.join([dumps_bytes(doc) + b'\n' for doc in batch])
+            return
+
+        separator = b'['
+        for batch in docuset.raw_batches(batch_size):
+            yield separator + b','.join([dumps_bytes(doc) for doc in batch])
+            separator = b','
+        yield b']' if separator == b',' else b'[]'
+
+    body = generate()
+    if has_request_context():
+        body = stream_with_context(body)
+    return Response(body, mimetype=STREAM_FORMATS[format])
+
+
+def create_metrics_blueprint(url: str = '/metrics', name: str = 'mongodb_metrics') -> Blueprint:
+    """
+    Blueprint with an endpoint that exposes the driver metrics of the MongoDB instance of the app in the
+    Prometheus text format. The endpoint responds 404 when ``MONGODB_DRIVER_METRICS`` is not enabled.
+
+    :param url: URL of the endpoint
+    :param name: Name of the blueprint
+    :return: Blueprint to register in the app
+    """
+    blueprint = Blueprint(name, __name__)
+
+    @blueprint.route(url)
+    def metrics():
+        from flask_mongodb.globals import current_mongo
+
+        driver_metrics = current_mongo.driver_metrics if current_mongo else None
+        if driver_metrics is None:
+            abort(404)
+        return Response(driver_metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    return blueprint
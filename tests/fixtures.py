@@ -1,5 +1,8 @@
+import typing as t
+
 import pytest
 from flask import Flask
+from pymongo.errors import BulkWriteError
 
 from flask_mongodb import MongoDB
 from flask_mongodb.cli.utils import start_database
@@ -50,3 +53,51 @@ class BaseAppSetup:
     @pytest.fixture(scope='class')
     def mongo(self, application: Flask):
         return application.mongo
+
+
+def lazy_database(name: str = DB_NAME) -> t.Dict[str, t.Any]:
+    """Settings of a database whose client does not connect until a command runs"""
+    return {'HOST': 'localhost', 'PORT': 27017, 'NAME': name, 'LAZY': True}
+
+
+def create_lazy_app(**config) -> Flask:
+    """Application for the tests that run no query, no command reaches the server"""
+    _app = Flask(__name__)
+    _app.config.update({
+        'TESTING': True,
+        'DATABASE': {MAIN: lazy_database()},
+        'MODELS': ['tests.model_for_tests.core'],
+        **config
+    })
+    MongoDB(_app)
+    return _app
+
+
+@pytest.fixture(scope='function')
+def lazy_app(request):
+    """Application of create_lazy_app in an app context, updated with the LAZY_APP_CONFIG of the test module"""
+    _app = create_lazy_app(**getattr(request.module, 'LAZY_APP_CONFIG', {}))
+    with _app.app_context():
+        yield _app
+    _app.mongo.disconnect()
+
+
+class RecordingCollection:
+    """Collection stand-in that records the batches of documents and the bulk writes it receives"""
+    name = 'recording'
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.requests = []
+        self.fail = fail
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        if self.fail:
+            # The first document is inserted, the rest are duplicates
+            raise BulkWriteError({'nInserted': 1, 'writeErrors': [{'code': 11000}] * (len(documents) - 1)})
+        self.batches.append(list(documents))
+
+    def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        self.requests.extend(requests)
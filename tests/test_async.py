@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from flask_mongodb import MongoDB, current_mongo
+from flask_mongodb.core.exceptions import OperationNotAllowed
+from flask_mongodb.models.document_set import AsyncDocumentSet
+from tests.fixtures import BaseAppSetup, lazy_app  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest, ModelForTest2
+
+
+class TestAsyncManager(BaseAppSetup):
+    MODELS = ['tests.model_for_tests.core']
+
+    def test_asave_and_afind_one(self, mongo: MongoDB):
+        async def save_and_find():
+            model = ModelForTest2(title='Async title', body='Async body')
+            await model.asave()
+            found = await ModelForTest2().manager.afind_one(_id=model.pk)
+            await mongo.aclose()
+            return model, found
+
+        model, found = asyncio.run(save_and_find())
+        assert found['title'] == 'Async title' and found.pk == model.pk
+
+    def test_afind_iterates_models(self, mongo: MongoDB):
+        async def find_all():
+            await ModelForTest(sample_text='Async text').asave()
+            docuset = ModelForTest().manager.afind(sample_text='Async text')
+            models = [model async for model in docuset]
+            await mongo.aclose()
+            return docuset, models
+
+        docuset, models = asyncio.run(find_all())
+        assert isinstance(docuset, AsyncDocumentSet)
+        assert models and all([isinstance(model, ModelForTest) for model in models])
+
+    def test_adelete(self, mongo: MongoDB):
+        async def save_and_delete():
+            model = ModelForTest(sample_text='Async delete')
+            await model.asave()
+            ack = await model.adelete()
+            await mongo.aclose()
+            return ack
+
+        assert asyncio.run(save_and_delete()).deleted_count == 1
+
+
+def test_async_handles_per_event_loop(lazy_app):
+    mongo = lazy_app.mongo
+
+    async def get_handles():
+        handles = ModelForTest().async_collection, ModelForTest().async_collection
+        await mongo.aclose()
+        return handles
+
+    first_loop = asyncio.run(get_handles())
+    second_loop = asyncio.run(get_handles())
+
+    assert first_loop[0] is first_loop[1]
+    assert first_loop[0] is not second_loop[0]
+
+
+def test_async_manager_options_and_sessions(lazy_app):
+    manager = ModelForTest().manager.with_options(write_concern=0, read_preference='secondaryPreferred')
+
+    async def get_collection():
+        collection = manager.async_collection
+        await lazy_app.mongo.aclose()
+        return collection
+
+    collection = asyncio.run(get_collection())
+    assert not collection.write_concern.acknowledged
+    assert collection.read_preference.mongos_mode == 'secondaryPreferred'
+
+    with current_mongo.transaction():
+        with pytest.raises(OperationNotAllowed):
+            asyncio.run(ModelForTest().manager.afind_one(sample_text='In transaction'))
+
@@ -0,0 +1,81 @@
+import pytest
+
+from flask_mongodb.core.buffer import WriteBuffer, get_write_buffer_options
+from flask_mongodb.core.exceptions import ImproperConfiguration, WriteBufferFull
+from tests.fixtures import RecordingCollection, lazy_app  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest
+
+
+def test_write_buffer_options():
+    options = get_write_buffer_options({'BATCH_SIZE': 10, 'POLICY': 'drop_oldest'})
+    assert options['batch_size'] == 10
+    assert options['policy'] == 'drop_oldest'
+    assert options['max_size'] == 10000
+
+    for config in ({'POLICY': 'ignore'}, {'BATCH_SIZE': 0}, {'FLUSH_INTERVAL': 0}, {'SIZE': 1}):
+        with pytest.raises(ImproperConfiguration):
+            get_write_buffer_options(config)
+
+
+def test_flush_writes_batches_per_collection():
+    buffer = WriteBuffer(batch_size=2, flush_interval=60)
+    events, metrics = RecordingCollection(), RecordingCollection()
+    for i in range(3):
+        buffer.put(events, {'_id': i})
+    buffer.put(metrics, {'_id': 'm'})
+    buffer.close()
+
+    assert sorted(doc['_id'] for batch in events.batches for doc in batch) == [0, 1, 2]
+    assert metrics.batches == [[{'_id': 'm'}]]
+    assert buffer.stats['inserted'] == 4
+    assert buffer.stats['pending'] == 0
+
+
+def test_full_buffer_policies():
+    collection = RecordingCollection()
+    # Batches of 10 and a long interval, nothing is written until the buffer is closed
+    buffer = WriteBuffer(max_size=1, batch_size=10, flush_interval=60, policy='drop_oldest')
+    buffer.put(collection, {'_id': 1})
+    buffer.put(collection, {'_id': 2})
+    assert buffer.stats['dropped'] == 1
+
+    buffer.policy = 'drop_newest'
+    assert buffer.put(collection, {'_id': 3}) is False
+
+    buffer.policy = 'raise'
+    with pytest.raises(WriteBufferFull):
+        buffer.put(collection, {'_id': 4})
+
+    buffer.policy = 'block'
+    buffer.block_timeout = 0.01
+    with pytest.raises(WriteBufferFull):
+        buffer.put(collection, {'_id': 5})
+
+    buffer.close()
+    assert collection.batches == [[{'_id': 2}]]
+    assert buffer.stats['dropped'] == 2
+
+
+def test_failed_writes_are_counted():
+    buffer = WriteBuffer(flush_interval=60)
+    collection = RecordingCollection(fail=True)
+    for i in range(3):
+        buffer.put(collection, {'_id': i})
+    buffer.flush()
+
+    stats = buffer.stats
+    assert stats['batches'] == 1
+    assert stats['inserted'] == 1
+    assert stats['failed'] == 2
+    assert stats['last_error']
+    buffer.close()
+
+
+def test_dropped_deferred_save(lazy_app, monkeypatch):
+    # The drop_newest policy of a full buffer
+    monkeypatch.setattr(WriteBuffer, 'put', lambda buffer, collection, document: False)
+    model = ModelForTest(sample_text='Dropped')
+
+    assert model.save(deferred=True) is False
+    assert model.pk is None
+
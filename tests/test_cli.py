@@ -1,3 +1,4 @@
+import json
 import os.path
 
 import pytest
@@ -5,11 +6,13 @@ from click.testing import CliRunner
 from flask import Flask
 
 from flask_mongodb import MongoDB, current_mongo
-from flask_mongodb.cli.cli import create_model
+from flask_mongodb.cli.cli import create_model, stats
 from flask_mongodb.cli.db_shifts import db_shift
 from flask_mongodb.core.exceptions import NoDatabaseShiftingRequired
 from flask_mongodb.core.wrappers import MongoConnect
+from flask_mongodb.models.fields import StringField
 from flask_mongodb.models.shitfs.shift import Shift
+from tests.fixtures import lazy_app  # noqa: F401
 from tests.model_for_tests.cli.shift.models import ModelForTest
 from tests.model_for_tests.cli.shift.shift import ModelForTest as ShiftModel_T
 from tests.utils import DB_NAME, MAIN
@@ -64,6 +67,15 @@ def test_db_creation(app):
     assert res
 
 
+def test_db_creation_with_jobs(app):
+    runner = CliRunner()
+    with app.app_context():
+        result = runner.invoke(db_shift, ['start-db', '--jobs', '4'])
+        created = set(current_mongo.connections[MAIN].list_collection_names())
+    assert result.output.replace('\n', '') == 'Database creation complete'
+    assert {'testing1', 'testing2', 'shift_history'}.issubset(created)
+
+
 def test_shifting(app_for_shift):
     """
     This function will test the shifting process and examine at the same time since it is required to make a shift.
@@ -101,6 +113,68 @@ def test_shifting(app_for_shift):
     assert history['db_collection'] == ShiftModel_T.collection_name, 'Shift was not achieved'
 
 
+def test_shift_estimate(app_for_shift):
+    runner = CliRunner()
+    with app_for_shift.app_context():
+        runner.invoke(db_shift, ['start-db'])
+        for n in range(3):
+            ModelForTest(sample_text=f'Sample text {n}').save()
+
+        estimation = Shift(ShiftModel_T).estimate(throttle=1)
+        result = runner.invoke(db_shift, ['examine', '--estimate'])
+
+    changes = {change['field']: change for change in estimation['changes']}
+    assert estimation['count'] == 3
+    assert changes['sample_extra']['change'] == 'new' and changes['sample_extra']['documents'] == 3
+    assert changes['field_to_remove']['change'] == 'removed' and changes['field_to_remove']['documents'] == 3
+    assert estimation['runtime'] == estimation['documents']
+    assert result.exit_code == 0
+
+
+class ShiftedCollection:
+    """Collection stand-in with the ids of its documents, that records the updates"""
+    def __init__(self, count):
+        self.ids = list(range(count))
+        self.updates = []
+
+    def find(self, filter, projection):
+        return self
+
+    def sort(self, key, direction):
+        return self
+
+    def batch_size(self, size):
+        return iter([{'_id': _id} for _id in self.ids])
+
+    def update_many(self, filter, update):
+        self.updates.append((filter, update))
+
+
+def test_shift_updates_are_throttled(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('flask_mongodb.models.shitfs.shift.time.sleep', sleeps.append)
+    collection = ShiftedCollection(5)
+
+    Shift._update_documents(collection, {'$unset': {'field': 1}}, throttle=2)
+    assert [update_filter['_id']['$in'] for update_filter, _ in collection.updates] == [[0, 1], [2, 3], [4]]
+    assert len(sleeps) == 2 and 0 < sleeps[-1] <= 2
+
+    collection.updates.clear()
+    Shift._update_documents(collection, {'$unset': {'field': 1}}, throttle=None)
+    assert collection.updates == [({}, {'$unset': {'field': 1}})]
+
+
+def test_enum_field_removal_is_a_replacement(lazy_app):
+    shift = Shift(ShiftModel_T)
+    # The collection schema has an enum, the model a StringField
+    shift._compare_model_to_collection({'properties': {'sample_text': {'enum': ['a', 'b']}}, 'required': []},
+                                       {'sample_text': StringField(required=True)})
+
+    assert shift.altered_fields['sample_text']['new'] is StringField
+    [change] = shift._get_pending_changes()
+    assert change == {'change': 'altered', 'field': 'sample_text', 'filter': {}}
+
+
 def test_no_shift_necessary(app_for_shift):
     runner = CliRunner()
     with app_for_shift.app_context():
@@ -126,6 +200,34 @@ def test_add_collection(app: Flask):
     assert res, "Failed to create collection"
 
 
+def test_advise_indexes(app: Flask):
+    runner = CliRunner()
+    with app.app_context():
+        runner.invoke(db_shift, ['start-db'])
+        current_mongo.connections[MAIN]['query_shapes'].insert_one({
+            '_id': 'shape', 'database': NAME, 'collection': 'testing1', 'filter': '{"sample_text": "?"}',
+            'sort': '{}', 'projection': '[]', 'count': 3, 'total_ms': 12.0, 'max_ms': 5.0
+        })
+        result = runner.invoke(db_shift, ['advise-indexes', '--collection', 'testing1'])
+    assert result.exit_code == 0
+    assert 'create {sample_text: 1}: 3 queries' in result.output
+
+
+def test_stats(app: Flask):
+    runner = CliRunner()
+    with app.app_context():
+        runner.invoke(db_shift, ['start-db'])
+        current_mongo.connections[MAIN]['testing1'].insert_many([{'sample_text': 'Stats'}] * 3)
+        result = runner.invoke(stats, ['--json', '--sort', 'count', '--reverse'])
+        text_result = runner.invoke(stats)
+    collections = json.loads(result.output)
+    assert collections[0]['collection'] == 'testing1'
+    assert collections[0]['count'] == 3
+    assert collections[0]['indexes'][0]['name'] == '_id_'
+    assert collections[0]['validator_size'] > 0
+    assert 'main.testing1: 3 documents' in text_result.output
+
+
 def test_create_model():
     runner = CliRunner()
     runner.invoke(create_model)
@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, current_app
+
+from flask_mongodb.utils.concurrency import map_concurrently
+
+
+def test_results_keep_item_order():
+    def slow_square(number):
+        # The first items finish last
+        time.sleep((10 - number) / 1000)
+        return number * number
+
+    assert map_concurrently(slow_square, range(10), jobs=4) == [n * n for n in range(10)]
+
+
+def test_runs_in_worker_threads_with_app_context():
+    app = Flask(__name__)
+    with app.app_context():
+        names = map_concurrently(lambda _: (current_app.name, threading.current_thread().name), range(4), jobs=4)
+    assert all(name == app.name for name, _ in names)
+    assert all(thread != threading.main_thread().name for _, thread in names)
+
+
+def test_exception_is_propagated():
+    def fail_on_three(number):
+        if number == 3:
+            raise ValueError('three')
+        return number
+
+    with pytest.raises(ValueError):
+        map_concurrently(fail_on_three, range(6), jobs=3)
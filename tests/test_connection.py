@@ -0,0 +1,79 @@
+import pytest
+from pymongo import MongoClient
+
+from flask_mongodb.core.connection import get_client_key, get_client_options, get_connection_uri
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from tests.utils import MAIN
+
+
+def test_uri_from_host_and_port():
+    assert get_connection_uri({'HOST': 'localhost', 'PORT': 27017}) == 'mongodb://localhost:27017'
+
+
+def test_full_uri_with_multiple_hosts():
+    uri = 'mongodb://db1:27017,db2:27017/?replicaSet=rs0'
+    assert get_connection_uri({'URI': uri, 'HOST': 'ignored', 'PORT': 1}) == uri
+
+
+def test_missing_host():
+    with pytest.raises(ImproperConfiguration):
+        get_connection_uri({'PORT': 27017})
+
+
+def test_default_client_options():
+    options = get_client_options(MAIN, {})
+    assert options['maxPoolSize'] == 25
+    assert options['serverSelectionTimeoutMS'] == 10000
+    assert 'compressors' not in options
+
+
+def test_client_options_mapping():
+    options = get_client_options(MAIN, {
+        'MAX_POOL_SIZE': 10,
+        'MIN_POOL_SIZE': 2,
+        'COMPRESSORS': ['zlib'],
+        'APPNAME': 'api',
+        'USERNAME': 'user',
+        'PASSWORD': 'p@ss'
+    })
+    assert options['maxPoolSize'] == 10
+    assert options['minPoolSize'] == 2
+    assert options['compressors'] == 'zlib'
+    assert options['appname'] == 'api'
+    assert options['password'] == 'p@ss'
+
+
+def test_uri_options_override_defaults():
+    uri = 'mongodb://localhost:27017/?maxPoolSize=100&serverSelectionTimeoutMS=30000'
+    options = get_client_options(MAIN, {'URI': uri})
+    assert 'maxPoolSize' not in options and 'serverSelectionTimeoutMS' not in options
+    assert options['maxIdleTimeMS'] == 60000
+
+    client = MongoClient(uri, connect=False, **options)
+    assert client.options.pool_options.max_pool_size == 100
+    assert client.options.server_selection_timeout == 30
+    client.close()
+
+    # The DATABASE entry still overrides the URI
+    assert get_client_options(MAIN, {'URI': uri, 'MAX_POOL_SIZE': 10})['maxPoolSize'] == 10
+
+
+@pytest.mark.parametrize('details', [
+    {'MAX_POOL_SIZE': -1},
+    {'MAX_POOL_SIZE': '10'},
+    {'MAX_POOL_SIZE': 5, 'MIN_POOL_SIZE': 10},
+    {'SOCKET_TIMEOUT_MS': 0},
+    {'COMPRESSORS': ['gzip']},
+    {'ZLIB_COMPRESSION_LEVEL': 10},
+    {'APPNAME': 1},
+    {'URI': 'mongodb://localhost:27017/?maxPoolSize=many'},
+])
+def test_invalid_client_options(details):
+    with pytest.raises(ImproperConfiguration):
+        get_client_options(MAIN, details)
+
+
+def test_client_key_ignores_option_order():
+    uri = 'mongodb://localhost:27017'
+    assert get_client_key(uri, {'maxPoolSize': 5, 'appname': 'api'}) == \
+        get_client_key(uri, {'appname': 'api', 'maxPoolSize': 5})
@@ -0,0 +1,104 @@
+import datetime
+import json
+
+import pytest
+from bson import Decimal128, ObjectId, json_util
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.utils import encoding
+from flask_mongodb.utils.encoding import JSONEncoder, OrjsonEncoder, dumps_bytes, get_json_encoder, set_json_encoder
+from tests.fixtures import create_lazy_app
+from tests.model_for_tests.core.models import ModelForTest
+
+TZ = datetime.timezone(datetime.timedelta(hours=-4))
+DOCUMENT = {
+    '_id': ObjectId(),
+    'text': 'Ünïcode',
+    'created': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+    'midnight': datetime.datetime(2024, 1, 2),
+    'aware': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+    'offset': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=TZ),
+    'old': datetime.datetime(1960, 1, 1),
+    'price': Decimal128('9.99'),
+    'nested': {'ids': [ObjectId(), ObjectId()], 'count': 3, 'ratio': 0.5, 'flag': True, 'none': None},
+}
+
+ENCODERS = [JSONEncoder]
+if encoding.orjson is not None:
+    ENCODERS.append(OrjsonEncoder)
+
+
+@pytest.mark.parametrize('encoder_class', ENCODERS)
+def test_output_matches_json_util(encoder_class):
+    encoder = encoder_class()
+    assert json.loads(encoder.dumps(DOCUMENT)) == json.loads(json_util.dumps(DOCUMENT))
+    assert json.loads(encoder.dumps_bytes(DOCUMENT)) == json.loads(json_util.dumps(DOCUMENT))
+
+
+@pytest.mark.parametrize('encoder_class', ENCODERS)
+def test_non_finite_floats_match_json_util(encoder_class):
+    encoder = encoder_class()
+    document = {'nan': float('nan'), 'inf': float('inf'), 'ninf': float('-inf'), 'none': None,
+                'nested': {'values': [1.5, float('nan')], 'id': DOCUMENT['_id']}}
+    expected = json.loads(json_util.dumps(document))
+
+    assert expected['nan'] == {'$numberDouble': 'NaN'}
+    assert json.loads(encoder.dumps(document)) == expected
+    assert json.loads(encoder.dumps_bytes(document)) == expected
+    # Documents with null and without non-finite floats are unchanged
+    assert json.loads(encoder.dumps({'none': None, 'ratio': 0.5})) == {'none': None, 'ratio': 0.5}
+
+
+@pytest.mark.parametrize('encoder_class', ENCODERS)
+def test_dates_encoded_as_stored(encoder_class):
+    stored = json_util.dumps({'day': datetime.datetime(2024, 1, 2)})
+    assert json.loads(encoder_class().dumps({'day': datetime.date(2024, 1, 2)})) == json.loads(stored)
+
+
+@pytest.mark.parametrize('encoder_class', ENCODERS)
+def test_documents_orjson_cannot_encode(encoder_class):
+    document = {'_id': DOCUMENT['_id'], 'counts': {1: 'one', 2: 'two'}, 'big': 2 ** 70, 'nan': float('nan')}
+    expected = json.loads(json_util.dumps(document))
+
+    assert json.loads(encoder_class().dumps(document)) == expected
+    assert json.loads(encoder_class().dumps_bytes(document)) == expected
+
+
+def test_output_is_compact_utf8():
+    encoded = dumps_bytes({'_id': DOCUMENT['_id'], 'a': [1, 2]})
+    assert encoded == ('{"_id":{"$oid":"%s"},"a":[1,2]}' % DOCUMENT['_id']).encode()
+
+
+def test_set_json_encoder():
+    previous = get_json_encoder()
+    with pytest.raises(TypeError):
+        set_json_encoder(object())
+
+    set_json_encoder(JSONEncoder())
+    try:
+        document = ModelForTest(sample_text='Encoded').to_document(json_parsed=True)
+        assert json.loads(document)['sample_text'] == 'Encoded'
+    finally:
+        set_json_encoder(previous)
+
+
+def test_json_encoder_of_each_app():
+    app_encoder = JSONEncoder()
+    configured = create_lazy_app(MONGODB_JSON_ENCODER=app_encoder)
+    default = create_lazy_app()
+    with configured.app_context():
+        assert get_json_encoder() is app_encoder
+    with default.app_context():
+        assert get_json_encoder() is not app_encoder
+        assert get_json_encoder() is encoding._json_encoder
+    assert get_json_encoder() is encoding._json_encoder
+
+    configured.config['MONGODB_JSON_ENCODER'] = 'flask_mongodb.utils.encoding.JSONEncoder'
+    configured.mongo.init_app(configured)
+    with configured.app_context():
+        assert type(get_json_encoder()) is JSONEncoder and get_json_encoder() is not app_encoder
+    configured.config['MONGODB_JSON_ENCODER'] = object()
+    with pytest.raises(ImproperConfiguration):
+        configured.mongo.init_app(configured)
+    for _app in (configured, default):
+        _app.mongo.disconnect()
@@ -0,0 +1,146 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.core.explain import explain_command, explain_cursor, find_command, summarize_explain
+from flask_mongodb.core.monitoring import SlowQueryListener
+from flask_mongodb.testing import assert_no_collscan, assert_uses_index
+from tests.fixtures import create_lazy_app, lazy_app, lazy_database  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest
+from tests.utils import DB_NAME, MAIN
+
+LAZY_APP_CONFIG = {'DATABASE': {MAIN: lazy_database(DB_NAME + '_explain')}, 'MONGODB_SLOW_QUERY_MS': 0}
+EXPLAIN_IXSCAN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'FETCH',
+            'inputStage': {'stage': 'IXSCAN', 'indexName': 'sample_text_1', 'keyPattern': {'sample_text': 1}},
+        },
+    },
+    'executionStats': {'nReturned': 2, 'executionTimeMillis': 1, 'totalKeysExamined': 2, 'totalDocsExamined': 2},
+}
+EXPLAIN_COLLSCAN = {
+    'queryPlanner': {
+        'winningPlan': {'queryPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}},
+    },
+    'executionStats': {'nReturned': 1, 'executionTimeMillis': 30, 'totalKeysExamined': 0,
+                       'totalDocsExamined': 5000},
+}
+
+
+def test_summarize_explain():
+    summary = summarize_explain(EXPLAIN_IXSCAN)
+    assert summary['stages'] == ['FETCH', 'IXSCAN']
+    assert summary['index'] == 'sample_text_1'
+    assert not summary['collscan'] and not summary['in_memory_sort']
+    assert (summary['keys_examined'], summary['docs_examined'], summary['returned']) == (2, 2, 2)
+
+    summary = summarize_explain(EXPLAIN_COLLSCAN)
+    assert summary['stage'] == 'SORT'
+    assert summary['index'] is None
+    assert summary['collscan'] and summary['in_memory_sort']
+
+
+def test_find_command(lazy_app: Flask):
+    docuset = ModelForTest().manager.find(sample_text='Explained').sort((('sample_text', -1),)).limit(5)
+    cursor = docuset._DocumentSet__cursor
+
+    assert find_command(cursor) == {'find': 'testing1', 'filter': {'sample_text': 'Explained'},
+                                    'sort': {'sample_text': -1}, 'limit': 5}
+    with pytest.raises(ValueError):
+        explain_cursor(cursor, 'everything')
+
+
+def test_find_command_with_hint_and_collation(lazy_app: Flask):
+    docuset = ModelForTest().manager.find(sample_text='Explained')
+    docuset.run_cursor_method('hint', [('sample_text', 1)])
+    docuset.run_cursor_method('collation', {'locale': 'en', 'strength': 2})
+    docuset.run_cursor_method('max_time_ms', 500)
+    docuset.run_cursor_method('comment', 'explained')
+
+    command = find_command(docuset._DocumentSet__cursor)
+    assert dict(command['hint']) == {'sample_text': 1}
+    assert command['collation'] == {'locale': 'en', 'strength': 2}
+    assert (command['maxTimeMS'], command['comment']) == (500, 'explained')
+    assert 'min' not in command and 'returnKey' not in command
+
+
+def _run_query(listener: SlowQueryListener, command_name: str, command: dict, request_id: int, duration_ms: float,
+               cursor_id: int = 0):
+    address = ('localhost', 27017)
+    listener.started(SimpleNamespace(command_name=command_name, command=command, database_name='shop',
+                                     connection_id=address, request_id=request_id))
+    listener.succeeded(SimpleNamespace(connection_id=address, request_id=request_id, duration_micros=duration_ms * 1000,
+                                       reply={'ok': 1, 'cursor': {'id': cursor_id}}))
+
+
+def test_slow_query_log(caplog):
+    listener = SlowQueryListener(100)
+    find = {'find': 'orders', 'filter': {'status': 'Slow'}, 'sort': {'created': -1}, 'lsid': {'id': 1}}
+
+    with caplog.at_level(logging.WARNING, logger='flask_mongodb.slow_queries'):
+        _run_query(listener, 'find', find, 1, 50, cursor_id=7)
+        _run_query(listener, 'getMore', {'getMore': 7, 'collection': 'orders'}, 2, 150)
+        # The cursor is exhausted, its getMore commands are not timed anymore
+        _run_query(listener, 'getMore', {'getMore': 7, 'collection': 'orders'}, 3, 150)
+        _run_query(listener, 'insert', {'insert': 'orders', 'documents': []}, 4, 150)
+
+    [record] = caplog.records
+    assert record.getMessage().startswith('Slow query on shop.orders: 150.0 ms, filter {"status": "?"}, '
+                                          'sort {"created": -1}, projection null')
+    assert 'Slow' not in record.getMessage().split(':', 1)[1]
+    assert __file__ in record.getMessage()
+    assert not listener._started and not listener._cursors
+
+
+def test_explain_command():
+    calls = []
+    database = SimpleNamespace(command=lambda *args, **kwargs: calls.append((args, kwargs)) or EXPLAIN_IXSCAN)
+    command = {'find': 'orders', 'filter': {'status': 'paid'}, 'lsid': {'id': 1}, '$db': 'shop',
+               '$clusterTime': {}, 'readConcern': {'level': 'local'}}
+
+    assert explain_command(database, command) == EXPLAIN_IXSCAN
+    assert calls == [(('explain', {'find': 'orders', 'filter': {'status': 'paid'}}), {'verbosity': 'executionStats'})]
+    with pytest.raises(ValueError):
+        explain_command(database, command, 'full')
+
+
+def test_slow_query_threshold_of_document_sets(lazy_app: Flask, caplog):
+    listener = SlowQueryListener(60000)
+    docuset = ModelForTest().manager.find(sample_text='Slow')
+    cursor = docuset._DocumentSet__cursor
+
+    def fetch(c):
+        _run_query(listener, 'find', {'find': 'testing1', 'filter': {'sample_text': 'Slow'}}, 1, 5)
+        return []
+
+    with caplog.at_level(logging.WARNING, logger='flask_mongodb.slow_queries'):
+        assert docuset._fetch(cursor, fetch) == []
+        assert docuset.log_slow_queries(1)._fetch(cursor, fetch) == []
+
+    [record] = caplog.records
+    assert record.getMessage().startswith('Slow query on shop.testing1: 5.0 ms')
+    assert lazy_app.mongo.slow_query_log
+
+    _app = create_lazy_app()
+    with _app.app_context():
+        with pytest.raises(ImproperConfiguration, match='MONGODB_SLOW_QUERY_MS'):
+            ModelForTest().manager.find().log_slow_queries(100)
+    _app.mongo.disconnect()
+
+
+def test_index_assertions(lazy_app: Flask, monkeypatch):
+    docuset = ModelForTest().manager.find(sample_text='Indexed')
+
+    monkeypatch.setattr(docuset, 'explain', lambda verbosity: summarize_explain(EXPLAIN_IXSCAN))
+    assert_uses_index(docuset, 'sample_text_1')
+    assert_no_collscan(docuset)
+    with pytest.raises(AssertionError, match='does not use index _id_'):
+        assert_uses_index(docuset, '_id_')
+
+    monkeypatch.setattr(docuset, 'explain', lambda verbosity: summarize_explain(EXPLAIN_COLLSCAN))
+    with pytest.raises(AssertionError, match='SORT <- COLLSCAN'):
+        assert_no_collscan(docuset)
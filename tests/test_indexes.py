@@ -0,0 +1,118 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from pymongo import IndexModel
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.core.indexes import (advise_indexes, esr_fields, esr_index, get_index_models, index_supports,
+                                        redundant_indexes)
+from flask_mongodb.core.monitoring import QueryShapeRecorder
+from tests.fixtures import RecordingCollection, create_lazy_app
+
+
+def _shape(query, sort=None, count=1, total_ms=10.0):
+    return {'filter': json.dumps(query), 'sort': json.dumps(sort or {}), 'count': count, 'total_ms': total_ms}
+
+
+def test_get_index_models():
+    models = get_index_models(['email', [('status', 1), ('created', -1)], IndexModel([('sku', 1)], unique=True)])
+    assert [model.document['name'] for model in models] == ['email_1', 'status_1_created_-1', 'sku_1']
+
+    with pytest.raises(ImproperConfiguration):
+        get_index_models([[('status', 'sideways', 1)]])
+
+
+def test_esr_fields():
+    shape = {'status': '?', 'price': {'$gte': '?'}, 'tags': {'$in': '?'}, '$and': [{'owner': '?'}],
+             '$or': [{'a': '?'}, {'b': '?'}]}
+    equality, sort, ranges = esr_fields(shape, {'created': -1, 'status': 1})
+
+    assert equality == ['status', 'tags', 'owner']
+    assert sort == [('created', -1)]
+    assert ranges == ['price']
+    assert esr_index(equality, sort, ranges) == [('status', 1), ('tags', 1), ('owner', 1), ('created', -1),
+                                                 ('price', 1)]
+
+
+def test_index_supports():
+    fields = (['status', 'owner'], [('created', -1)], ['price'])
+    assert index_supports([('owner', 1), ('status', 1), ('created', -1), ('price', 1)], *fields)
+    assert index_supports([('owner', -1), ('status', 1), ('created', 1), ('price', -1)], *fields)
+    assert not index_supports([('status', 1), ('created', -1), ('owner', 1), ('price', 1)], *fields)
+    assert not index_supports([('owner', 1), ('status', 1), ('created', -1)], *fields)
+
+
+def test_advise_indexes():
+    shapes = [
+        _shape({'status': '?', 'created': {'$gt': '?'}}, {'price': -1}, count=10, total_ms=500.0),
+        _shape({'status': '?'}, count=5, total_ms=50.0),
+        _shape({'customer': '?'}),
+        _shape({'sku': '?'}),
+        _shape({'_id': '?'}),
+        _shape({}),
+    ]
+    indexes = {'_id_': {'key': [('_id', 1)]}, 'customer_1': {'key': [('customer', 1)]},
+               'customer_1_created_1': {'key': [('customer', 1), ('created', 1)]},
+               'email_1': {'key': [('email', 1)], 'unique': True}}
+    index_stats = [{'name': '_id_', 'accesses': {'ops': 0}}, {'name': 'customer_1', 'accesses': {'ops': 0}},
+                   {'name': 'email_1', 'accesses': {'ops': 12}}]
+
+    report = advise_indexes(shapes, indexes, get_index_models(['sku']), index_stats)
+
+    [suggestion] = report['suggested']
+    assert suggestion['keys'] == [('status', 1), ('price', -1), ('created', 1)]
+    assert (suggestion['count'], suggestion['total_ms']) == (15, 550.0)
+    assert len(suggestion['shapes']) == 2
+    assert report['missing'] == ['sku_1']
+    assert report['unused'] == ['customer_1']
+    assert report['redundant'] == [('customer_1', 'customer_1_created_1')]
+
+
+def test_redundant_indexes_keep_special_indexes():
+    indexes = {'a_1': {'key': [('a', 1)], 'unique': True}, 'a_1_b_1': {'key': [('a', 1), ('b', 1)]},
+               'b_1': {'key': [('b', 1)]}, 'b_-1_c_1': {'key': [('b', -1), ('c', 1)]}}
+    assert redundant_indexes(indexes) == []
+
+
+def test_query_shape_recorder():
+    recorder = QueryShapeRecorder(flush_interval=3600)
+    recorder.collection = RecordingCollection()
+
+    for request_id, _id in enumerate((1, 2)):
+        recorder.started(SimpleNamespace(command_name='find', database_name='shop', connection_id=1,
+                                         request_id=request_id,
+                                         command={'find': 'orders', 'filter': {'_id': _id}, 'sort': {'created': -1},
+                                                  'projection': {'total': 1}}))
+        recorder.succeeded(SimpleNamespace(connection_id=1, request_id=request_id, duration_micros=2000 * (_id + 1)))
+    # Its own writes are not recorded
+    recorder.started(SimpleNamespace(command_name='update', database_name='shop', connection_id=1, request_id=5,
+                                     command={'update': 'query_shapes', 'updates': [{'q': {'_id': 'x'}}]}))
+    recorder.succeeded(SimpleNamespace(connection_id=1, request_id=5, duration_micros=1000))
+    recorder.flush()
+
+    [update] = recorder.collection.requests
+    document = update._doc
+    assert update._filter == {'_id': 'shop orders {"_id": "?"} {"created": -1} ["total"]'}
+    assert document['$inc'] == {'count': 2, 'total_ms': 10.0}
+    assert document['$max'] == {'max_ms': 6.0}
+    assert document['$setOnInsert']['sort'] == '{"created": -1}'
+
+
+def test_query_shape_recorder_reset_after_fork():
+    recorder = QueryShapeRecorder(flush_interval=3600)
+    recorder.collection = RecordingCollection()
+    recorder.started(SimpleNamespace(command_name='find', database_name='shop', connection_id=1, request_id=1,
+                                     command={'find': 'orders', 'filter': {}}))
+    recorder.succeeded(SimpleNamespace(connection_id=1, request_id=1, duration_micros=1000))
+
+    # The counters of the parent process are not written again by the child
+    recorder.reset()
+    recorder.flush()
+    assert recorder.collection.requests == []
+
+
+def test_query_shapes_database_must_be_an_alias():
+    with pytest.raises(ImproperConfiguration, match='MONGODB_QUERY_SHAPES_DATABASE'):
+        create_lazy_app(MONGODB_QUERY_SHAPES=True, MONGODB_QUERY_SHAPES_DATABASE='analytics')
+
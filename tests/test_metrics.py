@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from flask_mongodb.core.metrics import DriverMetrics
+from flask_mongodb.views import create_metrics_blueprint
+from tests.fixtures import create_lazy_app, lazy_app, lazy_database  # noqa: F401
+from tests.utils import DB_NAME, MAIN
+
+ADDRESS = ('localhost', 27017)
+
+
+LAZY_APP_CONFIG = {
+    'DATABASE': {MAIN: lazy_database(), 'reports': lazy_database(DB_NAME + '_reports')},
+    'MONGODB_DRIVER_METRICS': True
+}
+
+
+def _check_out(listener, duration):
+    listener.connection_check_out_started(SimpleNamespace(address=ADDRESS))
+    listener.connection_checked_out(SimpleNamespace(address=ADDRESS, connection_id=1, duration=duration))
+
+
+def test_driver_metrics_listener():
+    metrics = DriverMetrics()
+    metrics.add_alias(('uri', ()), 'main')
+    listener = metrics.listener(('uri', ()))
+
+    listener.connection_created(SimpleNamespace(address=ADDRESS, connection_id=1))
+    listener.connection_created(SimpleNamespace(address=ADDRESS, connection_id=2))
+    _check_out(listener, 0.25)
+    _check_out(listener, 0.75)
+    listener.connection_checked_in(SimpleNamespace(address=ADDRESS, connection_id=1))
+    listener.connection_check_out_started(SimpleNamespace(address=ADDRESS))
+    listener.connection_check_out_failed(SimpleNamespace(address=ADDRESS, reason='timeout', duration=1.0))
+    listener.connection_closed(SimpleNamespace(address=ADDRESS, connection_id=2, reason='stale'))
+    listener.pool_cleared(SimpleNamespace(address=ADDRESS))
+    listener.succeeded(SimpleNamespace(connection_id=ADDRESS, duration=0.01, reply={}, awaited=False))
+    listener.failed(SimpleNamespace(connection_id=ADDRESS, duration=0.02, reply=None, awaited=False))
+
+    snapshot = metrics.snapshot()['main']
+    assert (snapshot['created'], snapshot['closed'], snapshot['open']) == (2, 1, 1)
+    assert (snapshot['checkouts'], snapshot['checked_out'], snapshot['checkout_failures']) == (2, 1, 1)
+    assert (snapshot['wait_time'], snapshot['max_wait_time']) == (1.0, 0.75)
+    assert snapshot['cleared'] == 1
+    assert (snapshot['heartbeats'], snapshot['heartbeat_failures']) == (2, 1)
+
+    text = metrics.to_prometheus()
+    assert '# TYPE flask_mongodb_pool_connections_checked_out gauge' in text
+    assert 'flask_mongodb_pool_connections_checked_out{alias="main"} 1' in text
+    assert 'flask_mongodb_pool_checkout_wait_seconds_sum{alias="main"} 1.0' in text
+    assert 'flask_mongodb_pool_checkout_wait_seconds_count{alias="main"} 2' in text
+    assert 'flask_mongodb_heartbeat_failures_total{alias="main"} 1' in text
+
+    metrics.reset()
+    assert metrics.snapshot()['main']['checkouts'] == 0
+
+
+def test_driver_metrics_of_shared_clients(lazy_app):
+    driver_metrics = lazy_app.mongo.driver_metrics
+    assert list(driver_metrics.snapshot()) == [f'{MAIN},reports']
+
+
+def test_metrics_blueprint(lazy_app):
+    lazy_app.register_blueprint(create_metrics_blueprint())
+    response = lazy_app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert f'flask_mongodb_pool_checkouts_total{{alias="{MAIN},reports"}} 0' in response.get_data(as_text=True)
+
+
+def test_metrics_blueprint_without_metrics():
+    _app = create_lazy_app()
+    _mongo = _app.mongo
+    _app.register_blueprint(create_metrics_blueprint())
+    assert _mongo.driver_metrics is None
+    assert _app.test_client().get('/metrics').status_code == 404
+    _mongo.disconnect()
@@ -1,7 +1,12 @@
+import json
+
 import pytest
 from pymongo.errors import WriteError
 
+from flask_mongodb import MongoDB
 from flask_mongodb.models.document_set import DocumentSet
+from flask_mongodb.testing import assert_no_collscan, assert_uses_index
+from flask_mongodb.views import stream_documents
 from tests.fixtures import BaseAppSetup
 from tests.model_for_tests.core.models import ModelForTest, ModelForTest2, ModelWithDefaultValues, \
     ModelWithEmbeddedDocument, ModelWithEnumField, VeryComplexModel
@@ -72,6 +77,95 @@ class TestModelOperations(BaseAppSetup):
         assert isinstance(ds, DocumentSet), \
             'find() should return a DocumentSet'
 
+    def test_instances_share_collection_handle(self):
+        ModelForTest(sample_text='Shared collection handle').save()
+        model = ModelForTest()
+
+        assert model.collection is ModelForTest().collection
+        assert all([item.collection is model.collection for item in model.manager.find()])
+
+    def test_gather_returns_results_in_order(self, mongo: MongoDB):
+        ModelForTest(sample_text='Gathered').save()
+        model = ModelForTest()
+
+        docs, count, found = mongo.gather(model.manager.find(sample_text='Gathered'),
+                                          model.manager.find(sample_text='Gathered').count,
+                                          lambda: model.manager.find_one(sample_text='Gathered'))
+
+        assert all([isinstance(item, ModelForTest) for item in docs])
+        assert count == len(docs)
+        assert found['sample_text'] == 'Gathered'
+
+    def test_causal_session_reads_own_writes(self, mongo: MongoDB):
+        with mongo.causal_session() as session:
+            model = ModelForTest(sample_text='Causal session')
+            model.save()
+            found = ModelForTest().manager.with_options(read_preference='secondaryPreferred') \
+                .find_one(sample_text='Causal session')
+
+        assert session.has_ended
+        assert found.pk == model.pk
+
+    def test_write_concern_override(self):
+        model = ModelForTest(sample_text='Write concern')
+        model.save()
+        majority = model.manager.with_options(write_concern='majority')
+        unacknowledged = model.manager.with_options(write_concern=0)
+
+        assert majority.update_one({'_id': model.pk}, {'sample_text': 'Majority'})['sample_text'] == 'Majority'
+        assert unacknowledged.update_one({'_id': model.pk}, {'sample_text': 'Unacknowledged'}) is None
+
+    def test_deferred_save(self, mongo: MongoDB):
+        model = ModelForTest(sample_text='Deferred')
+        assert model.save(deferred=True) is True
+        assert model.pk is not None
+
+        mongo.write_buffer.flush()
+        assert ModelForTest().manager.find_one(_id=model.pk)['sample_text'] == 'Deferred'
+        assert mongo.write_buffer.stats['inserted'] >= 1
+
+    def test_transaction_rolls_back(self, mongo: MongoDB):
+        if not mongo['main'].client.admin.command('hello').get('setName'):
+            pytest.skip('Transactions require a replica set')
+
+        with pytest.raises(ValueError):
+            with mongo.transaction():
+                ModelForTest(sample_text='Rolled back').save()
+                raise ValueError()
+
+        assert ModelForTest().manager.find_one(sample_text='Rolled back') is None
+
+    def test_stream_documents(self, application):
+        for text in ('Streamed 1', 'Streamed 2', 'Streamed 3'):
+            ModelForTest(sample_text=text).save()
+        docuset = ModelForTest().manager.find(sample_text={'$regex': '^Streamed'})
+
+        with application.test_request_context():
+            ndjson = stream_documents(docuset, batch_size=2)
+            array = stream_documents(docuset, format='json-array')
+
+            lines = ndjson.get_data().splitlines()
+            assert ndjson.mimetype == 'application/x-ndjson'
+            assert [json.loads(line)['sample_text'] for line in lines] == ['Streamed 1', 'Streamed 2', 'Streamed 3']
+            assert json.loads(array.get_data()) == [json.loads(line) for line in lines]
+
+    def test_explain(self, application):
+        model = ModelForTest(sample_text='Explained')
+        model.save()
+
+        plan = ModelForTest().manager.find(sample_text='Explained').explain()
+        assert plan['collscan']
+        assert plan['returned'] == 1
+        with pytest.raises(AssertionError):
+            assert_no_collscan(ModelForTest().manager.find(sample_text='Explained'))
+
+        assert_uses_index(ModelForTest().manager.find(_id=model.pk), '_id_')
+
+        # A hinted DocumentSet is explained with its hint
+        hinted = ModelForTest().manager.find(sample_text='Explained')
+        hinted.run_cursor_method('hint', [('_id', 1)])
+        assert_uses_index(hinted, '_id_')
+
     def test_document_set_elements_are_models(self):
         model = ModelForTest()
         ds = model.manager.find()
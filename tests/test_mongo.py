@@ -0,0 +1,138 @@
+import os
+import threading
+
+import pytest
+from flask import Flask, g
+
+from flask_mongodb import MongoDB
+from flask_mongodb.core.exceptions import DatabaseException
+from flask_mongodb.core.wrappers import MongoCollection
+from tests.utils import DB_NAME, MAIN
+
+NAME = DB_NAME + '_mongo'
+ANALYTICS = 'analytics'
+APP_CONFIG = {
+    'TESTING': True,
+    'DATABASE': {
+        MAIN: {
+            'HOST': 'localhost',
+            'PORT': 27017,
+            'NAME': NAME
+        },
+        ANALYTICS: {
+            'HOST': 'localhost',
+            'PORT': 27017,
+            'NAME': NAME + '_analytics'
+        }
+    },
+    'MODELS': ['tests.model_for_tests.core']
+}
+
+
+@pytest.fixture(scope='function')
+def mongo():
+    _app = Flask(__name__)
+    _app.config.update(APP_CONFIG)
+    _mongo = MongoDB(_app)
+
+    yield _mongo
+
+    for alias in (MAIN, ANALYTICS):
+        _mongo.connections[alias].client.drop_database(_mongo.connections[alias].name)
+    _mongo.disconnect()
+
+
+def test_aliases_share_client(mongo: MongoDB):
+    assert len(mongo.clients) == 1
+    assert mongo[MAIN].client is mongo[ANALYTICS].client
+
+
+def test_aliases_keep_their_database(mongo: MongoDB):
+    assert mongo[MAIN].name == NAME
+    assert mongo[ANALYTICS].name == NAME + '_analytics'
+    assert mongo[ANALYTICS].alias == ANALYTICS
+
+
+def _unreachable_app(**options):
+    _app = Flask(__name__)
+    _app.config.update({
+        'TESTING': True,
+        'DATABASE': {
+            MAIN: {
+                'HOST': 'localhost',
+                'PORT': 1,  # Nothing listens on this port
+                'NAME': NAME,
+                'SERVER_SELECTION_TIMEOUT_MS': 100,
+                **options
+            }
+        },
+        'MODELS': ['tests.model_for_tests.core']
+    })
+    return _app
+
+
+def test_lazy_connection_does_not_connect():
+    _mongo = MongoDB(_unreachable_app(LAZY=True))
+    assert MAIN in _mongo.connections
+    _mongo.disconnect()
+
+
+def test_eager_connection_checks_server():
+    with pytest.raises(DatabaseException):
+        MongoDB(_unreachable_app())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='Requires os.fork')
+def test_clients_rebuilt_after_fork():
+    _mongo = MongoDB(_unreachable_app(LAZY=True))
+    parent_client = _mongo[MAIN].client
+    collection = MongoCollection(_mongo[MAIN], 'testing1')
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child process, report whether the database and its collections use a new client
+        rebuilt = (_mongo[MAIN].client is not parent_client
+                   and collection.database.client is _mongo[MAIN].client
+                   and list(_mongo.clients.values()) == [_mongo[MAIN].client])
+        os.write(write_fd, b'1' if rebuilt else b'0')
+        os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.waitpid(pid, 0)
+    assert result == b'1'
+    assert _mongo[MAIN].client is parent_client
+    _mongo.disconnect()
+
+
+def test_gather_returns_results_in_order():
+    _app = _unreachable_app(LAZY=True)
+    _mongo = MongoDB(_app)
+    with _app.test_request_context():
+        g.value = 'shared'
+        assert _mongo.gather(lambda: 1, lambda: g.value, lambda: _mongo.gather(lambda: 3)) == [1, 'shared', [3]]
+    _mongo.disconnect()
+
+
+def test_gather_raises_first_error():
+    _mongo = MongoDB(_unreachable_app(LAZY=True))
+
+    def fail(exc):
+        raise exc
+
+    with pytest.raises(ValueError):
+        _mongo.gather(lambda: 1, lambda: fail(ValueError()), lambda: fail(KeyError()))
+    with pytest.raises(TypeError):
+        _mongo.gather(1)
+    _mongo.disconnect()
+
+
+def test_disconnect_stops_gather_threads():
+    _mongo = MongoDB(_unreachable_app(LAZY=True))
+    assert _mongo.gather(lambda: 1, lambda: 2) == [1, 2]
+    _mongo.disconnect()
+
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('flask-mongodb-gather')]
+    assert _mongo.gather(lambda: 3, lambda: 4) == [3, 4]
+    _mongo.disconnect()
@@ -0,0 +1,174 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, g, jsonify
+
+from flask_mongodb.core.exceptions import ImproperConfiguration, NPlusOneQueryDetected, QueryBudgetExceeded
+from flask_mongodb.core.monitoring import (NPlusOneQueryWarning, QueryTracker, QueryTrackingListener,
+                                           RequestCommandListener, RequestStats, command_shape, query_shape)
+from flask_mongodb.testing import detect_n_plus_one, query_budget
+from tests.fixtures import BaseAppSetup, create_lazy_app, lazy_app  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest
+from tests.utils import MAIN
+
+LAZY_APP_CONFIG = {'MONGODB_QUERY_TRACKING': True}
+
+
+def test_query_shape_redacts_values():
+    query = {'name': 'John', 'age': {'$gt': 30}, '$or': [{'tags': {'$in': ['a', 'b']}}, {'active': True}]}
+    assert query_shape(query) == {'name': '?', 'age': {'$gt': '?'},
+                                  '$or': [{'tags': {'$in': '?'}}, {'active': '?'}]}
+
+
+def test_command_shape():
+    assert command_shape('find', {'find': 'users', 'filter': {'age': {'$gt': 30}}}) == \
+        'find users {"age": {"$gt": "?"}}'
+    assert command_shape('delete', {'delete': 'users', 'deletes': [{'q': {'_id': 1}, 'limit': 1}]}) == \
+        'delete users {"_id": "?"}'
+    assert command_shape('insert', {'insert': 'users', 'documents': [{}]}) == 'insert users'
+
+
+def test_request_stats():
+    stats = RequestStats(measure_sizes=True)
+    stats.command_started((1, 1), 'find users {"_id": "?"}', 100)
+    stats.command_started((1, 2), 'find users {}', 80)
+    stats.command_finished((1, 1), 0.002, 400)
+    stats.command_finished((1, 2), 0.001, 200, failed=True)
+    stats.add_hydration(0.0005)
+
+    assert stats.to_dict()['commands'] == 2
+    assert stats.failed == 1
+    assert (stats.bytes_sent, stats.bytes_received) == (180, 600)
+    assert stats.to_dict()['bytes_received'] == 600
+    assert stats.slowest_command == 'find users {"_id": "?"}'
+    assert stats.server_timing() == 'mongodb;dur=3.00;desc="2 commands", mongodb-hydration;dur=0.50'
+
+
+@pytest.mark.parametrize('measure_sizes', [False, True])
+def test_request_command_listener_sizes(measure_sizes):
+    listener = RequestCommandListener(measure_sizes)
+    command = {'find': 'users', 'filter': {'_id': 1}}
+    with Flask(__name__).test_request_context():
+        g.mongodb_stats = stats = RequestStats(measure_sizes)
+        listener.started(SimpleNamespace(command_name='find', command=command, connection_id=1, request_id=1))
+        listener.succeeded(SimpleNamespace(reply={'ok': 1}, connection_id=1, request_id=1, duration_micros=1000))
+
+    assert stats.commands == 1
+    assert stats.slowest_command == 'find users {"_id": "?"}'
+    assert (stats.bytes_sent > 0, stats.bytes_received > 0) == (measure_sizes, measure_sizes)
+    if not measure_sizes:
+        # Sizes that were not measured are not reported as 0 bytes
+        assert stats.to_dict()['bytes_sent'] is None and stats.to_dict()['bytes_received'] is None
+
+
+def _run_find(listener: QueryTrackingListener, _id):
+    listener.started(SimpleNamespace(command_name='find', command={'find': 'users', 'filter': {'_id': _id}}))
+
+
+def test_query_tracker_finds_repeated_shapes():
+    listener = QueryTrackingListener()
+    with QueryTracker().activate() as tracker:
+        for _id in range(3):
+            _run_find(listener, _id)
+        _run_find(listener, 0)
+        listener.started(SimpleNamespace(command_name='getMore', command={'getMore': 1, 'collection': 'users'}))
+    _run_find(listener, 4)  # Not tracked
+
+    assert len(tracker) == 4
+    [(shape, values, sites)] = tracker.repeated_shapes(3)
+    assert (shape, values) == ('find users {"_id": "?"}', 3)
+    assert sites[0].startswith(__file__)
+    assert tracker.repeated_shapes(4) == []
+
+
+def test_query_budget(lazy_app):
+    listener = QueryTrackingListener()
+    with query_budget(2):
+        _run_find(listener, 1)
+        _run_find(listener, 2)
+
+    @query_budget(1)
+    def over_budget():
+        _run_find(listener, 1)
+        _run_find(listener, 2)
+
+    with pytest.raises(QueryBudgetExceeded, match='2 queries ran, the budget is 1'):
+        over_budget()
+
+
+def test_detect_n_plus_one(lazy_app):
+    listener = QueryTrackingListener()
+    with pytest.raises(NPlusOneQueryDetected, match='ran with 2 different values'):
+        with detect_n_plus_one():
+            _run_find(listener, 1)
+            _run_find(listener, 2)
+    with detect_n_plus_one():
+        _run_find(listener, 1)
+        _run_find(listener, 1)
+
+
+def test_tracked_blocks_require_query_tracking():
+    _app = create_lazy_app()
+    with _app.app_context():
+        with pytest.raises(ImproperConfiguration, match='MONGODB_QUERY_TRACKING'):
+            with query_budget(0):
+                pass
+    _app.mongo.disconnect()
+    with pytest.raises(ImproperConfiguration):
+        with detect_n_plus_one():
+            pass
+
+
+@pytest.mark.parametrize('config,tracked', [
+    ({}, False),
+    ({'MONGODB_QUERY_TRACKING': True}, True),
+    ({'MONGODB_REQUEST_QUERY_BUDGET': 10}, True),
+])
+def test_query_tracking_listener_is_optional(config, tracked):
+    _mongo = create_lazy_app(**config).mongo
+    listeners = _mongo.connections[MAIN].client.options.event_listeners
+    _mongo.disconnect()
+
+    assert any(isinstance(listener, QueryTrackingListener) for listener in listeners) is tracked
+
+
+class TestRequestInstrumentation(BaseAppSetup):
+    APP_CONFIG = {**BaseAppSetup.APP_CONFIG, 'MONGODB_INSTRUMENTATION': True,
+                  'MONGODB_REQUEST_LOG_THRESHOLD_MS': 0}
+    MODELS = ['tests.model_for_tests.core']
+
+    def test_request_stats_and_server_timing(self, application: Flask):
+        ModelForTest(sample_text='Instrumented').save()
+
+        @application.get('/instrumented')
+        def instrumented():
+            models = list(ModelForTest().manager.find(sample_text='Instrumented'))
+            return jsonify(hydrated=len(models), stats=g.mongodb_stats.to_dict())
+
+        response = application.test_client().get('/instrumented')
+        stats = response.get_json()['stats']
+
+        assert stats['commands'] >= 1
+        assert stats['hydrated'] == response.get_json()['hydrated']
+        assert stats['slowest_command'].startswith('find testing1')
+        assert response.headers['Server-Timing'].startswith('mongodb;dur=')
+
+
+class TestQueryTracking(BaseAppSetup):
+    APP_CONFIG = {**BaseAppSetup.APP_CONFIG, 'MONGODB_DETECT_N_PLUS_ONE': True, 'MONGODB_N_PLUS_ONE_THRESHOLD': 3,
+                  'MONGODB_REQUEST_QUERY_BUDGET': 5}
+    MODELS = ['tests.model_for_tests.core']
+
+    def test_n_plus_one_warning_and_request_budget(self, application: Flask):
+        ids = [ModelForTest(sample_text=f'Loop {i}').save().inserted_id for i in range(6)]
+
+        @application.get('/loop/<int:count>')
+        def loop(count):
+            for _id in ids[:count]:
+                ModelForTest().manager.find_one(_id=_id)
+            return 'OK'
+
+        with pytest.warns(NPlusOneQueryWarning, match='find testing1'):
+            application.test_client().get('/loop/3')
+        with pytest.raises(QueryBudgetExceeded):
+            application.test_client().get('/loop/6')
@@ -0,0 +1,93 @@
+import pytest
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+from flask_mongodb import current_mongo
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.core.options import (get_collection_options, get_read_concern, get_read_preference,
+                                        get_write_concern)
+from tests.fixtures import lazy_app  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest
+
+
+class SecondaryModel(ModelForTest):
+    read_preference = 'secondaryPreferred'
+    max_staleness = 120
+    read_concern = 'majority'
+
+
+def test_read_preference_from_name():
+    assert get_read_preference('secondaryPreferred', 90) == SecondaryPreferred(max_staleness=90)
+    assert get_read_preference(ReadPreference.NEAREST) is ReadPreference.NEAREST
+
+
+def test_invalid_read_options():
+    with pytest.raises(ImproperConfiguration):
+        get_read_preference('secondaries')
+    with pytest.raises(ImproperConfiguration):
+        get_read_preference('primary', 90)
+    with pytest.raises(ImproperConfiguration):
+        get_read_concern('strong')
+    with pytest.raises(ImproperConfiguration):
+        get_collection_options(max_staleness=90)
+
+
+def test_model_read_options(lazy_app):
+    collection = SecondaryModel().collection
+    assert collection.read_preference.mongos_mode == 'secondaryPreferred'
+    assert collection.read_preference.max_staleness == 120
+    assert collection.read_concern == ReadConcern('majority')
+
+
+def test_manager_with_options(lazy_app):
+    model = ModelForTest()
+    manager = model.manager.with_options(read_preference='secondary', read_concern='local')
+
+    assert manager.collection.read_preference == ReadPreference.SECONDARY
+    assert manager.collection.read_concern == ReadConcern('local')
+    assert manager.collection is manager.collection
+    assert model.manager.collection is model.collection
+    assert model.collection.read_preference == ReadPreference.PRIMARY
+
+
+def test_document_set_read_options(lazy_app):
+    docuset = ModelForTest().manager.find(sample_text='Secondary').limit(5)
+    docuset.using_read_preference('nearest').using_read_concern('majority')
+
+    cursor = docuset._DocumentSet__cursor
+    assert cursor.collection.read_preference == ReadPreference.NEAREST
+    assert cursor.collection.read_concern == ReadConcern('majority')
+    assert cursor.collection.name == ModelForTest.collection_name
+
+    # The cursor attributes lost their name mangling in PyMongo 4.9
+    def cursor_attr(name):
+        return getattr(cursor, f'_{name}', None) or getattr(cursor, f'_Cursor__{name}')
+    assert cursor_attr('spec') == {'sample_text': 'Secondary'}
+    assert cursor_attr('limit') == 5
+
+
+class TelemetryModel(ModelForTest):
+    write_concern = {'w': 1, 'j': False}
+
+
+def test_write_concern_values():
+    assert get_write_concern('majority') == WriteConcern(w='majority')
+    assert get_write_concern({'w': 1, 'j': False}) == WriteConcern(w=1, j=False)
+    with pytest.raises(ImproperConfiguration):
+        get_write_concern({'w': 0, 'j': True})
+    with pytest.raises(ImproperConfiguration):
+        get_write_concern(1.5)
+
+
+def test_model_and_manager_write_concern(lazy_app):
+    model = TelemetryModel()
+    assert model.collection.write_concern == WriteConcern(w=1, j=False)
+
+    manager = model.manager.with_options(write_concern=0)
+    assert not manager.collection.write_concern.acknowledged
+    assert manager.collection.read_preference == model.collection.read_preference
+    with current_mongo.causal_session():
+        # Unacknowledged writes do not join the active session
+        assert manager._get_session() is None
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from flask_mongodb import current_mongo, transaction
+from flask_mongodb.core.buffer import WriteBuffer
+from flask_mongodb.core.sessions import get_active_session
+from flask_mongodb.core.wrappers import MongoCollection
+from tests.fixtures import lazy_app  # noqa: F401
+from tests.model_for_tests.core.models import ModelForTest
+from tests.utils import MAIN
+
+
+def test_session_is_active_in_block(lazy_app):
+    client = current_mongo[MAIN].client
+    with current_mongo.session() as session:
+        assert get_active_session(client) is session
+        docuset = ModelForTest().manager.find()
+        assert docuset._DocumentSet__cursor.session is session
+    assert session.has_ended
+    assert get_active_session(client) is None
+
+
+def test_transaction_context_manager(lazy_app):
+    with current_mongo.transaction() as session:
+        assert session.in_transaction
+        assert get_active_session(current_mongo[MAIN].client) is session
+    assert session.has_ended
+
+    with pytest.raises(ValueError):
+        with current_mongo.transaction(write_concern='majority') as session:
+            raise ValueError()
+    assert not session.in_transaction
+    assert session.has_ended
+
+
+def test_transaction_decorator(lazy_app):
+    @transaction(read_concern='snapshot')
+    def transfer(amount):
+        session = get_active_session(current_mongo[MAIN].client)
+        assert session.in_transaction
+        return amount
+
+    assert transfer(10) == 10
+    assert get_active_session(current_mongo[MAIN].client) is None
+
+
+def test_deferred_save_joins_the_session(lazy_app, monkeypatch):
+    inserts = []
+
+    def insert_one(collection, document, session=None, **options):
+        inserts.append(session)
+        return SimpleNamespace(inserted_id=ObjectId())
+
+    def put(buffer, collection, document):
+        raise AssertionError('The insert was buffered outside of the session')
+
+    monkeypatch.setattr(MongoCollection, 'insert_one', insert_one)
+    monkeypatch.setattr(WriteBuffer, 'put', put)
+    with current_mongo.transaction() as session:
+        model = ModelForTest(sample_text='Deferred')
+        model.save(deferred=True)
+
+    assert inserts == [session]
+    assert model.pk is not None
+
@@ -0,0 +1,124 @@
+import pytest
+
+from flask_mongodb.core.exceptions import ImproperConfiguration
+from flask_mongodb.core.tracing import SpanHooks, add_span_hooks, get_span_hooks, remove_span_hooks, span
+from tests.fixtures import BaseAppSetup, create_lazy_app
+from tests.model_for_tests.core.models import ModelForTest, ModelWithEmbeddedDocument
+
+
+class RecordingHooks(SpanHooks):
+    """Span hooks that record the spans, with the names of the spans running when they started"""
+    def __init__(self):
+        self.spans = []
+        self.running = []
+
+    def start(self, name, attributes):
+        record = {'name': name, 'parents': list(self.running), 'attributes': attributes, 'error': None}
+        self.spans.append(record)
+        self.running.append(name)
+        return record
+
+    def end(self, token, attributes, error=None):
+        token['error'] = error
+        self.running.pop()
+
+    def names(self):
+        return [record['name'] for record in self.spans]
+
+
+@pytest.fixture(scope='function')
+def hooks():
+    recording = RecordingHooks()
+    add_span_hooks(recording)
+    yield recording
+    remove_span_hooks(recording)
+
+
+def test_span_without_hooks():
+    with span('flask_mongodb.test', value=1) as current:
+        current.set_attribute('other', 2)
+    assert span('flask_mongodb.test') is span('flask_mongodb.other')
+
+
+def test_span_attributes_and_errors(hooks):
+    with pytest.raises(ValueError):
+        with span('flask_mongodb.test', value=1) as current:
+            current.set_attribute('other', 2)
+            raise ValueError('failed')
+
+    [record] = hooks.spans
+    assert record['attributes'] == {'value': 1, 'other': 2}
+    assert isinstance(record['error'], ValueError)
+
+
+def test_model_spans(hooks):
+    model = ModelWithEmbeddedDocument()
+    model.set_model_data({'first_name': 'John', 'last_name': 'Doe', 'phone_number': {'number': '555'}})
+    hooks.spans.clear()
+
+    model.to_document()
+    model.modified_fields(insert=True)
+    model.set_model_data({'first_name': 'Jane'})
+
+    assert hooks.names() == ['flask_mongodb.to_document', 'flask_mongodb.modified_fields', 'flask_mongodb.validate']
+    assert hooks.spans[0]['attributes'] == {'model': 'ModelWithEmbeddedDocument', 'json_parsed': False}
+    assert hooks.spans[1]['attributes']['insert'] is True
+    assert hooks.spans[2]['attributes']['fields'] == 1
+
+
+def test_span_hooks_configuration():
+    with pytest.raises(ImproperConfiguration):
+        create_lazy_app(MONGODB_SPAN_HOOKS=[object()])
+
+
+def test_span_hooks_of_each_app():
+    _app = create_lazy_app(MONGODB_SPAN_HOOKS=['tests.test_tracing.RecordingHooks'])
+    # Initializing the app again does not add the hooks twice
+    _app.mongo.init_app(_app)
+    other_app = create_lazy_app()
+
+    with _app.app_context():
+        [app_hooks] = get_span_hooks()
+        with span('flask_mongodb.test'):
+            pass
+    with other_app.app_context():
+        assert get_span_hooks() == ()
+        with span('flask_mongodb.test'):
+            pass
+    assert get_span_hooks() == ()
+
+    assert isinstance(app_hooks, RecordingHooks)
+    assert app_hooks.names() == ['flask_mongodb.test']
+    _app.mongo.disconnect()
+    other_app.mongo.disconnect()
+
+
+def test_opentelemetry_hooks():
+    pytest.importorskip('opentelemetry.trace')
+    from flask_mongodb.core.tracing import OpenTelemetryHooks
+
+    otel_hooks = OpenTelemetryHooks()
+    add_span_hooks(otel_hooks)
+    try:
+        ModelForTest(sample_text='traced').to_document()
+    finally:
+        remove_span_hooks(otel_hooks)
+
+
+class TestTracing(BaseAppSetup):
+    MODELS = ['tests.model_for_tests.core']
+
+    def test_write_and_fetch_spans(self, hooks):
+        model = ModelForTest(sample_text='traced')
+        hooks.spans.clear()
+        model.save()
+        assert hooks.names() == ['flask_mongodb.write', 'flask_mongodb.modified_fields']
+        assert hooks.spans[0]['attributes'] == {'model': 'ModelForTest', 'collection': 'testing1',
+                                                'operation': 'run_save'}
+        assert hooks.spans[1]['parents'] == ['flask_mongodb.write']
+
+        manager = ModelForTest().manager
+        hooks.spans.clear()
+        manager.find_one(sample_text='traced')
+        assert hooks.names() == ['flask_mongodb.fetch', 'flask_mongodb.hydrate', 'flask_mongodb.validate']
+        assert hooks.spans[2]['parents'] == ['flask_mongodb.hydrate']